@@ -13,8 +13,11 @@
 '''
 import os
 import tkinter as tk
-from tkinter import filedialog, scrolledtext, messagebox
-from docx import Document
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
 import traceback
 
 class DocxBatchProcessor:
@@ -50,7 +53,7 @@ class DocxBatchProcessor:
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志:").pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame3, wrap=tk.WORD, height=20)
+        self.log_text = LogView(frame3, "1-修改多个表格", wrap=tk.WORD, height=20)
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
     def select_folder(self):
@@ -62,13 +65,12 @@ class DocxBatchProcessor:
             
     def log(self, message):
         """添加日志信息"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(message)
         self.root.update_idletasks()
         
     def clear_log(self):
         """清空日志"""
-        self.log_text.delete(1.0, tk.END)
+        self.log_text.clear()
         self.log("日志已清空")
         
     def process_single_document(self, file_path):
@@ -214,12 +216,18 @@ class DocxBatchProcessor:
         success_count = 0
         fail_count = 0
         
+        # 修改前把每个文件写入回滚日志
+        run = RestoreJournal().begin("1-修改多个表格", folder)
         for filename in docx_files:
             file_path = os.path.join(folder, filename)
+            run.backup(file_path)
             if self.process_single_document(file_path):
                 success_count += 1
             else:
                 fail_count += 1
+            run.commit(file_path)
+        run.end()
+        self.log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成统计
         self.log("="*50)
@@ -233,4 +241,6 @@ if __name__ == "__main__":
     # 创建并运行GUI
     root = tk.Tk()
     app = DocxBatchProcessor(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
@@ -5,11 +5,11 @@
 import os
 import sys
 import tkinter as tk
-from tkinter import filedialog, scrolledtext, messagebox
-import traceback
-import win32com.client
-import pythoncom
-import psutil  # 用于强制清理Word进程
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, lazy_module, warm_up
+from log_view import LogView
+psutil = lazy_module("psutil")  # 用于清理本工具启动的Word进程
+ConverterPool = lazy_from("converter_worker", "ConverterPool")  # 带看门狗的转换工作进程
 
 class RtfToDocxConverterWin:
     def __init__(self, root):
@@ -20,13 +20,13 @@ class RtfToDocxConverterWin:
         
         # 初始化变量
         self.folder_path = tk.StringVar()
-        self.word_instances = []  # 跟踪Word实例，防止泄漏
-        # 定义Word常量（直接用数值，避免常量引用错误）
-        self.WD_ALERTS_NONE = 0
-        self.WD_FORMAT_XML_DOCUMENT = 16
-        self.WD_WORD_2016 = 15
-        self.MSO_AUTOMATION_SECURITY_FORCE_DISABLE = 3
-        self.WD_DO_NOT_SAVE_CHANGES = 0
+        # 看门狗设置：每个工作进程独占一个Word，卡死/内存超限时只结束该进程并重启
+        self.CONVERT_WORKERS = 2        # 并行的Word工作进程数
+        self.CONVERT_TIMEOUT = 180      # 单个文件最长转换时间（秒）
+        self.STALL_TIMEOUT = 60         # CPU持续无活动多少秒判定为卡死（隐藏对话框）
+        self.MAX_RSS_MB = 2048          # 工作进程+Word内存上限（MB）
+        self.MAX_RETRIES = 2            # 被强制结束后重试次数，超过则移入「_隔离文件」
+        self.pool = None
         
         self._create_widgets()
         
@@ -105,9 +105,9 @@ class RtfToDocxConverterWin:
         ).pack(anchor=tk.W)
         
         # 带滚动条的日志文本框（只读）
-        self.log_text = scrolledtext.ScrolledText(
-            log_frame, wrap=tk.WORD, height=30, font=("Consolas", 9),
-            bg="#F8F9FA", bd=1, relief=tk.SUNKEN, state=tk.DISABLED
+        self.log_text = LogView(
+            log_frame, "Rtf转docx", wrap=tk.WORD, height=30, font=("Consolas", 9),
+            bg="#F8F9FA", bd=1, relief=tk.SUNKEN
         )
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
@@ -129,106 +129,65 @@ class RtfToDocxConverterWin:
                 
     def log(self, message):
         """线程安全的日志输出，保证日志区域只读"""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)  # 自动滚动到最新日志
+        self.log_text.write(message)
         self.root.update_idletasks()  # 强制刷新界面
-        self.log_text.config(state=tk.DISABLED)
         
     def clear_log(self):
         """清空日志内容"""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        self.log_text.clear()
         self.log("📝 日志已清空，工具就绪")
         
     def clean_word_processes(self):
-        """强制清理残留的WinWord.exe进程（防止内存泄漏）"""
+        """
+        清理残留Word进程（应急用）
+        只结束本工具当前转换进程池启动的、仍在运行的Word（按PID并核对进程创建时间），
+        不影响手动打开的Word、其他工具（如PDF转换、任务服务）启动的Word
+        """
         try:
             self.log("🔍 开始清理残留Word进程...")
             killed = 0
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] and 'WINWORD.EXE' in proc.info['name'].upper():
+            for proc in (self.pool.word_processes() if self.pool is not None else []):
+                try:
                     proc.kill()
-                    killed += 1
-                    self.log(f"🗑️  终止Word进程 PID: {proc.info['pid']}")
+                except psutil.NoSuchProcess:
+                    continue
+                killed += 1
+                self.log(f"🗑️  终止Word进程 PID: {proc.pid}")
             self.log(f"✅ 共清理 {killed} 个Word残留进程")
             messagebox.showinfo("完成", f"已清理 {killed} 个Word残留进程")
         except Exception as e:
             self.log(f"❌ 清理进程失败：{str(e)}")
             messagebox.showerror("错误", f"清理进程失败：{str(e)}")
+
+    def _get_pool(self):
+        """首次使用时启动转换工作进程（Word实例在整批文件间复用）"""
+        if self.pool is None:
+            self.pool = ConverterPool(
+                workers=self.CONVERT_WORKERS, timeout=self.CONVERT_TIMEOUT,
+                stall_timeout=self.STALL_TIMEOUT, max_rss_mb=self.MAX_RSS_MB,
+                max_retries=self.MAX_RETRIES
+            )
+        return self.pool
+
+    def _close_pool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
         
     def convert_single_file(self, rtf_path, docx_path):
         """
-        核心转换函数：修复常量引用问题，保证DOCX可正常打开
-        1. 移除易出错的constants引用，直接用数值
-        2. 跳过临时文件（~$开头的文件）
-        3. 增强异常处理
+        核心转换函数：在看门狗监控的工作进程中用Word转换
+        1. 跳过临时文件（~$开头的文件）
+        2. 超时/卡死/内存超限时只结束对应的Word进程，重试后仍失败则隔离该文件
         """
         # 跳过Word临时文件（~$开头），这类文件无法正常转换
         if os.path.basename(rtf_path).startswith("~$"):
             self.log(f"  ⚠️  跳过Word临时文件：{os.path.basename(rtf_path)}")
             return True
         
-        word = None
-        doc = None
-        try:
-            # 初始化COM（解决多次调用问题）
-            pythoncom.CoInitialize()
-            
-            # 创建独立的Word实例（DispatchEx），避免影响现有Word窗口
-            word = win32com.client.DispatchEx("Word.Application")
-            self.word_instances.append(word)  # 跟踪实例
-            
-            # 关键设置：禁用所有弹窗和可见性（直接用数值，避免常量错误）
-            word.Visible = False
-            word.DisplayAlerts = self.WD_ALERTS_NONE  # 0 = 禁用所有提示
-            word.AutomationSecurity = self.MSO_AUTOMATION_SECURITY_FORCE_DISABLE  # 3 = 强制禁用宏
-            
-            # 打开RTF文件（禁用转换确认、只读模式打开）
-            doc = word.Documents.Open(
-                FileName=rtf_path,
-                ConfirmConversions=False,
-                ReadOnly=True,
-                AddToRecentFiles=False,
-                Visible=False
-            )
-            
-            # 另存为DOCX（使用数值指定格式，确保兼容性）
-            doc.SaveAs2(
-                FileName=docx_path,
-                FileFormat=self.WD_FORMAT_XML_DOCUMENT,  # 16 = DOCX格式
-                CompatibilityMode=self.WD_WORD_2016  # 15 = 兼容Word 2016+
-            )
-            
-            # 验证生成的DOCX文件是否有效
-            if os.path.exists(docx_path) and os.path.getsize(docx_path) > 0:
-                self.log(f"  ✅ 转换成功：{os.path.basename(rtf_path)} → {os.path.basename(docx_path)}")
-                return True
-            else:
-                self.log(f"  ❌ 转换后文件无效：{os.path.basename(rtf_path)}")
-                return False
-                
-        except Exception as e:
-            self.log(f"  ❌ 转换失败：{os.path.basename(rtf_path)}")
-            self.log(f"  📋 错误原因：{str(e)}")
-            self.log(f"  📜 错误详情：{traceback.format_exc()[:600]}")  # 截断过长日志
-            return False
-        finally:
-            # 强制释放资源（关键：防止Word进程残留）
-            if doc:
-                try:
-                    doc.Close(SaveChanges=self.WD_DO_NOT_SAVE_CHANGES)  # 0 = 不保存更改
-                except:
-                    pass
-            if word:
-                try:
-                    word.Quit(SaveChanges=self.WD_DO_NOT_SAVE_CHANGES)
-                    self.word_instances.remove(word)
-                except:
-                    pass
-            # 释放COM资源
-            pythoncom.CoUninitialize()
+        result = self._get_pool().convert(rtf_path, docx_path, "rtf_to_docx")
+        self.log(f"  {result.message()}")
+        return result.ok
             
     def batch_convert(self):
         """批量转换主逻辑，防重复点击、完整统计"""
@@ -260,7 +219,9 @@ class RtfToDocxConverterWin:
         
         success_count = 0
         fail_count = 0
+        quarantine_count = 0
         
+        tasks = []
         for filename in rtf_files:
             rtf_path = os.path.join(folder, filename)
             docx_filename = os.path.splitext(filename)[0] + ".docx"
@@ -270,18 +231,32 @@ class RtfToDocxConverterWin:
             if os.path.exists(docx_path):
                 self.log(f"  ⚠️  跳过已存在文件：{docx_filename}")
                 continue
-            
-            self.log(f"\n🔄 正在处理：{filename}")
-            if self.convert_single_file(rtf_path, docx_path):
-                success_count += 1
-            else:
-                fail_count += 1
+            # 跳过Word临时文件（~$开头），这类文件无法正常转换
+            if filename.startswith("~$"):
+                self.log(f"  ⚠️  跳过Word临时文件：{filename}")
+                continue
+            tasks.append((rtf_path, docx_path, "rtf_to_docx"))
+        
+        # 多个Word工作进程并行转换，每个文件都在看门狗监控下进行
+        try:
+            for result in self._get_pool().run_batch(tasks):
+                self.log(f"  {result.message()}")
+                if result.ok:
+                    success_count += 1
+                else:
+                    fail_count += 1
+                    if result.quarantined:
+                        quarantine_count += 1
+        finally:
+            self._close_pool()
         
         # 转换完成统计
         self.log("\n" + "="*70)
         self.log(f"🏁 批量转换完成！")
         self.log(f"✅ 成功转换：{success_count} 个文件")
         self.log(f"❌ 转换失败：{fail_count} 个文件")
+        if quarantine_count:
+            self.log(f"☣️ 其中 {quarantine_count} 个文件多次卡死，已移入「_隔离文件」文件夹")
         self.log(f"📁 输出路径：{folder}")
         
         # 弹窗提示结果
@@ -292,9 +267,6 @@ class RtfToDocxConverterWin:
         
         # 恢复按钮状态
         self.convert_btn.config(state=tk.NORMAL)
-        
-        # 最后清理可能的Word进程
-        self.clean_word_processes()
 
 if __name__ == "__main__":
     # 检查Python版本
@@ -314,10 +286,12 @@ if __name__ == "__main__":
     root = tk.Tk()
     app = RtfToDocxConverterWin(root)
     
-    # 程序退出时清理Word进程
+    # 程序退出时关闭转换工作进程（只结束本工具启动的Word）
     def on_closing():
-        app.clean_word_processes()
+        app._close_pool()
         root.destroy()
         
     root.protocol("WM_DELETE_WINDOW", on_closing)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "psutil", "converter_worker")
     root.mainloop()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成Word报告语料生成器 - Python 3.8.7 + python-docx
+功能：
+1. 按指定数量生成结构与真实EMC报告一致的.docx文件
+2. 文件名带 M1_ME_H / Ambient_RE_V 等关键词，可直接喂给各批量工具
+3. 每页包含：标题、Final_Result、PNG曲线图、4列表格（Frequency/QuasiPeak/Margin/Limit）
+4. 页眉带公司Logo（所有文件相同，用于测试图片去重）
+5. 固定随机种子，保证多次生成结果完全一致（基准测试可复现）
+
+命令行用法：
+python bench_corpus.py 输出文件夹 --count 200 --pages 3 --images 1 --rows 6
+"""
+import os
+import sys
+import math
+import zlib
+import struct
+import random
+import argparse
+
+# 与现有工具一致的关键词（顺序即生成时的轮换顺序）
+KEYWORDS = [
+    "Ambient_ME_H", "Ambient_ME_V", "Ambient_RE_H", "Ambient_RE_V",
+    "M1_ME_H", "M1_ME_V", "M1_RE_H", "M1_RE_V",
+    "M2_ME_H", "M2_ME_V", "M2_RE_H", "M2_RE_V",
+    "M3_ME_H", "M3_RE_H", "M4_ME_H", "M4_RE_H",
+    "M5_ME_H", "M5_RE_H",
+]
+
+TABLE_HEADERS = ["Frequency", "QuasiPeak", "Margin", "Limit"]
+
+# ME为传导（150kHz-30MHz），RE为辐射（30MHz-1GHz）
+FREQ_RANGE_MHZ = {
+    "ME": (0.15, 30.0),
+    "RE": (30.0, 1000.0),
+}
+
+
+# ========== PNG编码（纯标准库，不依赖Pillow） ==========
+def _png_chunk(tag, data):
+    chunk = tag + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk) & 0xFFFFFFFF)
+
+
+def encode_png(width, height, rows, compress_level=6):
+    """
+    把RGB像素行编码为PNG字节
+    :param rows: 每行为 bytes（长度 width*3）
+    """
+    raw = b"".join(b"\x00" + row for row in rows)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(raw, compress_level))
+            + _png_chunk(b"IEND", b""))
+
+
+def make_plot_png(rng, width=800, height=500, compress_level=6):
+    """生成一张模拟接收机扫描曲线的PNG（白底+网格+限值线+随机谱线）"""
+    white = bytearray(b"\xff\xff\xff" * width)
+    grid = bytearray(white)
+    for x in range(0, width, max(1, width // 10)):
+        grid[x * 3:x * 3 + 3] = b"\xc0\xc0\xc0"
+    rows = []
+    for y in range(height):
+        rows.append(bytearray(b"\xc0\xc0\xc0" * width) if y % max(1, height // 8) == 0 else bytearray(grid))
+
+    # 限值线（红色）
+    limit_y = height // 4
+    rows[limit_y][:] = b"\xff\x00\x00" * width
+
+    # 谱线（蓝色），随机游走+若干尖峰
+    level = height * 0.65
+    peaks = {rng.randrange(width): rng.uniform(0.1, 0.35) for _ in range(6)}
+    for x in range(width):
+        level += rng.uniform(-2.0, 2.0)
+        level = min(max(level, height * 0.4), height * 0.9)
+        y = level - peaks.get(x, 0.0) * height
+        y = int(min(max(y, 0), height - 1))
+        for dy in range(-1, 2):
+            yy = min(max(y + dy, 0), height - 1)
+            rows[yy][x * 3:x * 3 + 3] = b"\x00\x00\xff"
+    return encode_png(width, height, [bytes(r) for r in rows], compress_level)
+
+
+def make_logo_png(width=160, height=48):
+    """生成固定的页眉Logo（所有报告共享同一份字节）"""
+    rows = []
+    for y in range(height):
+        row = bytearray()
+        for x in range(width):
+            if (x // 8 + y // 8) % 2:
+                row += b"\x00\x78\xd7"
+            else:
+                row += b"\xff\xff\xff"
+        rows.append(bytes(row))
+    return encode_png(width, height, rows)
+
+
+# ========== 表格数据 ==========
+def make_table_rows(rng, keyword, row_count):
+    """生成Frequency/QuasiPeak/Margin/Limit数据行（字符串，与报告格式一致）"""
+    band = "RE" if "_RE" in keyword else "ME"
+    f_low, f_high = FREQ_RANGE_MHZ[band]
+    freqs = sorted(math.exp(rng.uniform(math.log(f_low), math.log(f_high))) for _ in range(row_count))
+    rows = []
+    for freq in freqs:
+        limit = 40.0 if band == "RE" else 60.0
+        if band == "RE" and freq > 230:
+            limit = 47.0
+        quasi_peak = limit - rng.uniform(-2.0, 15.0)
+        margin = quasi_peak - limit
+        rows.append([f"{freq:.4f}", f"{quasi_peak:.2f}", f"{margin:.2f}", f"{limit:.2f}"])
+    return rows
+
+
+# ========== 生成单个文档 ==========
+def build_report(file_path, keyword, rng, pages=1, images=1, rows=6,
+                 plot_size=(800, 500), logo_png=None, plot_rng=None, plot_compress=6):
+    """
+    生成一个合成报告
+    :param pages: 页数（每页一组 标题+图片+表格）
+    :param images: 每页图片数量
+    :param rows: 每个表格的数据行数
+    :param plot_rng: 曲线图使用的随机源（默认与文档共用rng）
+    :param plot_compress: 曲线图PNG压缩级别（0为不压缩，模拟大尺寸截图/照片）
+    """
+    import io
+    from docx import Document
+    from docx.shared import Inches, Pt
+    from docx.enum.text import WD_BREAK
+
+    doc = Document()
+
+    # 页眉：Logo + 报告编号（所有文件Logo相同）
+    header = doc.sections[0].header
+    header_para = header.paragraphs[0]
+    if logo_png:
+        header_para.add_run().add_picture(io.BytesIO(logo_png), width=Inches(1.2))
+    header_para.add_run(f"  Test Report  No.{rng.randrange(10**6):06d}")
+
+    for page in range(pages):
+        doc.add_paragraph(f"{keyword} 测试报告 第{page + 1}页")
+        doc.add_paragraph("Final_Result")
+        for _ in range(images):
+            plot = make_plot_png(plot_rng or rng, plot_size[0], plot_size[1], plot_compress)
+            doc.add_paragraph().add_run().add_picture(io.BytesIO(plot), width=Inches(6.0))
+
+        table = doc.add_table(rows=rows + 1, cols=4)
+        table.style = "Table Grid"
+        for col, title in enumerate(TABLE_HEADERS):
+            table.cell(0, col).text = title
+        for r, values in enumerate(make_table_rows(rng, keyword, rows), 1):
+            for col, value in enumerate(values):
+                table.cell(r, col).text = value
+        # 让ME/RE关键词出现在正文中（按照条件添加表格工具依赖正文检测）
+        para = doc.add_paragraph(f"Mode: {keyword.split('_')[0]}  Band: {'RE' if '_RE' in keyword else 'ME'}")
+        para.runs[0].font.size = Pt(9)
+
+        if page < pages - 1:
+            doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+    doc.save(file_path)
+
+
+def generate_corpus(out_dir, count=50, pages=1, images=1, rows=6, seed=20240101,
+                    plot_size=(800, 500), prefix="Report", duplicate_plots=False, plot_compress=6, log=print):
+    """
+    批量生成合成语料
+    :param duplicate_plots: True时所有报告复用同一组曲线图（模拟大量重复图片）
+    :return: 生成的文件路径列表（按文件名排序）
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    logo = make_logo_png()
+    paths = []
+    for idx in range(count):
+        keyword = KEYWORDS[idx % len(KEYWORDS)]
+        rng = random.Random(seed + idx)
+        # 复用曲线时每个文件的曲线使用相同种子，曲线字节完全一致
+        plot_rng = random.Random(seed) if duplicate_plots else None
+        file_path = os.path.join(out_dir, f"{prefix}_{idx:05d}_{keyword}.docx")
+        build_report(file_path, keyword, rng, pages, images, rows, plot_size, logo, plot_rng, plot_compress)
+        paths.append(file_path)
+        if log and (idx + 1) % 50 == 0:
+            log(f"已生成 {idx + 1}/{count} 个文件")
+    return sorted(paths)
+
+
+def _parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成Word报告语料（基准测试用）")
+    parser.add_argument("out_dir", help="输出文件夹")
+    parser.add_argument("--count", type=int, default=50, help="文件数量")
+    parser.add_argument("--pages", type=int, default=1, help="每个文件页数")
+    parser.add_argument("--images", type=int, default=1, help="每页图片数")
+    parser.add_argument("--rows", type=int, default=6, help="表格数据行数")
+    parser.add_argument("--plot-size", default="800x500", help="曲线图尺寸，如 3000x2000")
+    parser.add_argument("--seed", type=int, default=20240101, help="随机种子")
+    parser.add_argument("--duplicate-plots", action="store_true", help="所有文件复用同一组曲线图")
+    parser.add_argument("--plot-compress", type=int, default=6, help="曲线图PNG压缩级别（0为不压缩）")
+    args = parser.parse_args()
+
+    files = generate_corpus(
+        args.out_dir, args.count, args.pages, args.images, args.rows, args.seed,
+        _parse_size(args.plot_size), duplicate_plots=args.duplicate_plots, plot_compress=args.plot_compress
+    )
+    print(f"✅ 已生成 {len(files)} 个文件：{os.path.abspath(args.out_dir)}")
+    sys.exit(0)
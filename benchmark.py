@@ -0,0 +1,871 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word批量工具基准测试套件 - Python 3.8.7
+功能：
+1. 用 bench_corpus.py 生成可复现的合成语料（或使用已有文件夹）
+2. 无界面调用各工具的核心方法（表格插入/列修改/图片表格移动/合并/PDF合并）
+3. 每个用例在独立子进程中运行，统计吞吐量、延迟分位数（p50/p90/p99）和峰值内存
+4. 结果可保存为JSON，并与上一次结果对比，直观看到性能回退/提升
+
+命令行用法：
+python benchmark.py --count 100 --pages 2                   # 生成语料并运行全部用例
+python benchmark.py --corpus D:\\语料 --cases 表格添加列 main合并
+python benchmark.py --json 本次.json --baseline 上次.json     # 与上次结果对比
+python benchmark.py --list                                  # 列出全部用例
+python benchmark.py --startup                               # 各工具启动到首次绘制的耗时
+python benchmark.py --media-dedup --count 200               # 图片大量重复的语料上对比合并媒体去重
+python benchmark.py --schedule --count 60 --workers 4       # 大小悬殊的语料上对比 FIFO / 最长优先 的总完成时间
+python benchmark.py --table-insert --tables 3               # 对比原插表方式与 table_insert 引擎（每个文档插3张表）
+python benchmark.py --lazy-open --plot-compress 0           # 对比完整加载与按需加载（lazy_package）的打开/保存耗时和内存
+python benchmark.py --shm-merge --plot-compress 0 --workers 4   # 对比单进程合并与多进程预读（pickle / 共享内存传输）
+python benchmark.py --remerge --count 500 --changed 1 5 20    # 修改少数报告后，对比完整合并与增量合并（merge_segments）
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+import subprocess
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ========== 峰值内存采样 ==========
+def current_rss():
+    """当前进程常驻内存（字节），psutil不可用时返回0"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return 0
+
+
+def os_peak_rss():
+    """操作系统记录的进程峰值内存（字节），取不到时返回0"""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # Windows 提供 peak_wset
+        if hasattr(info, "peak_wset"):
+            return info.peak_wset
+    except Exception:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux单位为KB，macOS为字节
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return 0
+
+
+class PeakRssSampler:
+    """后台线程定时采样RSS，记录区间内的峰值"""
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss(), os_peak_rss())
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+def percentile(values, pct):
+    """线性插值分位数（values无需排序）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100.0
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+# ========== 用例定义 ==========
+def _run_merge(tool, folder, output_path):
+    tool.folder_var.set(folder)
+    tool.output_var.set(output_path)
+    tool.merge_documents()
+
+
+def _run_pdf_merge(tool, pdf_files, output_path):
+    tool.merge_pdfs(pdf_files, output_path)
+
+
+def _build_cases():
+    """逐文件用例直接取自工具注册表（与工具箱调用方式一致），再加上合并类用例"""
+    from tool_registry import REGISTRY
+    cases = {
+        spec.name: (spec.file_name, "per_file", spec.runner)
+        for spec in REGISTRY.values() if spec.kind == "per_file"
+    }
+    cases.update({
+        "main合并": ("main.py", "merge", _run_merge),
+        "newGUI合并": ("new GUI.py", "merge", _run_merge),
+        "独立页码合并": ("合并多个word文档并且保持独立页码.py", "merge", _run_merge),
+        "PDF合并": ("大量word转PDF并且合并PDF.py", "pdf_merge", _run_pdf_merge),
+    })
+    return cases
+
+
+# kind: per_file = 逐文件原地修改；merge = 整个文件夹合并为一个docx；pdf_merge = 合并PDF
+CASES = _build_cases()
+
+
+def _list_docx(folder):
+    return sorted(
+        os.path.join(folder, f) for f in os.listdir(folder)
+        if f.lower().endswith(".docx") and not f.startswith("~$")
+    )
+
+
+def _make_pdfs(docx_files, pdf_dir):
+    """为PDF合并用例生成与语料数量相同的PDF（每个文件页数固定，不依赖Word）"""
+    from PyPDF2 import PdfWriter
+    os.makedirs(pdf_dir, exist_ok=True)
+    paths = []
+    for idx, _ in enumerate(docx_files):
+        writer = PdfWriter()
+        for _ in range(3):
+            writer.add_blank_page(width=595, height=842)
+        path = os.path.join(pdf_dir, f"{idx:05d}.pdf")
+        with open(path, "wb") as f:
+            writer.write(f)
+        paths.append(path)
+    return paths
+
+
+def run_case(name, corpus, repeat):
+    """
+    在当前进程中运行一个用例（由子进程调用）
+    :return: 结果字典
+    """
+    from headless import create_headless_tool
+
+    file_name, kind, runner = CASES[name]
+    files = _list_docx(corpus)
+    result = {"case": name, "tool": file_name, "kind": kind, "files": len(files), "repeat": repeat}
+
+    setup_start = time.perf_counter()
+    try:
+        tool = create_headless_tool(file_name)
+    except ImportError as e:
+        result["skipped"] = f"依赖缺失：{e}"
+        return result
+    result["setup_s"] = time.perf_counter() - setup_start
+
+    latencies = []
+    total = 0.0
+    work_root = tempfile.mkdtemp(prefix="word_bench_")
+    try:
+        with PeakRssSampler() as sampler:
+            for rep in range(repeat):
+                # 工具会原地修改文件，每轮使用新的语料副本
+                work = os.path.join(work_root, f"run{rep}")
+                shutil.copytree(corpus, work)
+                work_files = _list_docx(work)
+                if kind == "per_file":
+                    for path in work_files:
+                        start = time.perf_counter()
+                        runner(tool, path)
+                        latencies.append(time.perf_counter() - start)
+                        total += latencies[-1]
+                elif kind == "merge":
+                    output = os.path.join(work_root, f"merged{rep}.docx")
+                    start = time.perf_counter()
+                    runner(tool, work, output)
+                    latencies.append(time.perf_counter() - start)
+                    total += latencies[-1]
+                    result["output_bytes"] = os.path.getsize(output) if os.path.exists(output) else 0
+                else:
+                    pdfs = _make_pdfs(work_files, os.path.join(work, "pdf"))
+                    output = os.path.join(work_root, f"merged{rep}.pdf")
+                    start = time.perf_counter()
+                    runner(tool, pdfs, output)
+                    latencies.append(time.perf_counter() - start)
+                    total += latencies[-1]
+                shutil.rmtree(work, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    items = len(files) * repeat
+    result.update({
+        "total_s": total,
+        "throughput_files_s": items / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": sampler.peak / 1024 / 1024,
+        "errors": [m for m in tool.headless_logs if "❌" in m][:5],
+    })
+    return result
+
+
+def run_case_subprocess(name, corpus, repeat, timeout=None):
+    """在独立子进程中运行用例，保证峰值内存互不干扰"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-case", name,
+           "--corpus", corpus, "--repeat", str(repeat)]
+    proc = subprocess.run(cmd, cwd=TOOLS_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          timeout=timeout)
+    lines = proc.stdout.decode("utf-8", "replace").strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"case": name, "failed": proc.stderr.decode("utf-8", "replace")[-800:]}
+    return json.loads(lines[-1])
+
+
+# ========== 启动耗时 ==========
+# 启动阶段不应被导入的重型库
+HEAVY_MODULES = ("docx", "docxcompose", "lxml", "win32com", "pythoncom", "psutil", "PyPDF2")
+STARTUP_TARGET_MS = 300
+
+# 子进程探针：加载脚本 → 创建窗口 → 首次绘制，输出各阶段时间戳
+_STARTUP_PROBE = r"""
+import sys, time, json
+sys.path.insert(0, {tools_dir!r})
+from headless import load_tool_module, find_tool_class
+module = load_tool_module({file_name!r})
+imported = time.time()
+painted = None
+try:
+    import tkinter as tk
+    root = tk.Tk()
+    find_tool_class(module)(root)
+    root.update()
+    painted = time.time()
+    root.destroy()
+except Exception:
+    pass
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"imported": imported, "painted": painted, "heavy": heavy}}))
+"""
+
+
+def measure_startup(file_name, repeat=3):
+    """
+    测量工具从启动解释器到窗口首次绘制的耗时（取多次中位数）
+    无图形界面环境时只统计脚本加载耗时
+    """
+    import_ms, paint_ms, heavy = [], [], []
+    for _ in range(repeat):
+        code = _STARTUP_PROBE.format(tools_dir=TOOLS_DIR, file_name=file_name, heavy=HEAVY_MODULES)
+        start = time.time()
+        proc = subprocess.run([sys.executable, "-c", code], cwd=TOOLS_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lines = proc.stdout.decode("utf-8", "replace").strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            return {"tool": file_name, "failed": proc.stderr.decode("utf-8", "replace")[-400:]}
+        probe = json.loads(lines[-1])
+        import_ms.append((probe["imported"] - start) * 1000)
+        if probe["painted"]:
+            paint_ms.append((probe["painted"] - start) * 1000)
+        heavy = probe["heavy"]
+    return {
+        "tool": file_name,
+        "import_ms": percentile(import_ms, 50),
+        "first_paint_ms": percentile(paint_ms, 50) if paint_ms else None,
+        "heavy_loaded": heavy,
+    }
+
+
+def format_startup(results):
+    lines = [f"{'工具':<40}{'加载(ms)':>10}{'首次绘制(ms)':>14}  启动时已导入的重型库"]
+    for r in results:
+        if "failed" in r:
+            lines.append(f"{r['tool']:<40}  ⚠️  运行失败")
+            continue
+        paint = r["first_paint_ms"]
+        mark = "" if paint is None else (" ✅" if paint <= STARTUP_TARGET_MS else " ❌")
+        paint_text = "无图形界面" if paint is None else f"{paint:.0f}{mark}"
+        lines.append(f"{r['tool']:<40}{r['import_ms']:>10.0f}{paint_text:>14}  {', '.join(r['heavy_loaded']) or '无'}")
+    return "\n".join(lines)
+
+
+# ========== 合并媒体去重对比 ==========
+def _merge_with(composer_cls, docx_files, output_path):
+    from docx import Document
+    master_doc = Document(docx_files[0])
+    composer = composer_cls(master_doc)
+    for file_path in docx_files[1:]:
+        composer.append(Document(file_path))
+    composer.save(output_path)
+    media = [p for p in composer.pkg.iter_parts() if p.partname.startswith("/word/media/")]
+    return composer, len(media)
+
+
+def bench_media_dedup(corpus):
+    """同一语料分别用原生 Composer 和 MergeComposer 合并，对比耗时、输出大小、媒体部件数"""
+    from docxcompose.composer import Composer
+    from merge_engine import MergeComposer
+    docx_files = _list_docx(corpus)
+    out_dir = tempfile.mkdtemp(prefix="word_bench_dedup_")
+    results = []
+    try:
+        for label, composer_cls in (("Composer", Composer), ("MergeComposer", MergeComposer)):
+            output_path = os.path.join(out_dir, f"{label}.docx")
+            start = time.perf_counter()
+            composer, media_parts = _merge_with(composer_cls, docx_files, output_path)
+            elapsed = time.perf_counter() - start
+            result = {
+                "engine": label,
+                "files": len(docx_files),
+                "seconds": round(elapsed, 3),
+                "output_mb": round(os.path.getsize(output_path) / 1024 / 1024, 2),
+                "media_parts": media_parts,
+            }
+            if isinstance(composer, MergeComposer):
+                result.update(composer.media_stats())
+            results.append(result)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def format_media_dedup(results):
+    lines = [f"{'合并引擎':<16}{'文件':>6}{'耗时(s)':>10}{'输出(MB)':>10}{'媒体部件':>10}{'复用':>8}{'节省(MB)':>10}"]
+    for r in results:
+        saved = r.get("bytes_saved")
+        lines.append(f"{r['engine']:<16}{r['files']:>6}{r['seconds']:>10.2f}{r['output_mb']:>10.2f}"
+                     f"{r['media_parts']:>10}{r.get('media_reused', '-'):>8}"
+                     f"{'-' if saved is None else f'{saved / 1024 / 1024:.2f}':>10}")
+    return "\n".join(lines)
+
+
+# ========== 调度顺序对比（FIFO / LPT） ==========
+SCHEDULE_OP = "表格添加列"
+
+
+def generate_skewed_corpus(out_dir, count, pages, images, plot_size):
+    """大小悬殊的语料：约5%的大报告（页数×100），文件名排在最后（FIFO的最坏情况）"""
+    from bench_corpus import generate_corpus
+    large = max(1, count // 20)
+    generate_corpus(out_dir, count - large, pages, images, plot_size=plot_size, log=None)
+    generate_corpus(out_dir, large, pages * 100, images, plot_size=plot_size, prefix="Zlarge", log=None)
+
+
+def bench_schedule(corpus, workers):
+    """
+    同一语料分别按 FIFO / LPT 顺序并行执行同一操作，对比实测总完成时间（makespan）
+    以及按成本估算模拟的总完成时间
+    """
+    from scheduler import estimate_costs, lpt_order, simulate_makespan
+    from tool_registry import ToolServices
+    docx_files = _list_docx(corpus)
+    start = time.perf_counter()
+    costs = [c["cost"] for c in estimate_costs(docx_files)]
+    estimate_ms = (time.perf_counter() - start) * 1000
+    lower_bound = max(sum(costs) / workers, max(costs))
+    results = []
+    for mode in ("fifo", "lpt"):
+        work_dir = tempfile.mkdtemp(prefix=f"word_bench_{mode}_")
+        warm_dir = os.path.join(work_dir, "warm")
+        try:
+            os.makedirs(warm_dir)
+            for i in range(workers * 4):
+                shutil.copy2(docx_files[0], os.path.join(warm_dir, f"warm_{i}.docx"))
+            for path in docx_files:
+                shutil.copy2(path, work_dir)
+            services = ToolServices(log=lambda message: None, max_workers=workers, schedule=mode)
+            # 先拉起工作进程并加载工具，进程启动和工具加载不计入
+            services.run_operation(SCHEDULE_OP, warm_dir)
+            start = time.perf_counter()
+            success, fail = services.run_operation(SCHEDULE_OP, work_dir)
+            elapsed = time.perf_counter() - start
+            services.shutdown()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        order = lpt_order(docx_files, costs) if mode == "lpt" else None
+        results.append({
+            "schedule": mode,
+            "files": len(docx_files),
+            "workers": workers,
+            "seconds": round(elapsed, 3),
+            "failed": fail,
+            "simulated_ratio": round(simulate_makespan(costs, workers, order) / lower_bound, 3),
+            "estimate_ms": round(estimate_ms, 1),
+        })
+    return results
+
+
+def format_schedule(results):
+    lines = [f"{'调度':<8}{'文件':>6}{'进程':>6}{'总耗时(s)':>12}{'模拟/下界':>12}{'估算(ms)':>10}"]
+    for r in results:
+        lines.append(f"{r['schedule']:<8}{r['files']:>6}{r['workers']:>6}{r['seconds']:>12.2f}"
+                     f"{r['simulated_ratio']:>12.2f}{r['estimate_ms']:>10.1f}")
+    fifo, lpt = results[0]["seconds"], results[-1]["seconds"]
+    if lpt:
+        lines.append(f"LPT 相对 FIFO：{fifo / lpt:.2f}x")
+    return "\n".join(lines)
+
+
+# ========== 插表方式对比（原方式 / table_insert 引擎） ==========
+TABLE_INSERT_SPEC = (("试验供电电源：380V AC/50Hz", "试验频率范围：150kHz-30MHz"), ("样品运行模式：1",))
+
+
+def _legacy_insert_table(doc, spec, index, blank_after):
+    """原工具的插表方式：文档末尾 add_table → 逐格设置 → 摘下表格插到 index → 空白段落逐个移动"""
+    from docx.enum.table import WD_TABLE_ALIGNMENT, WD_CELL_VERTICAL_ALIGNMENT
+    from docx.oxml.shared import OxmlElement, qn
+    from docx.shared import Inches, Pt
+    table = doc.add_table(rows=len(spec.rows), cols=spec.cols)
+    table.alignment = WD_TABLE_ALIGNMENT.LEFT
+    for row in table.rows:
+        for col_idx, width in enumerate(spec.col_widths_in):
+            row.cells[col_idx].width = Inches(width)
+    for row_idx, first, last in spec.merges:
+        table.cell(row_idx, first).merge(table.cell(row_idx, last))
+    for row in table.rows:
+        for cell in row.cells:
+            tc_pr = cell._tc.get_or_add_tcPr()
+            for border_name in ("top", "bottom", "left", "right"):
+                border = OxmlElement(f"w:{border_name}")
+                for key, value in (("val", "single"), ("sz", "4"), ("color", "000000"), ("space", "0")):
+                    border.set(qn(f"w:{key}"), value)
+                tc_pr.append(border)
+            cell.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+    for row_idx, texts in enumerate(spec.rows):
+        for col_idx, text in enumerate(texts):
+            table.cell(row_idx, col_idx).text = text
+    for row in table.rows:
+        for cell in row.cells:
+            for para in cell.paragraphs:
+                for run in para.runs:
+                    run.font.name = "宋体"
+                    run.font.size = Pt(10)
+    body = doc._body._element
+    table_elem = table._tbl
+    body.remove(table_elem)
+    body.insert(index, table_elem)
+    for _ in range(blank_after):
+        para_elem = doc.add_paragraph("")._p
+        body.remove(para_elem)
+        body.insert(body.index(table_elem) + 1, para_elem)
+
+
+def bench_table_insert(corpus, tables):
+    """
+    同一语料分别用原插表方式（逐张插入）和 table_insert.insert_tables（一次批量插入）
+    在每个文档第二行起插入 tables 张表格，只计插入耗时（打开/保存不计）
+    """
+    from docx import Document
+    from rule_config import TableSpec
+    from table_insert import Insertion, at_index, BlankLines, HEADER_STYLE, insert_tables
+    spec = TableSpec(rows=TABLE_INSERT_SPEC, cols=2, merges=((1, 0, 1),), col_widths_in=(3.0, 3.0))
+    docx_files = _list_docx(corpus)
+    results = []
+    for label in ("原方式", "table_insert"):
+        latencies = []
+        for path in docx_files:
+            doc = Document(path)
+            start = time.perf_counter()
+            if label == "原方式":
+                # 逐张插入：后一张插在前一张（及其空白行）之后
+                for idx in range(tables):
+                    _legacy_insert_table(doc, spec, 1 + idx * 3, 2)
+            else:
+                insert_tables(doc, [Insertion(at_index(1), spec, HEADER_STYLE, BlankLines(after=2))] * tables)
+            latencies.append(time.perf_counter() - start)
+        total = sum(latencies)
+        results.append({
+            "method": label,
+            "files": len(docx_files),
+            "tables": tables,
+            "total_ms": round(total * 1000, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        })
+    return results
+
+
+def format_table_insert(results):
+    lines = [f"{'插表方式':<16}{'文件':>6}{'表/文件':>8}{'总耗时(ms)':>12}{'p50(ms)':>10}{'p99(ms)':>10}"]
+    for r in results:
+        lines.append(f"{r['method']:<16}{r['files']:>6}{r['tables']:>8}{r['total_ms']:>12.1f}"
+                     f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    old, new = results[0]["total_ms"], results[-1]["total_ms"]
+    if new:
+        lines.append(f"table_insert 相对原方式：{old / new:.2f}x")
+    return "\n".join(lines)
+
+
+# ========== 完整加载 / 按需加载对比 ==========
+def bench_lazy_open(corpus):
+    """
+    同一语料分别用 docx.Document 和 lazy_package.open_document 打开、改一个表格单元格、另存，
+    统计打开耗时、打开+保存耗时和打开后的Python内存峰值（tracemalloc，图片字节都计入）
+    """
+    import tracemalloc
+    from docx import Document
+    from lazy_package import open_document
+    docx_files = _list_docx(corpus)
+    out_dir = tempfile.mkdtemp(prefix="word_bench_lazy_")
+    results = []
+    try:
+        for label, opener in (("docx.Document", Document), ("open_document", open_document)):
+            open_s, total_s, peaks = [], [], []
+            for idx, path in enumerate(docx_files):
+                tracemalloc.start()
+                start = time.perf_counter()
+                doc = opener(path)
+                open_s.append(time.perf_counter() - start)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                if doc.tables:
+                    doc.tables[0].cell(0, 0).text = "bench"
+                doc.save(os.path.join(out_dir, f"{idx:05d}.docx"))
+                total_s.append(time.perf_counter() - start)
+            results.append({
+                "loader": label,
+                "files": len(docx_files),
+                "input_mb": round(sum(os.path.getsize(p) for p in docx_files) / 1024 / 1024, 2),
+                "open_ms_p50": round(percentile(open_s, 50) * 1000, 2),
+                "open_save_ms_p50": round(percentile(total_s, 50) * 1000, 2),
+                "peak_mb_p50": round(percentile(peaks, 50) / 1024 / 1024, 2),
+                "total_s": round(sum(total_s), 3),
+            })
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def format_lazy_open(results):
+    lines = [f"{'加载方式':<16}{'文件':>6}{'输入(MB)':>10}{'打开p50(ms)':>13}{'打开+保存p50(ms)':>18}"
+             f"{'内存峰值p50(MB)':>17}{'总耗时(s)':>11}"]
+    for r in results:
+        lines.append(f"{r['loader']:<16}{r['files']:>6}{r['input_mb']:>10.2f}{r['open_ms_p50']:>13.2f}"
+                     f"{r['open_save_ms_p50']:>18.2f}{r['peak_mb_p50']:>17.2f}{r['total_s']:>11.2f}")
+    return "\n".join(lines)
+
+
+# ========== 多进程预读传输对比 ==========
+def _merge_fed(docx_files, output_path, workers, transport):
+    from merge_engine import MergeComposer
+    from shm_transport import ParallelFeeder
+    with ParallelFeeder(docx_files, workers=workers, transport=transport) as feeder:
+        composer = MergeComposer(next(feeder)[0])
+        composer.known_digest = feeder.digest
+        for doc, lease in feeder:
+            composer.append(doc)
+            feeder.keep(composer.take_new_parts())
+            lease.release()
+        composer.save(output_path)
+        return feeder.store.bytes_total, feeder.store.bytes_inline
+
+
+def bench_shm_merge(corpus, workers):
+    """同一语料分别单进程合并、多进程预读（部件随结果pickle传回 / 经共享内存传回）后合并，对比总耗时"""
+    from docx import Document
+    from merge_engine import MergeComposer
+    docx_files = _list_docx(corpus)
+    out_dir = tempfile.mkdtemp(prefix="word_bench_shm_")
+    results = []
+    try:
+        for label in ("单进程", "pickle", "shm"):
+            output_path = os.path.join(out_dir, f"{label}.docx")
+            start = time.perf_counter()
+            shm_bytes = inline_bytes = 0
+            if label == "单进程":
+                _merge_with(MergeComposer, docx_files, output_path)
+            else:
+                shm_bytes, inline_bytes = _merge_fed(docx_files, output_path, workers, label)
+            elapsed = time.perf_counter() - start
+            results.append({
+                "mode": label,
+                "files": len(docx_files),
+                "workers": 1 if label == "单进程" else workers,
+                "seconds": round(elapsed, 3),
+                "shm_mb": round(shm_bytes / 1024 / 1024, 2),
+                "pickled_mb": round(inline_bytes / 1024 / 1024, 2),
+                "output_mb": round(os.path.getsize(output_path) / 1024 / 1024, 2),
+            })
+        Document(os.path.join(out_dir, "shm.docx"))  # 输出可正常打开
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def format_shm_merge(results):
+    lines = [f"{'方式':<10}{'文件':>6}{'进程':>6}{'耗时(s)':>10}{'共享内存(MB)':>14}{'pickle(MB)':>12}{'输出(MB)':>10}"]
+    for r in results:
+        lines.append(f"{r['mode']:<10}{r['files']:>6}{r['workers']:>6}{r['seconds']:>10.2f}"
+                     f"{r['shm_mb']:>14.2f}{r['pickled_mb']:>12.2f}{r['output_mb']:>10.2f}")
+    return "\n".join(lines)
+
+
+# ========== 完整合并 / 增量合并对比 ==========
+def bench_remerge(corpus, changed_counts):
+    """
+    在语料副本上完整合并（写分段记录），然后每轮修改 n 个报告（均匀分布），
+    分别用增量合并和完整合并得到新结果，对比耗时
+    """
+    from docx import Document
+    from merge_engine import MergeComposer
+    from merge_segments import SegmentRecorder, remerge
+    work = tempfile.mkdtemp(prefix="word_bench_remerge_")
+    src = os.path.join(work, "src")
+    shutil.copytree(corpus, src)
+    docx_files = _list_docx(src)
+    output_path = os.path.join(work, "merged.docx")
+
+    def full_merge(path):
+        composer = MergeComposer(Document(docx_files[0]))
+        recorder = SegmentRecorder(composer, src)
+        recorder.add_master(docx_files[0])
+        for file_path in docx_files[1:]:
+            recorder.append(Document(file_path), file_path)
+        composer.save(path)
+        recorder.save(path)
+
+    results = []
+    try:
+        full_merge(output_path)
+        for count in changed_counts:
+            count = max(1, min(count, len(docx_files) - 1))
+            step = (len(docx_files) - 1) / count
+            for i in range(count):
+                path = docx_files[1 + int(i * step)]
+                doc = Document(path)
+                doc.add_paragraph(f"bench 修改 {time.time()}")
+                doc.save(path)
+            start = time.perf_counter()
+            result = remerge(output_path, docx_files, src)
+            incremental_s = time.perf_counter() - start
+            start = time.perf_counter()
+            full_merge(os.path.join(work, "full.docx"))
+            full_s = time.perf_counter() - start
+            results.append({
+                "files": len(docx_files),
+                "changed": count,
+                "replaced": result.changed if result else None,
+                "full_s": round(full_s, 3),
+                "incremental_s": round(incremental_s, 3),
+            })
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def format_remerge(results):
+    lines = [f"{'文件':>6}{'修改':>6}{'完整合并(s)':>13}{'增量合并(s)':>13}{'加速':>8}"]
+    for r in results:
+        speedup = f"{r['full_s'] / r['incremental_s']:.1f}x" if r["incremental_s"] else "-"
+        lines.append(f"{r['files']:>6}{r['changed']:>6}{r['full_s']:>13.2f}{r['incremental_s']:>13.2f}{speedup:>8}")
+    return "\n".join(lines)
+
+
+# ========== 结果输出 ==========
+def format_results(results, baseline=None):
+    """格式化结果表格；提供baseline时附加吞吐量变化百分比"""
+    base = {r["case"]: r for r in (baseline or [])}
+    lines = [f"{'用例':<22}{'文件':>6}{'吞吐(个/s)':>12}{'p50(ms)':>10}{'p90(ms)':>10}"
+             f"{'p99(ms)':>10}{'峰值内存(MB)':>14}{'对比':>10}"]
+    for r in results:
+        if "skipped" in r or "failed" in r:
+            lines.append(f"{r['case']:<22}  ⚠️  {r.get('skipped') or '运行失败'}")
+            continue
+        delta = ""
+        old = base.get(r["case"])
+        if old and old.get("throughput_files_s"):
+            change = (r["throughput_files_s"] / old["throughput_files_s"] - 1) * 100
+            delta = f"{change:+.1f}%"
+        lines.append(f"{r['case']:<22}{r['files']:>6}{r['throughput_files_s']:>12.2f}{r['p50_ms']:>10.1f}"
+                     f"{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['peak_rss_mb']:>14.1f}{delta:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Word批量工具基准测试")
+    parser.add_argument("--corpus", help="已有语料文件夹（为空时自动生成）")
+    parser.add_argument("--count", type=int, default=40, help="自动生成语料的文件数")
+    parser.add_argument("--pages", type=int, default=1, help="自动生成语料的每文件页数")
+    parser.add_argument("--images", type=int, default=1, help="自动生成语料的每页图片数")
+    parser.add_argument("--plot-size", default="800x500", help="自动生成语料的曲线图尺寸")
+    parser.add_argument("--plot-compress", type=int, default=6, help="自动生成语料的曲线图PNG压缩级别（0为不压缩）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例重复轮数")
+    parser.add_argument("--cases", nargs="*", help="只运行指定用例")
+    parser.add_argument("--json", help="结果保存路径")
+    parser.add_argument("--baseline", help="对比用的历史结果JSON")
+    parser.add_argument("--list", action="store_true", help="列出全部用例")
+    parser.add_argument("--startup", action="store_true", help="测量各工具启动到首次绘制的耗时")
+    parser.add_argument("--media-dedup", action="store_true",
+                        help="在图片大量重复的语料上对比合并时的媒体去重")
+    parser.add_argument("--schedule", action="store_true",
+                        help="在大小悬殊的语料上对比 FIFO / 最长优先 调度的总完成时间")
+    parser.add_argument("--workers", type=int, default=4, help="调度对比/多进程预读对比使用的工作进程数")
+    parser.add_argument("--table-insert", action="store_true",
+                        help="对比原插表方式与 table_insert 引擎的插入耗时")
+    parser.add_argument("--tables", type=int, default=1, help="插表对比中每个文档插入的表格数")
+    parser.add_argument("--lazy-open", action="store_true",
+                        help="对比完整加载与按需加载（图片不读入内存）的打开/保存耗时和内存")
+    parser.add_argument("--shm-merge", action="store_true",
+                        help="对比单进程合并与多进程预读（部件经pickle / 共享内存传输）的合并耗时")
+    parser.add_argument("--remerge", action="store_true",
+                        help="修改少数报告后对比完整合并与增量合并的耗时")
+    parser.add_argument("--changed", type=int, nargs="*", default=[1, 5, 20], help="增量合并对比中每轮修改的报告数")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (file_name, kind, _) in CASES.items():
+            print(f"{name:<22}{kind:<10}{file_name}")
+        return 0
+
+    if args.startup:
+        tool_files = sorted({file_name for file_name, _, _ in CASES.values()} | {"Rtf to .docx.py"})
+        results = [measure_startup(file_name, max(args.repeat, 3)) for file_name in tool_files]
+        print(format_startup(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "startup": results},
+                          f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.corpus, args.repeat), ensure_ascii=False))
+        return 0
+
+    corpus = args.corpus
+    tmp_corpus = None
+    if not corpus:
+        from bench_corpus import generate_corpus, _parse_size
+        tmp_corpus = tempfile.mkdtemp(prefix="word_corpus_")
+        print(f"📦 生成合成语料：{args.count}个文件 × {args.pages}页 → {tmp_corpus}")
+        if args.schedule:
+            generate_skewed_corpus(tmp_corpus, args.count, args.pages, args.images, _parse_size(args.plot_size))
+        else:
+            # 媒体去重对比使用完全相同的曲线图（模拟同一参考图被大量报告引用）
+            generate_corpus(tmp_corpus, args.count, args.pages, args.images,
+                            plot_size=_parse_size(args.plot_size), duplicate_plots=args.media_dedup,
+                            plot_compress=args.plot_compress)
+        corpus = tmp_corpus
+
+    if args.schedule:
+        try:
+            results = bench_schedule(corpus, max(1, args.workers))
+        finally:
+            if tmp_corpus:
+                shutil.rmtree(tmp_corpus, ignore_errors=True)
+        print()
+        print(format_schedule(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                           "schedule": results}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.lazy_open:
+        try:
+            results = bench_lazy_open(corpus)
+        finally:
+            if tmp_corpus:
+                shutil.rmtree(tmp_corpus, ignore_errors=True)
+        print()
+        print(format_lazy_open(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                           "lazy_open": results}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.remerge:
+        try:
+            results = bench_remerge(corpus, args.changed or [1])
+        finally:
+            if tmp_corpus:
+                shutil.rmtree(tmp_corpus, ignore_errors=True)
+        print()
+        print(format_remerge(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                           "remerge": results}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.shm_merge:
+        try:
+            results = bench_shm_merge(corpus, max(1, args.workers))
+        finally:
+            if tmp_corpus:
+                shutil.rmtree(tmp_corpus, ignore_errors=True)
+        print()
+        print(format_shm_merge(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                           "shm_merge": results}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.table_insert:
+        try:
+            results = bench_table_insert(corpus, max(1, args.tables))
+        finally:
+            if tmp_corpus:
+                shutil.rmtree(tmp_corpus, ignore_errors=True)
+        print()
+        print(format_table_insert(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                           "table_insert": results}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.media_dedup:
+        try:
+            results = bench_media_dedup(corpus)
+        finally:
+            if tmp_corpus:
+                shutil.rmtree(tmp_corpus, ignore_errors=True)
+        print()
+        print(format_media_dedup(results))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                           "media_dedup": results}, f, ensure_ascii=False, indent=2)
+        return 0
+
+    results = []
+    try:
+        for name in args.cases or list(CASES):
+            if name not in CASES:
+                print(f"⚠️  未知用例：{name}")
+                continue
+            print(f"▶ 运行用例：{name}")
+            results.append(run_case_subprocess(name, corpus, args.repeat))
+    finally:
+        if tmp_corpus:
+            shutil.rmtree(tmp_corpus, ignore_errors=True)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print()
+    print(format_results(results, baseline))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "corpus": args.corpus,
+                       "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存：{args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
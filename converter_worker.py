@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+Word转换工作进程 + 看门狗（RTF→DOCX、Word→PDF共用）
+原理：
+1. 每个工作进程独占一个 Word 实例（DispatchEx），连续转换多个文件，启动时记下该 Word 的PID
+2. 主进程给每个文件设置超时，并用 psutil 监控工作进程 + 其 Word 进程的内存（RSS）和CPU时间：
+   - 超时 / 内存超限 / CPU长时间不动（通常是隐藏对话框卡住）时，只按PID结束这一个工作进程和它的Word
+   - 随后重启工作进程（重新预热），继续处理后面的文件
+3. 同一文件被强制结束超过 max_retries 次，判定为「毒文件」，移入隔离文件夹并记录原因，不再拖住整批任务
+4. 工作进程处理 max_tasks 个文件后主动回收，防止Word内存持续增长
+
+依赖：pip install pywin32 psutil（仅Windows + 已安装Microsoft Word）
+
+用法：
+    pool = ConverterPool(workers=2, timeout=180)
+    for result in pool.run_batch([(rtf_path, docx_path, "rtf_to_docx"), ...]):
+        log(result.message())
+    pool.close()
+"""
+import os
+import time
+import queue
+import shutil
+import datetime
+import threading
+import multiprocessing
+
+from scheduler import lpt_order
+
+# Word常量（直接用数值）
+WD_ALERTS_NONE = 0
+WD_FORMAT_XML_DOCUMENT = 16
+WD_FORMAT_PDF = 17
+WD_WORD_2016 = 15
+MSO_AUTOMATION_SECURITY_FORCE_DISABLE = 3
+WD_DO_NOT_SAVE_CHANGES = 0
+
+QUARANTINE_FOLDER = "_隔离文件"
+
+
+# ========== 工作进程内的转换函数 ==========
+def _convert_rtf_to_docx(word, src, dst):
+    doc = word.Documents.Open(FileName=src, ConfirmConversions=False, ReadOnly=True,
+                              AddToRecentFiles=False, Visible=False)
+    try:
+        doc.SaveAs2(FileName=dst, FileFormat=WD_FORMAT_XML_DOCUMENT, CompatibilityMode=WD_WORD_2016)
+    finally:
+        doc.Close(SaveChanges=WD_DO_NOT_SAVE_CHANGES)
+
+
+def _convert_to_pdf(word, src, dst):
+    doc = word.Documents.Open(FileName=src, ConfirmConversions=False, ReadOnly=True,
+                              AddToRecentFiles=False, Visible=False)
+    try:
+        doc.SaveAs(dst, FileFormat=WD_FORMAT_PDF)
+    finally:
+        doc.Close(SaveChanges=WD_DO_NOT_SAVE_CHANGES)
+
+
+CONVERTERS = {
+    "rtf_to_docx": _convert_rtf_to_docx,
+    "pdf": _convert_to_pdf,
+}
+
+
+def _start_word():
+    """启动独立的Word实例，返回 (word, PID)"""
+    import psutil
+    import win32com.client
+    before = {p.pid for p in psutil.process_iter(["name"]) if (p.info["name"] or "").upper() == "WINWORD.EXE"}
+    started = time.time()
+    word = win32com.client.DispatchEx("Word.Application")
+    word.Visible = False
+    word.DisplayAlerts = WD_ALERTS_NONE
+    word.AutomationSecurity = MSO_AUTOMATION_SECURITY_FORCE_DISABLE
+    return word, _find_word_pid(word, before, started)
+
+
+def _find_word_pid(word, before, started):
+    """
+    找到本实例对应的 WINWORD.EXE 的PID
+    优先：设置唯一窗口标题后按标题找窗口 → PID；否则取启动后新出现的、当前用户的Word进程
+    """
+    try:
+        import win32gui
+        import win32process
+        caption = f"converter-worker-{os.getpid()}-{started}"
+        word.Caption = caption
+        hwnd = win32gui.FindWindow("OpusApp", caption)
+        if hwnd:
+            return win32process.GetWindowThreadProcessId(hwnd)[1]
+    except Exception:
+        pass
+    import psutil
+    user = psutil.Process().username()
+    for proc in psutil.process_iter(["name", "create_time", "username"]):
+        if ((proc.info["name"] or "").upper() == "WINWORD.EXE" and proc.pid not in before
+                and proc.info["username"] == user and proc.info["create_time"] >= started - 1):
+            return proc.pid
+    return None
+
+
+def _create_time(pid):
+    """进程创建时间，用于确认PID没有被系统复用；进程已不存在时返回None"""
+    import psutil
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.Error:
+        return None
+
+
+def _worker_main(conn):
+    """工作进程主循环：收到 (kind, src, dst) 就转换，收到 None 退出"""
+    import pythoncom
+    pythoncom.CoInitialize()
+    word = None
+    try:
+        try:
+            word, word_pid = _start_word()
+        except Exception as e:
+            conn.send(("error", f"启动Word失败：{e}"))
+            return
+        conn.send(("ready", word_pid))
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            kind, src, dst = task
+            try:
+                CONVERTERS[kind](word, src, dst)
+                if os.path.exists(dst) and os.path.getsize(dst) > 0:
+                    conn.send(("ok", ""))
+                else:
+                    conn.send(("fail", "转换后文件无效"))
+            except Exception as e:
+                conn.send(("fail", str(e)))
+    finally:
+        if word is not None:
+            try:
+                word.Quit(SaveChanges=WD_DO_NOT_SAVE_CHANGES)
+            except Exception:
+                pass
+        pythoncom.CoUninitialize()
+
+
+# ========== 主进程侧 ==========
+class ConvertResult:
+    def __init__(self, src, dst, ok, error="", attempts=1, quarantined=None, seconds=0.0):
+        self.src = src
+        self.dst = dst
+        self.ok = ok
+        self.error = error
+        self.attempts = attempts
+        self.quarantined = quarantined  # 隔离后的路径
+        self.seconds = seconds
+
+    def message(self):
+        name = os.path.basename(self.src)
+        if self.ok:
+            retry = f"（第{self.attempts}次尝试）" if self.attempts > 1 else ""
+            return f"✅ 转换成功：{name} → {os.path.basename(self.dst)}（{self.seconds:.1f}s）{retry}"
+        if self.quarantined:
+            return f"☣️ 已隔离：{name}（{self.error}，已尝试{self.attempts}次）→ {self.quarantined}"
+        return f"❌ 转换失败：{name} - {self.error}"
+
+
+class _WorkerHandle:
+    """一个工作进程及其Word实例，负责看门狗监控"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.process = None
+        self.conn = None
+        self.word_pid = None
+        self.tasks_done = 0
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        self.conn = parent_conn
+        self.tasks_done = 0
+        if not parent_conn.poll(self.pool.start_timeout):
+            self.kill()
+            raise RuntimeError("工作进程启动超时（Word未响应）")
+        status, value = parent_conn.recv()
+        if status != "ready":
+            self.kill()
+            raise RuntimeError(value)
+        self.word_pid = value
+        if value:
+            self.pool._word_pids[value] = _create_time(value)
+
+    def _processes(self):
+        import psutil
+        procs = []
+        for pid in (self.process.pid if self.process else None, self.word_pid):
+            if pid:
+                try:
+                    procs.append(psutil.Process(pid))
+                except psutil.NoSuchProcess:
+                    pass
+        return procs
+
+    def _usage(self):
+        """(RSS字节, CPU秒) —— 工作进程 + Word进程之和"""
+        import psutil
+        rss = cpu = 0.0
+        for proc in self._processes():
+            try:
+                rss += proc.memory_info().rss
+                times = proc.cpu_times()
+                cpu += times.user + times.system
+            except psutil.Error:
+                pass
+        return rss, cpu
+
+    def convert(self, kind, src, dst):
+        """
+        转换一个文件并监控
+        :return: (是否成功, 错误信息, 是否被看门狗强制结束)
+        """
+        pool = self.pool
+        if self.process is None or not self.process.is_alive():
+            self.start()
+        self.conn.send((kind, src, dst))
+        started = last_progress = time.time()
+        _, last_cpu = self._usage()
+        reason = None
+        while not self.conn.poll(pool.poll_interval):
+            now = time.time()
+            rss, cpu = self._usage()
+            if cpu - last_cpu > pool.cpu_epsilon:
+                last_cpu, last_progress = cpu, now
+            if not self.process.is_alive():
+                reason = "工作进程意外退出"
+            elif now - started > pool.timeout:
+                reason = f"超时（>{pool.timeout}s）"
+            elif pool.max_rss_mb and rss > pool.max_rss_mb * 1024 * 1024:
+                reason = f"内存超限（{rss / 1024 / 1024:.0f}MB）"
+            elif now - last_progress > pool.stall_timeout:
+                reason = f"{pool.stall_timeout}s无CPU活动（可能卡在隐藏对话框）"
+            if reason:
+                self.kill()
+                return False, reason, True
+        try:
+            status, error = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            return False, "工作进程连接中断", True
+        self.tasks_done += 1
+        if self.tasks_done >= pool.max_tasks:
+            self.stop()  # 定期回收，下个文件重新启动
+        return status == "ok", error, False
+
+    def stop(self):
+        """正常退出（工作进程自己关闭Word）"""
+        if self.process is not None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+                self.process.join(10)
+            except (OSError, EOFError):
+                pass
+        if self.process is not None and self.process.is_alive():
+            self.kill()
+        self._reset()
+
+    def kill(self):
+        """只按PID结束本工作进程和它的Word，不影响其他Word"""
+        for proc in self._processes():
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        if self.process is not None:
+            self.process.join(5)
+        self._reset()
+
+    def _reset(self):
+        self.pool._word_pids.pop(self.word_pid, None)
+        self.process = None
+        self.conn = None
+        self.word_pid = None
+
+
+class ConverterPool:
+    """带看门狗的转换进程池"""
+
+    def __init__(self, workers=1, timeout=180, stall_timeout=60, max_rss_mb=2048, max_retries=2,
+                 max_tasks=200, quarantine_dir=None, start_timeout=60, schedule="lpt"):
+        """
+        :param workers: 工作进程数（每个一个Word实例）
+        :param timeout: 单个文件最长转换时间（秒）
+        :param stall_timeout: CPU时间持续不增长多少秒判定为卡死
+        :param max_rss_mb: 工作进程+Word内存上限（MB，0表示不限制）
+        :param max_retries: 被强制结束后重试次数，超过则隔离
+        :param max_tasks: 每个工作进程处理多少文件后回收
+        :param quarantine_dir: 隔离文件夹（默认为源文件所在目录下的「_隔离文件」）
+        :param schedule: 多进程时的分发顺序，"lpt"=估算成本大的先转换（见 scheduler.py），"fifo"=按任务顺序
+        """
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.max_rss_mb = max_rss_mb
+        self.max_retries = max_retries
+        self.max_tasks = max_tasks
+        self.quarantine_dir = quarantine_dir
+        self.start_timeout = start_timeout
+        self.schedule = schedule
+        self.poll_interval = 0.5
+        self.cpu_epsilon = 0.05
+        self._word_pids = {}  # Word进程PID -> 创建时间
+        self._handles = [_WorkerHandle(self) for _ in range(self.workers)]
+
+    @property
+    def word_pids(self):
+        """本池启动的、仍在运行的Word进程PID"""
+        return set(self._word_pids)
+
+    def word_processes(self):
+        """
+        本池启动的、仍在运行的Word进程（psutil.Process）
+        按PID找到后再比较创建时间，PID已被系统复用给其他进程时不返回
+        """
+        import psutil
+        procs = []
+        for pid, created in list(self._word_pids.items()):
+            try:
+                proc = psutil.Process(pid)
+                if created is not None and proc.create_time() == created:
+                    procs.append(proc)
+            except psutil.Error:
+                pass
+        return procs
+
+    def _convert_with_retry(self, handle, kind, src, dst, original=None):
+        started = time.time()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                ok, error, killed = handle.convert(kind, src, dst)
+            except RuntimeError as e:
+                return ConvertResult(src, dst, False, str(e), attempts, seconds=time.time() - started)
+            if ok or not killed:
+                return ConvertResult(src, dst, ok, error, attempts, seconds=time.time() - started)
+            if attempts > self.max_retries:
+                # 转换的是临时副本（如压缩图片后的文件）时隔离原文件
+                target = self._quarantine(original or src, error)
+                return ConvertResult(src, dst, False, error, attempts, target, time.time() - started)
+
+    def _quarantine(self, src, reason):
+        folder = self.quarantine_dir or os.path.join(os.path.dirname(src), QUARANTINE_FOLDER)
+        os.makedirs(folder, exist_ok=True)
+        target = os.path.join(folder, os.path.basename(src))
+        try:
+            shutil.move(src, target)
+        except OSError:
+            target = src  # 文件被占用时原地保留，只记录
+        with open(os.path.join(folder, "隔离记录.txt"), "a", encoding="utf-8") as f:
+            f.write(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S}\t{src}\t{reason}\n")
+        return target
+
+    def convert(self, src, dst, kind, original=None):
+        """
+        单个文件转换（使用第一个工作进程）
+        :param original: src 是临时副本时的原文件，多次卡死时隔离原文件
+        """
+        return self._convert_with_retry(self._handles[0], kind, src, dst, original)
+
+    def run_batch(self, tasks):
+        """
+        批量转换
+        :param tasks: [(源路径, 目标路径, 类型)] 或 [(源路径, 目标路径, 类型, 原文件)]，类型见 CONVERTERS；
+                      源路径是临时副本时给出原文件，隔离的是原文件
+        :return: 生成器，按完成顺序逐个产出 ConvertResult（日志在调用线程输出）
+        """
+        if self.workers == 1 or len(tasks) <= 1:
+            for src, dst, kind, *original in tasks:
+                yield self.convert(src, dst, kind, *original)
+            return
+        if self.schedule == "lpt":
+            # 大文件先转换，避免最后只剩一个进程在转超大报告
+            tasks = [tasks[i] for i in lpt_order([task[0] for task in tasks])]
+        todo = queue.Queue()
+        for task in tasks:
+            todo.put(task)
+        results = queue.Queue()
+
+        def _run(handle):
+            while True:
+                try:
+                    src, dst, kind, *original = todo.get_nowait()
+                except queue.Empty:
+                    return
+                results.put(self._convert_with_retry(handle, kind, src, dst, *original))
+
+        threads = [threading.Thread(target=_run, args=(h,), daemon=True) for h in self._handles]
+        for thread in threads:
+            thread.start()
+        for _ in range(len(tasks)):
+            yield results.get()
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        for handle in self._handles:
+            handle.stop()
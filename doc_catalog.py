@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+"""
+文档目录（SQLite）- 各工具共用的一份「文件事实」缓存，规划任务时不必逐个打开Word
+1. 每个文件记录：文件名关键词（M1_/Ambient_ 前缀、ME_H/RE_V 等）、正文ME/RE关键词（与
+   「按照条件添加表格」同一规则）、第一个图片的位置、表格数量及行列数、页数、正文/图片大小
+2. 以 路径 + 内容哈希 为键：
+   - 大小和修改时间未变 → 直接用缓存（只 stat，不读文件）
+   - 变了 → 重新计算哈希；哈希已在目录中（复制/改名的文件）→ 复用已有结果
+   - 新内容 → 多进程并行扫描（lxml 直接解析 word/document.xml，不经过 python-docx）
+3. 文件夹内已删除的文件同步从目录中删除
+4. 段落+表格文本建 FTS5 全文索引（按内容哈希存一份），按单词匹配：查 "ME" 不会命中 MEASUREMENT；
+   中文逐字分词，短语按相邻字匹配。只有新内容才写索引，不再被引用的内容随刷新清理
+
+数据库默认位于 ~/.word_toolbox/doc_catalog.sqlite3，可多个工具/进程同时读写（WAL模式）
+
+用法：
+    catalog = DocCatalog()
+    stats = catalog.refresh(folder)          # 增量扫描
+    for facts in catalog.folder_facts(folder):
+        facts["text_keyword"], facts["tables"], facts["first_image"] ...
+    catalog.lookup(path)                     # 单个文件（过期时当场重新扫描）
+    catalog.route(folder, [("ME", "ME"), ("RE", "RE")])   # 按正文单词分流 {路径: 标签/None}
+
+命令行：
+python doc_catalog.py scan D:\\报告           # 扫描并按关键词统计
+python doc_catalog.py show D:\\报告\\xxx.docx  # 查看单个文件的记录
+python doc_catalog.py search D:\\报告 "QuasiPeak"  # 正文包含某个词/短语的文件
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from scheduler import estimate_cost
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".word_toolbox", "doc_catalog.sqlite3")
+# 扫描规则变化时加1，旧记录全部重新扫描
+SCAN_VERSION = 2
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_NAME_PREFIX_RE = re.compile(r"(M\d+|Ambient)_", re.IGNORECASE)
+_NAME_KEYWORD_RE = re.compile(r"(ME|RE)_(H|V)")
+# 与 FTS5 unicode61 分词一致：字母/数字连续为一个词（下划线也是分隔符）
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_NON_ASCII_RE = re.compile(r"([^\x00-\x7f])")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    name_prefix TEXT,
+    name_keyword TEXT,
+    text_keyword TEXT,
+    paragraphs INTEGER,
+    first_image INTEGER,
+    first_image_paragraph INTEGER,
+    tables INTEGER,
+    table_shapes TEXT,
+    pages INTEGER,
+    xml_bytes INTEGER,
+    media_bytes INTEGER,
+    error TEXT,
+    scanned_at REAL
+);
+CREATE INDEX IF NOT EXISTS docs_folder ON docs(folder);
+CREATE INDEX IF NOT EXISTS docs_sha1 ON docs(sha1);
+CREATE TABLE IF NOT EXISTS contents (
+    id INTEGER PRIMARY KEY,
+    sha1 TEXT UNIQUE NOT NULL,
+    text TEXT NOT NULL
+);
+"""
+# 外部内容表：文本只在 contents 中存一份
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5(text, content='contents', content_rowid='id')"
+# 由文件内容决定、可按哈希复用的字段
+_CONTENT_FIELDS = ("text_keyword", "paragraphs", "first_image", "first_image_paragraph", "tables",
+                   "table_shapes", "pages", "xml_bytes", "media_bytes", "error")
+_FIELDS = ("path", "folder", "size", "mtime_ns", "sha1", "version", "name_prefix", "name_keyword") \
+    + _CONTENT_FIELDS + ("scanned_at",)
+
+
+# ========== 扫描（工作进程中执行） ==========
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def name_facts(file_name):
+    """文件名中的前缀（M1/Ambient）和关键词（ME_H等），与「表格添加不同列」的配置键一致"""
+    prefix = _NAME_PREFIX_RE.search(file_name)
+    keyword = _NAME_KEYWORD_RE.search(file_name)
+    return {
+        "name_prefix": prefix.group(1) if prefix else None,
+        "name_keyword": keyword.group(0) if keyword else None,
+    }
+
+
+def index_text(text):
+    """建索引用的文本：中文等非ASCII字符逐字分开，英文/数字按单词"""
+    return _NON_ASCII_RE.sub(r" \1 ", text)
+
+
+def text_tokens(text):
+    """全文的大写单词集合（与全文索引的分词一致）"""
+    return set(_TOKEN_RE.findall(index_text(text).upper()))
+
+
+def fts_phrase(term):
+    """把一个词/短语转成 FTS5 短语查询"""
+    return '"' + " ".join(_TOKEN_RE.findall(index_text(term))) + '"'
+
+
+def paragraph_text(p):
+    """段落文本（与 python-docx Paragraph.text 一致：只取段落直属的run和超链接）"""
+    parts = []
+    for run in p.iterchildren(_W + "r", _W + "hyperlink"):
+        runs = [run] if run.tag == _W + "r" else run.iterchildren(_W + "r")
+        for r in runs:
+            for child in r:
+                if child.tag == _W + "t":
+                    parts.append(child.text or "")
+                elif child.tag == _W + "tab":
+                    parts.append("\t")
+                elif child.tag in (_W + "br", _W + "cr"):
+                    parts.append("\n")
+    return "".join(parts)
+
+
+def _has_image(element):
+    for _ in element.iter(_W + "drawing", _W + "pict"):
+        return True
+    return False
+
+
+def scan_docx(path):
+    """
+    提取一个docx的内容事实
+    :return: _CONTENT_FIELDS + "text"（建索引用的全文）的字典（出错时 error 为错误信息）
+    """
+    from lxml import etree
+    cost = estimate_cost(path)
+    facts = {field: None for field in _CONTENT_FIELDS}
+    facts.update(pages=cost["pages"], xml_bytes=cost["xml_bytes"], media_bytes=cost["media_bytes"], text="")
+    try:
+        with zipfile.ZipFile(path) as z:
+            root = etree.fromstring(z.read("word/document.xml"))
+    except Exception as e:
+        facts["error"] = str(e) or e.__class__.__name__
+        return facts
+    body = root.find(_W + "body")
+    texts = []
+    shapes = []
+    paragraph_idx = 0
+    for idx, element in enumerate(body if body is not None else ()):
+        if element.tag == _W + "p":
+            texts.append(paragraph_text(element))
+            if facts["first_image"] is None and _has_image(element):
+                facts["first_image"] = idx
+                facts["first_image_paragraph"] = paragraph_idx
+            paragraph_idx += 1
+        elif element.tag == _W + "tbl":
+            rows = element.findall(_W + "tr")
+            grid = element.find(_W + "tblGrid")
+            cols = len(grid) if grid is not None else max((len(r.findall(_W + "tc")) for r in rows), default=0)
+            shapes.append([len(rows), cols])
+            for row in rows:
+                for cell in row.iterchildren(_W + "tc"):
+                    texts.append("\n".join(paragraph_text(p) for p in cell.iterchildren(_W + "p")))
+            if facts["first_image"] is None and _has_image(element):
+                facts["first_image"] = idx
+        elif facts["first_image"] is None and _has_image(element):
+            facts["first_image"] = idx
+    # 「按照条件添加表格」的分流规则：先找单词ME再找单词RE（MEASUREMENT等不算）
+    text = " ".join(texts)
+    tokens = text_tokens(text)
+    facts["text_keyword"] = "ME" if "ME" in tokens else ("RE" if "RE" in tokens else None)
+    facts["text"] = index_text(text)
+    facts["paragraphs"] = paragraph_idx
+    facts["tables"] = len(shapes)
+    facts["table_shapes"] = json.dumps(shapes)
+    return facts
+
+
+# ========== 目录 ==========
+class DocCatalog:
+    """SQLite 文档目录（一个实例对应一个连接，只在创建它的线程中使用）"""
+
+    def __init__(self, db_path=None, max_workers=None, log=None):
+        """
+        :param db_path: 数据库路径（默认 ~/.word_toolbox/doc_catalog.sqlite3）
+        :param max_workers: 并行扫描进程数（默认CPU核数-1）
+        :param log: 日志函数（可选）
+        """
+        self.db_path = db_path or DEFAULT_DB
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.log = log or (lambda message: None)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.execute(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # sqlite3 未编译 FTS5 时退回逐个文件比对单词（仍然不需要打开Word）
+            self.fts = False
+
+    # ----- 写入 -----
+    def _upsert(self, rows):
+        sql = (f"INSERT OR REPLACE INTO docs ({', '.join(_FIELDS)}) "
+               f"VALUES ({', '.join('?' * len(_FIELDS))})")
+        with self.conn:
+            self.conn.executemany(sql, [tuple(row[f] for f in _FIELDS) for row in rows])
+
+    def _index_texts(self, rows):
+        """新内容写入全文索引（同一内容哈希只存一份）"""
+        with self.conn:
+            for row in rows:
+                if self.conn.execute("SELECT 1 FROM contents WHERE sha1 = ?", (row["sha1"],)).fetchone():
+                    continue
+                cursor = self.conn.execute("INSERT INTO contents (sha1, text) VALUES (?, ?)",
+                                           (row["sha1"], row.get("text") or ""))
+                if self.fts:
+                    self.conn.execute("INSERT INTO doc_text (rowid, text) VALUES (?, ?)",
+                                      (cursor.lastrowid, row.get("text") or ""))
+
+    def _prune_texts(self):
+        """删除不再被任何文件引用的内容及其索引"""
+        orphans = self.conn.execute(
+            "SELECT id, text FROM contents WHERE sha1 NOT IN (SELECT sha1 FROM docs)").fetchall()
+        if not orphans:
+            return
+        with self.conn:
+            if self.fts:
+                self.conn.executemany("INSERT INTO doc_text (doc_text, rowid, text) VALUES ('delete', ?, ?)",
+                                      [(row["id"], row["text"]) for row in orphans])
+            self.conn.executemany("DELETE FROM contents WHERE id = ?", [(row["id"],) for row in orphans])
+
+    def _known_content(self, sha1s):
+        """按哈希查已有的内容事实（复制/改名/只改了修改时间的文件直接复用）"""
+        known = {}
+        sha1s = list(sha1s)
+        for start in range(0, len(sha1s), 500):
+            chunk = sha1s[start:start + 500]
+            for row in self.conn.execute(
+                    f"SELECT * FROM docs WHERE version = ? AND sha1 IN ({', '.join('?' * len(chunk))})",
+                    [SCAN_VERSION] + chunk):
+                known.setdefault(row["sha1"], {f: row[f] for f in _CONTENT_FIELDS})
+        return known
+
+    @staticmethod
+    def _row(path, stat, sha1, content):
+        row = {
+            "path": path, "folder": os.path.dirname(path), "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns, "sha1": sha1, "version": SCAN_VERSION, "scanned_at": time.time(),
+        }
+        row.update(name_facts(os.path.basename(path)))
+        row.update(content)
+        return row
+
+    def _scan_many(self, paths):
+        if len(paths) < 8 or self.max_workers == 1:
+            return [scan_docx(path) for path in paths]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(scan_docx, paths, chunksize=max(1, len(paths) // (self.max_workers * 8))))
+
+    # ----- 增量刷新 -----
+    def refresh(self, folder, extensions=(".docx",)):
+        """
+        增量扫描文件夹（不含子文件夹）
+        :return: {"files", "fresh", "reused", "scanned", "removed", "failed", "seconds"}
+        """
+        started = time.perf_counter()
+        folder = os.path.abspath(folder)
+        current = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(tuple(extensions)) and not entry.name.startswith("~$") \
+                        and entry.is_file():
+                    current[entry.path] = entry.stat()
+        stored = {row["path"]: row for row in self.conn.execute(
+            "SELECT path, size, mtime_ns, version FROM docs WHERE folder = ?", (folder,))}
+
+        removed = [path for path in stored if path not in current]
+        stale = sorted(
+            path for path, stat in current.items()
+            if path not in stored or stored[path]["size"] != stat.st_size
+            or stored[path]["mtime_ns"] != stat.st_mtime_ns or stored[path]["version"] != SCAN_VERSION
+        )
+        # 哈希主要是磁盘IO，用线程；解析是CPU密集，用进程
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sha1s = dict(zip(stale, executor.map(file_sha1, stale)))
+        # 先查哈希再删除已移除的文件：文件夹内改名的文件按原记录复用
+        known = self._known_content(set(sha1s.values()))
+        if removed:
+            with self.conn:
+                self.conn.executemany("DELETE FROM docs WHERE path = ?", [(path,) for path in removed])
+        reuse = [path for path in stale if sha1s[path] in known]
+        to_scan = [path for path in stale if sha1s[path] not in known]
+        if to_scan:
+            self.log(f"📇 目录：扫描 {len(to_scan)} 个新增/修改的文件...")
+        scanned = self._scan_many(to_scan)
+        rows = [self._row(path, current[path], sha1s[path], known[sha1s[path]]) for path in reuse]
+        rows += [self._row(path, current[path], sha1s[path], facts) for path, facts in zip(to_scan, scanned)]
+        self._upsert(rows)
+        self._index_texts(rows[len(reuse):])
+        if removed or stale:
+            self._prune_texts()
+        return {
+            "files": len(current),
+            "fresh": len(current) - len(stale),
+            "reused": len(reuse),
+            "scanned": len(to_scan),
+            "removed": len(removed),
+            "failed": sum(1 for facts in scanned if facts["error"]),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    # ----- 查询 -----
+    @staticmethod
+    def _facts(row):
+        facts = dict(row)
+        facts["table_shapes"] = json.loads(facts["table_shapes"]) if facts["table_shapes"] else []
+        return facts
+
+    def lookup(self, path, scan=True):
+        """
+        单个文件的记录；文件变化后 scan=True 时当场重新扫描，否则返回None
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT * FROM docs WHERE path = ?", (path,)).fetchone()
+        if row and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns \
+                and row["version"] == SCAN_VERSION:
+            return self._facts(row)
+        if not scan:
+            return None
+        sha1 = file_sha1(path)
+        content = self._known_content([sha1]).get(sha1) or scan_docx(path)
+        row = self._row(path, stat, sha1, content)
+        self._upsert([row])
+        if "text" in content:
+            self._index_texts([row])
+            self._prune_texts()
+        row.pop("text", None)
+        row["table_shapes"] = json.loads(row["table_shapes"]) if row["table_shapes"] else []
+        return row
+
+    def folder_facts(self, folder):
+        """文件夹内全部记录（按路径排序；先调用 refresh 保证是最新的）"""
+        return [self._facts(row) for row in self.conn.execute(
+            "SELECT * FROM docs WHERE folder = ? ORDER BY path", (os.path.abspath(folder),))]
+
+    # ----- 全文查询 -----
+    def match(self, folder, term):
+        """
+        文件夹内正文（段落+表格）包含某个词/短语的文件
+        :param term: 词或短语，按单词匹配、不区分大小写
+        :return: 路径集合
+        """
+        folder = os.path.abspath(folder)
+        if self.fts:
+            # CROSS JOIN 固定从全文索引出发（否则规划器会按文件夹逐行回查索引，2万个文件要几十秒）
+            return {row["path"] for row in self.conn.execute(
+                "SELECT d.path FROM doc_text CROSS JOIN contents c ON c.id = doc_text.rowid "
+                "CROSS JOIN docs d ON d.sha1 = c.sha1 WHERE doc_text MATCH ? AND d.folder = ?",
+                (fts_phrase(term), folder))}
+        phrase = " ".join(_TOKEN_RE.findall(index_text(term).upper()))
+        return {row["path"] for row in self.conn.execute(
+            "SELECT d.path, c.text FROM docs d JOIN contents c ON c.sha1 = d.sha1 WHERE d.folder = ?", (folder,))
+            if f" {phrase} " in f" {' '.join(_TOKEN_RE.findall(row['text'].upper()))} "}
+
+    def route(self, folder, rules):
+        """
+        按正文内容给文件夹内每个文件分流
+        :param rules: [(标签, 词/短语), ...]，按顺序先命中的规则生效
+        :return: {路径: 标签（都未命中为None）}
+        """
+        routes = {row["path"]: None for row in self.conn.execute(
+            "SELECT path FROM docs WHERE folder = ?", (os.path.abspath(folder),))}
+        for label, term in rules:
+            for path in self.match(folder, term):
+                if routes.get(path, label) is None:
+                    routes[path] = label
+        return routes
+
+    def forget(self, folder=None):
+        """清除某个文件夹（或全部）的记录"""
+        with self.conn:
+            if folder is None:
+                self.conn.execute("DELETE FROM docs")
+            else:
+                self.conn.execute("DELETE FROM docs WHERE folder = ?", (os.path.abspath(folder),))
+        self._prune_texts()
+
+    def close(self):
+        self.conn.close()
+
+
+def format_refresh(stats):
+    return (f"📇 目录：{stats['files']} 个文件，未变化 {stats['fresh']} 个，按哈希复用 {stats['reused']} 个，"
+            f"重新扫描 {stats['scanned']} 个（失败 {stats['failed']}），移除 {stats['removed']} 个，"
+            f"耗时 {stats['seconds']:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Word文档目录（SQLite）")
+    parser.add_argument("--db", help="数据库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_scan = sub.add_parser("scan", help="增量扫描文件夹并按关键词统计")
+    p_scan.add_argument("folder")
+    p_scan.add_argument("--workers", type=int, help="扫描进程数")
+    p_show = sub.add_parser("show", help="查看单个文件的记录")
+    p_show.add_argument("path")
+    p_search = sub.add_parser("search", help="正文包含某个词/短语的文件")
+    p_search.add_argument("folder")
+    p_search.add_argument("term")
+    args = parser.parse_args(argv)
+
+    catalog = DocCatalog(args.db, getattr(args, "workers", None), log=print)
+    try:
+        if args.command == "show":
+            print(json.dumps(catalog.lookup(args.path), ensure_ascii=False, indent=2))
+            return 0
+        if args.command == "search":
+            catalog.refresh(args.folder)
+            started = time.perf_counter()
+            paths = sorted(catalog.match(args.folder, args.term))
+            for path in paths:
+                print(path)
+            print(f"共 {len(paths)} 个文件，查询耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+            return 0
+        print(format_refresh(catalog.refresh(args.folder)))
+        counts = {}
+        for facts in catalog.folder_facts(args.folder):
+            key = (facts["text_keyword"] or "无", facts["name_keyword"] or "无")
+            counts[key] = counts.get(key, 0) + 1
+        print(f"{'正文关键词':<10}{'文件名关键词':<12}{'文件数':>8}")
+        for (text_keyword, name_keyword), count in sorted(counts.items()):
+            print(f"{text_keyword:<14}{name_keyword:<16}{count:>8}")
+    finally:
+        catalog.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+合并前文件检查 - 长时间合并开始前用多进程快速检查全部输入，避免合并到第1800个文件时才因坏文件失败
+1. 逐个文件检查（只读zip目录和XML部件，图片等不解压）：
+   - Word临时锁定文件（~$开头）：直接跳过，不算问题文件
+   - 空文件、设置了打开密码的加密文档（OLE复合文档中的 EncryptedPackage）、实际为.doc格式、不是zip
+   - zip结构损坏、成员加密、成员数据超出文件末尾（文件不完整）
+   - 必需部件：[Content_Types].xml、_rels/.rels、主文档部件（内容类型必须是Word文档，.docm/.dotx等不支持）、
+     主文档关系引用的部件都存在
+   - 全部 .xml/.rels 部件流式解析（expat，按块读取），检查XML格式和zip CRC；
+     同一模板的 styles.xml、theme 等部件在各报告中相同，(CRC, 大小) 已解析通过的只解压校验CRC，不再重复解析
+   - 不支持的内容：altChunk（嵌入的外部文档块，合并后丢失）、子文档（主控文档）
+2. deep=True 时图片等二进制部件也完整读取校验CRC（较慢）
+3. 结果：PreflightResult(路径, 问题列表)；问题列表为空即通过
+
+用法：
+    good_files, bad = validate_inputs(docx_files, log=self.log)
+    if bad and 不排除: 中止合并
+
+命令行：
+python docx_preflight.py 文件夹 [--deep]
+"""
+import os
+import sys
+import zlib
+import zipfile
+import posixpath
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from xml.parsers import expat
+from xml.etree import ElementTree
+
+PreflightResult = namedtuple("PreflightResult", "path problems")
+
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_ENCRYPTED_STREAM = "EncryptedPackage".encode("utf-16-le")
+WML_MAIN = "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+_CT_NS = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+# 关系类型（末段） -> 不支持的原因
+UNSUPPORTED_RELS = {
+    "aFChunk": "包含 altChunk（嵌入的外部文档块），合并后内容会丢失",
+    "subDocument": "包含子文档（主控文档），合并后内容会丢失",
+}
+XML_CHUNK = 64 * 1024
+
+# 本进程中已解析通过的XML成员 (CRC, 解压后大小)
+_parsed_ok = set()
+
+
+def is_lock_file(path):
+    return os.path.basename(path).startswith("~$")
+
+
+def _check_xml(z, info):
+    """流式解析一个XML成员；读完时 zipfile 会校验CRC"""
+    key = (info.CRC, info.file_size)
+    if key in _parsed_ok:
+        _check_binary(z, info)
+        return
+    parser = expat.ParserCreate()
+    with z.open(info) as f:
+        for chunk in iter(lambda: f.read(XML_CHUNK), b""):
+            parser.Parse(chunk, False)
+    parser.Parse(b"", True)
+    _parsed_ok.add(key)
+
+
+def _check_binary(z, info):
+    with z.open(info) as f:
+        while f.read(1024 * 1024):
+            pass
+
+
+def _rels(z, name):
+    """读取关系部件：[(类型末段, 目标, 是否外部)]"""
+    root = ElementTree.fromstring(z.read(name))
+    return [(rel.get("Type", "").rsplit("/", 1)[-1], rel.get("Target", ""), rel.get("TargetMode") == "External")
+            for rel in root.iter(f"{_RELS_NS}Relationship")]
+
+
+def _content_type(z, partname):
+    root = ElementTree.fromstring(z.read("[Content_Types].xml"))
+    for item in root.iter(f"{_CT_NS}Override"):
+        if item.get("PartName", "").lstrip("/").lower() == partname.lower():
+            return item.get("ContentType", "")
+    ext = partname.rsplit(".", 1)[-1].lower()
+    for item in root.iter(f"{_CT_NS}Default"):
+        if item.get("Extension", "").lower() == ext:
+            return item.get("ContentType", "")
+    return ""
+
+
+def _resolve(base_dir, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _check_package(z, size, deep):
+    problems = []
+    infos = {info.filename: info for info in z.infolist() if not info.is_dir()}
+    for info in infos.values():
+        if info.flag_bits & 0x1:
+            return ["zip成员已加密，无法读取"]
+        if info.header_offset + info.compress_size > size:
+            return [f"成员 {info.filename} 超出文件末尾（文件不完整）"]
+    for required in ("[Content_Types].xml", "_rels/.rels"):
+        if required not in infos:
+            problems.append(f"缺少必需部件：{required}")
+    if problems:
+        return problems
+
+    # 全部XML部件流式解析（同时校验CRC），后面读取关系/内容类型时不会再遇到格式错误
+    for name, info in infos.items():
+        is_xml = name.endswith((".xml", ".rels"))
+        if not is_xml and not deep:
+            continue
+        try:
+            if is_xml:
+                _check_xml(z, info)
+            else:
+                _check_binary(z, info)
+        except expat.ExpatError as e:
+            problems.append(f"{name} XML格式错误：{expat.ErrorString(e.code)}（第{e.lineno}行）")
+        except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError) as e:
+            problems.append(f"{name} 数据损坏：{e}")
+    if problems:
+        return problems
+
+    main = [_resolve("", target) for kind, target, external in _rels(z, "_rels/.rels")
+            if kind == "officeDocument" and not external]
+    if not main or main[0] not in infos:
+        return ["缺少主文档部件（word/document.xml）"]
+    main = main[0]
+    content_type = _content_type(z, main)
+    if content_type != WML_MAIN:
+        return [f"主文档不是Word文档（内容类型：{content_type or '未知'}），可能是.docm/.dotx等"]
+
+    base_dir = posixpath.dirname(main)
+    rels_name = posixpath.join(base_dir, "_rels", posixpath.basename(main) + ".rels")
+    if rels_name in infos:
+        for kind, target, external in _rels(z, rels_name):
+            if kind in UNSUPPORTED_RELS:
+                problems.append(UNSUPPORTED_RELS[kind])
+            elif not external and _resolve(base_dir, target) not in infos:
+                problems.append(f"缺少部件：{_resolve(base_dir, target)}（主文档引用）")
+    return list(dict.fromkeys(problems))
+
+
+def check_docx(path, deep=False):
+    """检查一个.docx，返回 PreflightResult"""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = f.read(len(OLE_MAGIC))
+    except OSError as e:
+        return PreflightResult(path, [f"无法读取：{e.strerror or e}"])
+    if size == 0:
+        return PreflightResult(path, ["空文件"])
+    if head == OLE_MAGIC:
+        # 加密的docx是OLE复合文档，其中有 EncryptedPackage 流；没有则是改了扩展名的.doc
+        with open(path, "rb") as f:
+            encrypted = _ENCRYPTED_STREAM in f.read()
+        return PreflightResult(path, ["已设置打开密码（加密文档）" if encrypted else "实际是.doc格式（扩展名为.docx）"])
+    if head[:2] != b"PK":
+        return PreflightResult(path, ["不是docx文件（不是zip格式）"])
+    try:
+        with zipfile.ZipFile(path) as z:
+            return PreflightResult(path, _check_package(z, size, deep))
+    except zipfile.BadZipFile as e:
+        return PreflightResult(path, [f"zip结构损坏（文件可能不完整）：{e}"])
+    except (ElementTree.ParseError, KeyError, OSError) as e:
+        return PreflightResult(path, [f"包结构损坏：{e}"])
+
+
+def _check_deep(path):
+    return check_docx(path, deep=True)
+
+
+def check_all(paths, deep=False, max_workers=None):
+    """多进程检查，结果与 paths 顺序一致"""
+    paths = list(paths)
+    func = _check_deep if deep else check_docx
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    if len(paths) < 8 or max_workers == 1:
+        return [func(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, paths, chunksize=max(1, len(paths) // (max_workers * 8))))
+
+
+def validate_inputs(paths, log=None, deep=False, max_workers=None):
+    """
+    合并前检查全部输入
+    :return: (通过检查的文件（保持原顺序，已去掉 ~$ 锁定文件）, 有问题的 PreflightResult 列表)
+    """
+    log = log or (lambda message: None)
+    paths = list(paths)
+    locks = [path for path in paths if is_lock_file(path)]
+    for path in locks:
+        log(f"⏭️ 跳过Word临时锁定文件：{os.path.basename(path)}")
+    paths = [path for path in paths if not is_lock_file(path)]
+    results = check_all(paths, deep, max_workers)
+    bad = [result for result in results if result.problems]
+    if bad:
+        log(f"🩺 文件检查：{len(bad)} 个文件有问题（共 {len(paths)} 个）")
+        for result in bad:
+            log(f"   ❌ {os.path.basename(result.path)}：{'；'.join(result.problems)}")
+    else:
+        log(f"🩺 文件检查：{len(paths)} 个文件全部通过")
+    return [result.path for result in results if not result.problems], bad
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    deep = "--deep" in argv
+    argv = [arg for arg in argv if arg != "--deep"]
+    if not argv or not os.path.isdir(argv[0]):
+        print("用法：python docx_preflight.py 文件夹 [--deep]")
+        return 1
+    folder = argv[0]
+    paths = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+             if f.lower().endswith(".docx") and os.path.isfile(os.path.join(folder, f))]
+    _, bad = validate_inputs(paths, log=print, deep=deep)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
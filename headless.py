@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+无界面加载工具脚本 - 供基准测试/批处理调用各GUI工具的核心方法
+原理：
+1. 按文件路径加载工具脚本（文件名含中文/空格也可加载，不执行 __main__ 部分）
+2. 把脚本里的 tk / scrolledtext / LogView / messagebox / filedialog 替换为空实现
+3. 正常调用工具类 __init__（配置字典都在 __init__ 里），界面控件全部为空对象
+4. 日志统一收集到 tool.headless_logs，弹窗内容收集到 tool.headless_dialogs
+"""
+import os
+import importlib.util
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class _StubVar:
+    """替代 tk.StringVar / IntVar / BooleanVar"""
+    def __init__(self, master=None, value=None, name=None):
+        self._value = value
+
+    def get(self):
+        return "" if self._value is None else self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class _StubWidget:
+    """替代所有tk控件：任何方法调用都返回None"""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _StubTk:
+    """替代 tkinter 模块：大写开头的名称是控件/变量类，其余是常量"""
+    _VAR_NAMES = ("StringVar", "IntVar", "BooleanVar", "DoubleVar")
+
+    def __getattr__(self, name):
+        if name in self._VAR_NAMES:
+            return _StubVar
+        if name[:1].isupper() and not name.isupper():
+            return _StubWidget
+        return name.lower()
+
+
+class _StubScrolledText:
+    ScrolledText = _StubWidget
+
+
+class _StubDialogs:
+    """替代 messagebox / filedialog，记录弹窗内容，确认类弹窗默认返回True"""
+    def __init__(self, sink):
+        self._sink = sink
+
+    def __getattr__(self, name):
+        def _dialog(*args, **kwargs):
+            self._sink.append((name, args))
+            return True if name.startswith("ask") and "file" not in name and "directory" not in name else ""
+        return _dialog
+
+
+class _StubRoot(_StubWidget):
+    """替代主窗口 root"""
+
+
+def load_tool_module(file_name, module_name=None):
+    """
+    按文件名加载工具脚本（相对本目录）
+    :return: 模块对象
+    """
+    path = file_name if os.path.isabs(file_name) else os.path.join(TOOLS_DIR, file_name)
+    module_name = module_name or "tool_" + str(abs(hash(path)))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_tool_class(module):
+    """找到脚本中定义的工具类（构造参数为 root 的第一个类）"""
+    for value in vars(module).values():
+        if isinstance(value, type) and value.__module__ == module.__name__:
+            init = getattr(value, "__init__", None)
+            code = getattr(init, "__code__", None)
+            if code and code.co_varnames[1:2] == ("root",):
+                return value
+    raise LookupError(f"{module.__file__} 中未找到工具类")
+
+
+def create_headless_tool(file_name, class_name=None, log=None):
+    """
+    无界面创建工具实例
+    :param file_name: 工具脚本文件名，如 "表格添加不同列.py"
+    :param class_name: 工具类名（为空时自动查找）
+    :param log: 日志回调（可选），工具的每条日志同时转发给它
+    :return: 工具实例（附带 headless_logs / headless_dialogs 两个列表）
+    """
+    module = load_tool_module(file_name)
+    logs = []
+    dialogs = []
+    module.tk = _StubTk()
+    module.scrolledtext = _StubScrolledText()
+    if hasattr(module, "LogView"):
+        module.LogView = _StubWidget
+    module.messagebox = _StubDialogs(dialogs)
+    module.filedialog = _StubDialogs(dialogs)
+
+    cls = getattr(module, class_name) if class_name else find_tool_class(module)
+    tool = cls(_StubRoot())
+    tool.headless_logs = logs
+    tool.headless_dialogs = dialogs
+
+    # 各脚本日志方法名不同（log / _log），统一收集
+    def _collect(message, *args, **kwargs):
+        logs.append(str(message))
+        if log:
+            log(str(message))
+    for name in ("log", "_log"):
+        if hasattr(tool, name):
+            setattr(tool, name, _collect)
+    return tool
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+批量图片说明 - 在每个图片正下方居中添加「水平极化」/「垂直极化」（供「图片正下方添加文字」批量模式使用）
+1. 极化方向取自文件名（报告标题）中的 H / V 标记，如 Ambient_ME_H → 水平极化，M1_RE_V → 垂直极化
+2. 一次遍历文档树找出全部 w:drawing / w:pict，按所在段落去重（同一段落多个图片只加一行说明），
+   正文和表格单元格中的图片都会处理
+3. 图片段落下一段已经是同样的说明时跳过，重复执行不会叠加
+4. 多个文件用进程池并行，大文件先分发（scheduler.lpt_order），结果按原顺序返回
+   （备份由调用方在主进程写入回滚日志，见 restore_journal.py）
+
+用法：
+    for path, ok, added, message in caption_files(paths):
+        ...
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler import lpt_order
+
+POLARIZATION_CAPTIONS = {"H": "水平极化", "V": "垂直极化"}
+# 独立的 H / V（前后不是字母），取最后一个，如 Report_00001_M1_RE_V
+_MARKER_RE = re.compile(r"(?<![A-Za-z])([HV])(?![A-Za-z])")
+
+
+def caption_for_name(file_name):
+    """根据文件名中的 H/V 标记返回说明文字，没有标记时返回None"""
+    markers = _MARKER_RE.findall(os.path.splitext(os.path.basename(file_name))[0])
+    return POLARIZATION_CAPTIONS[markers[-1]] if markers else None
+
+
+def caption_paragraph(text):
+    """居中加粗12磅的说明段落（与单文件模式的 create_centered_text_paragraph 格式一致）"""
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    from xml.sax.saxutils import escape
+    return parse_xml(
+        f'<w:p {nsdecls("w")}><w:pPr><w:jc w:val="center"/></w:pPr>'
+        f'<w:r><w:rPr><w:b/><w:sz w:val="24"/></w:rPr><w:t>{escape(text)}</w:t></w:r></w:p>'
+    )
+
+
+def image_paragraphs(body):
+    """
+    一次遍历找出所有含图片的段落（按文档顺序，去重）
+    文本框内的图片归到文本框所在的正文/单元格段落
+    """
+    from docx.oxml.ns import qn
+    containers = (qn("w:body"), qn("w:tc"))
+    paragraphs = []
+    seen = set()
+    for image in body.iter(qn("w:drawing"), qn("w:pict")):
+        for ancestor in image.iterancestors(qn("w:p")):
+            parent = ancestor.getparent()
+            if parent is not None and parent.tag in containers:
+                if ancestor not in seen:
+                    seen.add(ancestor)
+                    paragraphs.append(ancestor)
+                break
+    return paragraphs
+
+
+def _paragraph_text(p):
+    from docx.oxml.ns import qn
+    return "".join(t.text or "" for t in p.iter(qn("w:t")))
+
+
+def caption_document(doc, text):
+    """
+    给文档中每个图片段落下方添加说明
+    :return: (新增数, 已有说明跳过数)
+    """
+    added = skipped = 0
+    for paragraph in image_paragraphs(doc.element.body):
+        following = paragraph.getnext()
+        if following is not None and following.tag == paragraph.tag and _paragraph_text(following).strip() == text:
+            skipped += 1
+            continue
+        paragraph.addnext(caption_paragraph(text))
+        added += 1
+    return added, skipped
+
+
+def caption_file(path):
+    """
+    处理一个文件（在工作进程中执行）
+    :return: (路径, 是否成功, 新增说明数, 信息)
+    """
+    from lazy_package import open_document
+    name = os.path.basename(path)
+    text = caption_for_name(name)
+    if text is None:
+        return path, False, 0, "文件名中没有 H/V 标记，跳过"
+    try:
+        doc = open_document(path)
+        added, skipped = caption_document(doc, text)
+        if not added:
+            return path, skipped > 0, 0, "已有说明，无需修改" if skipped else "未找到图片"
+        doc.save(path)
+        extra = f"（{skipped}个已有说明）" if skipped else ""
+        return path, True, added, f"{added}个图片下方添加「{text}」{extra}"
+    except Exception as e:
+        return path, False, 0, str(e)
+
+
+def caption_files(paths, max_workers=None):
+    """
+    并行处理多个文件
+    :return: 按 paths 顺序的 [(路径, 是否成功, 新增说明数, 信息)]
+    """
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    if max_workers == 1 or len(paths) < 4:
+        return [caption_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {i: executor.submit(caption_file, paths[i]) for i in lpt_order(paths)}
+        return [futures[i].result() for i in range(len(paths))]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+重复输入检测 - 合并/转换前找出同一份报告的多个副本（如批量改名后带 _1 后缀的拷贝）
+1. 初筛（多进程，只读zip目录不解压）：成员名 + 图片等成员的CRC/大小（.doc 为文件大小），
+   初筛键相同的文件才可能重复，其余文件不再读取内容
+2. 候选文件多进程计算两个指纹：
+   字节指纹：整个文件的 sha256
+   内容指纹（仅.docx）：按成员名排序，逐个成员解压后哈希；比较前去掉 Word 每次保存都会变的内容——
+   w:rsid* 属性、settings.xml 中的 w:rsids、docProps/core.xml 的创建/修改/打印时间、docProps/app.xml 的编辑时长
+3. 字节指纹相同为「字节相同」；字节不同但内容指纹相同为「内容相同」（同一报告另存/重新打开保存过）
+4. 每组重复中保留排在最前面的文件（即合并/转换顺序中的第一份）
+5. 策略：skip 跳过重复文件，只处理保留的那份；report 只在日志中报告，全部照常处理
+6. .doc 等非zip文件、损坏的.docx只比较字节指纹
+
+用法：
+    docx_files, groups = filter_duplicates(docx_files, policy="skip", log=self.log)
+
+命令行（只检测不修改）：
+python input_dedup.py 文件夹
+"""
+import io
+import os
+import re
+import sys
+import hashlib
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+POLICIES = ("skip", "report")
+
+Fingerprint = namedtuple("Fingerprint", "path size sha256 content")
+# kind：byte 字节相同 / content 内容相同（相对 kept）
+Duplicate = namedtuple("Duplicate", "path kind")
+DuplicateGroup = namedtuple("DuplicateGroup", "kept duplicates")
+
+KIND_NAMES = {"byte": "字节相同", "content": "内容相同"}
+
+_RSID_ATTR_RE = re.compile(rb'\s[\w.-]+:rsid\w*="[^"]*"')
+_RSIDS_RE = re.compile(rb"<(?P<p>[\w.-]+:)rsids\b.*?</(?P=p)rsids>|<[\w.-]+:rsids\s*/>", re.S)
+_CORE_TIME_RE = re.compile(rb"<(dcterms:created|dcterms:modified|cp:lastPrinted)\b[^>]*?(/>|>.*?</\1>)", re.S)
+_APP_TIME_RE = re.compile(rb"<TotalTime>.*?</TotalTime>", re.S)
+
+
+def _is_normalized(name):
+    return name in ("docProps/core.xml", "docProps/app.xml") or (name.startswith("word/") and name.endswith(".xml"))
+
+
+def _normalize(name, data):
+    """去掉每次保存都会变化、与内容无关的部分"""
+    if name == "docProps/core.xml":
+        return _CORE_TIME_RE.sub(b"", data)
+    if name == "docProps/app.xml":
+        return _APP_TIME_RE.sub(b"", data)
+    if name.startswith("word/") and name.endswith(".xml"):
+        if name == "word/settings.xml":
+            data = _RSIDS_RE.sub(b"", data)
+        return _RSID_ATTR_RE.sub(b"", data)
+    return data
+
+
+def content_digest(data):
+    """docx内容指纹（忽略rsid和文档属性中的时间）；不是有效的zip时返回None"""
+    digest = hashlib.sha256()
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            for info in sorted(z.infolist(), key=lambda i: i.filename):
+                if info.is_dir():
+                    continue
+                digest.update(info.filename.encode("utf-8") + b"\0")
+                digest.update(hashlib.sha256(_normalize(info.filename, z.read(info))).digest())
+    except (zipfile.BadZipFile, OSError, EOFError, RuntimeError, NotImplementedError):
+        return None
+    return digest.hexdigest()
+
+
+def quick_key(path):
+    """初筛键：只读zip目录。需要去掉保存时间/rsid的成员只取名称，其余成员取 (名称, CRC, 大小)"""
+    if path.lower().endswith(".docx"):
+        try:
+            with zipfile.ZipFile(path) as z:
+                entries = sorted((info.filename,) if _is_normalized(info.filename)
+                                 else (info.filename, info.CRC, info.file_size)
+                                 for info in z.infolist() if not info.is_dir())
+            return path, ("zip", tuple(entries))
+        except (zipfile.BadZipFile, OSError, EOFError):
+            pass
+    return path, ("size", os.path.getsize(path))
+
+
+def fingerprint(path):
+    """读取一次文件，计算字节指纹和（.docx）内容指纹"""
+    with open(path, "rb") as f:
+        data = f.read()
+    content = content_digest(data) if path.lower().endswith(".docx") else None
+    return Fingerprint(path, len(data), hashlib.sha256(data).hexdigest(), content)
+
+
+def _run_all(func, paths, max_workers=None):
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    if len(paths) < 8 or max_workers == 1:
+        return [func(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, paths, chunksize=max(1, len(paths) // (max_workers * 8))))
+
+
+def candidates(paths, max_workers=None):
+    """初筛：返回可能有重复的文件（保持原顺序）"""
+    keys = _run_all(quick_key, list(paths), max_workers)
+    counts = {}
+    for _, key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    return [path for path, key in keys if counts[key] > 1]
+
+
+def find_duplicates(paths, max_workers=None):
+    """
+    按顺序检测重复
+    :return: DuplicateGroup 列表（kept 为每组第一个文件）
+    """
+    groups = {}
+    kept_print = {}
+    order = []
+    for fp in _run_all(fingerprint, candidates(paths, max_workers), max_workers):
+        key = ("content", fp.content) if fp.content else ("byte", fp.sha256)
+        if key not in groups:
+            groups[key] = []
+            kept_print[key] = fp
+            order.append(key)
+            continue
+        kind = "byte" if fp.sha256 == kept_print[key].sha256 else "content"
+        groups[key].append(Duplicate(fp.path, kind))
+    return [DuplicateGroup(kept_print[key].path, groups[key]) for key in order if groups[key]]
+
+
+def filter_duplicates(paths, policy="skip", log=None, max_workers=None):
+    """
+    检测并按策略处理重复输入
+    :param policy: skip 跳过重复文件 / report 只报告
+    :return: (要处理的文件列表（保持原顺序）, DuplicateGroup 列表)
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"未知的重复文件策略：{policy}（可选：{' / '.join(POLICIES)}）")
+    log = log or (lambda message: None)
+    paths = list(paths)
+    groups = find_duplicates(paths, max_workers)
+    if not groups:
+        return paths, groups
+    skipped = {dup.path for group in groups for dup in group.duplicates}
+    action = "跳过" if policy == "skip" else "仍会处理"
+    log(f"♊ 发现 {len(skipped)} 个重复文件（{len(groups)} 组），{action}：")
+    for group in groups:
+        for dup in group.duplicates:
+            log(f"   ⚠️ {os.path.basename(dup.path)} 与 {os.path.basename(group.kept)} "
+                f"{KIND_NAMES[dup.kind]}，{action}")
+    if policy == "skip":
+        saved = sum(os.path.getsize(path) for path in skipped)
+        log(f"♊ 跳过重复文件后剩 {len(paths) - len(skipped)} 个（少处理 {saved / 1024 / 1024:.2f} MB）")
+        return [path for path in paths if path not in skipped], groups
+    return paths, groups
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or not os.path.isdir(argv[0]):
+        print("用法：python input_dedup.py 文件夹")
+        return 1
+    folder = argv[0]
+    paths = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+             if f.lower().endswith((".docx", ".doc")) and not f.startswith("~$")
+             and os.path.isfile(os.path.join(folder, f))]
+    groups = find_duplicates(paths)
+    if not groups:
+        print(f"✅ {len(paths)} 个文件，没有重复")
+        return 0
+    for group in groups:
+        print(f"保留：{os.path.basename(group.kept)}")
+        for dup in group.duplicates:
+            print(f"  {KIND_NAMES[dup.kind]}：{os.path.basename(dup.path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
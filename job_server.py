@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+本机任务服务 - 多人在同一台工作站上提交合并/转换/批量编辑任务，共用一个常驻工作进程池
+功能：
+1. HTTP 服务只监听 127.0.0.1，任务用 JSON 描述（操作名与「工具箱」注册表一致）
+2. 任务按优先级排队（数字越大越先执行，同优先级先到先执行），由一个调度线程依次执行，
+   每个任务独占整个预热进程池，不再各自启动Word/进程互相抢CPU
+3. 文件发现缓存、已加载的工具实例、工作进程在所有任务之间共享
+4. 查询任务状态、进度、日志，下载输出文件（合并后的docx/PDF）
+
+启动服务：
+python job_server.py serve --port 8765
+提交任务：
+python job_server.py submit --folder D:\\报告 --ops 表格添加列 合并Word --priority 5
+python job_server.py status 3
+python job_server.py download 3 0 -o 合并结果.docx
+
+HTTP接口：
+GET    /ops                         全部可用操作
+POST   /jobs                        提交任务 {"folder": "...", "ops": ["..."], "priority": 0,
+                                              "parallel": true, "backup": false, "submitter": "张三"}
+                                    ops 也可以是单个操作名；参数不合法时返回 400
+GET    /jobs                        全部任务
+GET    /jobs/<id>                   任务状态、进度、输出文件
+GET    /jobs/<id>/log               任务日志
+GET    /jobs/<id>/artifacts/<序号>   下载输出文件
+DELETE /jobs/<id>                   取消排队中的任务
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import itertools
+import threading
+import collections
+import urllib.request
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+# 每个任务保留的日志行数
+LOG_LIMIT = 5000
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "排队中", "执行中", "已完成", "失败", "已取消"
+
+
+class Job:
+    """一个提交的任务"""
+    def __init__(self, job_id, spec):
+        self.id = job_id
+        self.folder = spec["folder"]
+        self.ops = list(spec["ops"])
+        self.priority = int(spec.get("priority", 0))
+        self.parallel = bool(spec.get("parallel", True))
+        self.backup = bool(spec.get("backup", False))
+        self.submitter = spec.get("submitter", "")
+        self.status = QUEUED
+        self.error = ""
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.logs = collections.deque(maxlen=LOG_LIMIT)
+        # 操作名 -> (已完成, 总数)
+        self.progress = {}
+        self.summary = []
+        self.artifacts = []
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "folder": self.folder,
+            "ops": self.ops,
+            "priority": self.priority,
+            "submitter": self.submitter,
+            "status": self.status,
+            "error": self.error,
+            "submitted": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.submitted)),
+            "seconds": round((self.finished or time.time()) - self.started, 1) if self.started else None,
+            "progress": {name: {"done": done, "total": total} for name, (done, total) in self.progress.items()},
+            "summary": [{"op": name, "success": success, "fail": fail} for name, success, fail in self.summary],
+            "artifacts": [{"index": i, "name": os.path.basename(p), "size": os.path.getsize(p)}
+                          for i, p in enumerate(self.artifacts) if os.path.exists(p)],
+        }
+
+
+class JobManager:
+    """任务队列 + 调度线程，所有任务共享一个 ToolServices（进程池/缓存/工具实例）"""
+
+    def __init__(self, max_workers=None):
+        from tool_registry import ToolServices
+        self.services = ToolServices(log=self._log, max_workers=max_workers, progress=self._progress)
+        self.jobs = {}
+        self._queue = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._current = None
+        self._thread = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    # ----- 服务回调（只在调度线程中被调用） -----
+    def _log(self, message):
+        job = self._current
+        if job is not None:
+            job.logs.append(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+    def _progress(self, op_name, done, total):
+        job = self._current
+        if job is not None:
+            job.progress[op_name] = (done, total)
+
+    # ----- 提交/取消 -----
+    def submit(self, spec):
+        """校验并提交任务，返回 Job；参数错误抛出 ValueError"""
+        from tool_registry import REGISTRY
+        if not isinstance(spec, dict):
+            raise ValueError("任务描述必须是JSON对象")
+        folder = spec.get("folder", "")
+        if not isinstance(folder, str) or not folder or not os.path.isdir(folder):
+            raise ValueError(f"文件夹不存在：{folder}")
+        ops = spec.get("ops") or ([spec["op"]] if spec.get("op") else [])
+        if isinstance(ops, str):
+            ops = [ops]  # 单个操作可直接写操作名
+        if not isinstance(ops, list) or not all(isinstance(op, str) for op in ops):
+            raise ValueError("ops 必须是操作名或操作名列表")
+        if not ops:
+            raise ValueError("未指定操作（ops）")
+        unknown = [op for op in ops if op not in REGISTRY]
+        if unknown:
+            raise ValueError(f"未知操作：{'、'.join(unknown)}")
+        priority = spec.get("priority", 0)
+        if isinstance(priority, bool) or not isinstance(priority, (int, str)):
+            raise ValueError(f"priority 必须是整数：{priority}")
+        try:
+            priority = int(priority)
+        except ValueError:
+            raise ValueError(f"priority 必须是整数：{priority}") from None
+        if not isinstance(spec.get("submitter", ""), str):
+            raise ValueError("submitter 必须是字符串")
+        job = Job(next(self._ids), dict(spec, ops=ops, priority=priority))
+        with self._lock:
+            self.jobs[job.id] = job
+        # 优先级数字越大越先执行；同优先级按提交顺序
+        self._queue.put((-job.priority, job.id))
+        return job
+
+    def cancel(self, job_id):
+        """只能取消排队中的任务"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status != QUEUED:
+            return False
+        job.status = CANCELLED
+        return True
+
+    # ----- 调度 -----
+    def _dispatch(self):
+        while True:
+            _, job_id = self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        self._current = job
+        job.status = RUNNING
+        job.started = time.time()
+        first_artifact = len(self.services.artifacts)
+        try:
+            self._log(f"🚀 开始执行：{' → '.join(job.ops)}（{job.folder}）")
+            run = None
+            if job.backup:
+                run = self.services.begin_backup(f"任务{job.id}：" + " → ".join(job.ops), job.folder,
+                                                 self.services.discover(job.folder))
+                self._log(f"📦 已备份 {len(run.files)} 个文件")
+            try:
+                job.summary = self.services.run_queue(job.ops, job.folder, job.parallel)
+            finally:
+                if run is not None:
+                    self.services.end_backup(run)
+            job.status = DONE
+            self._log("🎉 任务完成")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            self._log(f"❌ 任务失败：{e}")
+        finally:
+            job.artifacts = [p for p in self.services.artifacts[first_artifact:] if os.path.exists(p)]
+            job.finished = time.time()
+            self._current = None
+
+    def queue_position(self, job):
+        """排队中任务前面还有几个"""
+        waiting = sorted((-j.priority, j.id) for j in self.jobs.values() if j.status == QUEUED)
+        return waiting.index((-job.priority, job.id)) if job.status == QUEUED else 0
+
+    def shutdown(self):
+        self.services.shutdown()
+
+
+# ========== HTTP ==========
+class JobRequestHandler(BaseHTTPRequestHandler):
+    manager = None  # 由 serve() 设置
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job(self, parts):
+        try:
+            return self.manager.jobs.get(int(parts[1]))
+        except (IndexError, ValueError):
+            return None
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["ops"]:
+            from tool_registry import REGISTRY
+            self._send_json([{"name": s.name, "kind": s.kind, "description": s.description}
+                             for s in REGISTRY.values()])
+            return
+        if parts == ["jobs"]:
+            self._send_json([job.to_dict() for job in self.manager.jobs.values()])
+            return
+        job = self._job(parts) if parts[:1] == ["jobs"] else None
+        if job is None:
+            self._send_json({"error": "未找到"}, 404)
+            return
+        if len(parts) == 2:
+            data = job.to_dict()
+            data["queue_position"] = self.manager.queue_position(job)
+            self._send_json(data)
+        elif parts[2:] == ["log"]:
+            self._send_json({"id": job.id, "log": list(job.logs)})
+        elif parts[2:3] == ["artifacts"] and len(parts) == 4 and parts[3].isdigit():
+            self._send_artifact(job, int(parts[3]))
+        else:
+            self._send_json({"error": "未找到"}, 404)
+
+    def _send_artifact(self, job, index):
+        if index >= len(job.artifacts) or not os.path.exists(job.artifacts[index]):
+            self._send_json({"error": "输出文件不存在"}, 404)
+            return
+        path = job.artifacts[index]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{urllib.request.quote(os.path.basename(path))}")
+        self.end_headers()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json({"error": "未找到"}, 404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            spec = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            job = self.manager.submit(spec)
+        except (ValueError, KeyError) as e:
+            self._send_json({"error": str(e)}, 400)
+            return
+        self._send_json(job.to_dict(), 202)
+
+    def do_DELETE(self):
+        parts = [p for p in self.path.split("/") if p]
+        job = self._job(parts) if parts[:1] == ["jobs"] and len(parts) == 2 else None
+        if job is None:
+            self._send_json({"error": "未找到"}, 404)
+        elif self.manager.cancel(job.id):
+            self._send_json(job.to_dict())
+        else:
+            self._send_json({"error": f"任务{job.status}，无法取消"}, 409)
+
+
+def serve(port=DEFAULT_PORT, max_workers=None):
+    """启动服务（阻塞），只监听本机"""
+    manager = JobManager(max_workers=max_workers)
+    JobRequestHandler.manager = manager
+    server = ThreadingHTTPServer(("127.0.0.1", port), JobRequestHandler)
+    print(f"✅ 任务服务已启动：http://127.0.0.1:{port}（工作进程 {manager.services.max_workers} 个）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown()
+
+
+# ========== 命令行客户端 ==========
+def _request(port, method, path, data=None):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8") if data is not None else None
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=body, method=method,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Word批量工具本机任务服务")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    # --port 放在子命令前后都可以（子命令中未指定时不覆盖上面的值）
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--port", type=int, default=argparse.SUPPRESS)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_serve = sub.add_parser("serve", help="启动服务", parents=[common])
+    p_serve.add_argument("--workers", type=int, help="工作进程数")
+    p_submit = sub.add_parser("submit", help="提交任务", parents=[common])
+    p_submit.add_argument("--folder", required=True)
+    p_submit.add_argument("--ops", nargs="+", required=True)
+    p_submit.add_argument("--priority", type=int, default=0)
+    p_submit.add_argument("--serial", action="store_true", help="逐文件操作不并行")
+    p_submit.add_argument("--backup", action="store_true")
+    p_submit.add_argument("--submitter", default=os.environ.get("USERNAME") or os.environ.get("USER", ""))
+    sub.add_parser("list", help="列出任务", parents=[common])
+    p_status = sub.add_parser("status", help="查看任务", parents=[common])
+    p_status.add_argument("id", type=int)
+    p_status.add_argument("--log", action="store_true", help="同时输出日志")
+    p_cancel = sub.add_parser("cancel", help="取消排队中的任务", parents=[common])
+    p_cancel.add_argument("id", type=int)
+    p_download = sub.add_parser("download", help="下载输出文件", parents=[common])
+    p_download.add_argument("id", type=int)
+    p_download.add_argument("index", type=int)
+    p_download.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.port, args.workers)
+        return 0
+    if args.command == "submit":
+        status, body = _request(args.port, "POST", "/jobs", {
+            "folder": os.path.abspath(args.folder), "ops": args.ops, "priority": args.priority,
+            "parallel": not args.serial, "backup": args.backup, "submitter": args.submitter,
+        })
+    elif args.command == "list":
+        status, body = _request(args.port, "GET", "/jobs")
+    elif args.command == "status":
+        status, body = _request(args.port, "GET", f"/jobs/{args.id}{'/log' if args.log else ''}")
+    elif args.command == "cancel":
+        status, body = _request(args.port, "DELETE", f"/jobs/{args.id}")
+    else:
+        status, body = _request(args.port, "GET", f"/jobs/{args.id}/artifacts/{args.index}")
+        if status == 200:
+            with open(args.output, "wb") as f:
+                f.write(body)
+            print(f"💾 已保存：{args.output}")
+            return 0
+    print(json.dumps(json.loads(body.decode("utf-8")), ensure_ascii=False, indent=2))
+    return 0 if status < 400 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
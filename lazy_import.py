@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+延迟导入 - 让工具窗口先显示，python-docx / docxcompose / win32com 等重型库用到时再加载
+用法（替代脚本顶部的 import）：
+    Document = lazy_from("docx", "Document")
+    Pt, Inches = lazy_from("docx.shared", "Pt", "Inches")
+    win32com = lazy_module("win32com.client")      # 等价于 import win32com.client
+    ...
+    root = tk.Tk()
+    app = 工具类(root)
+    warm_up(root, "docx")                          # 窗口显示后在后台线程预加载
+    root.mainloop()
+
+代理对象第一次被调用/取属性时才真正导入，之后直接转发给真实对象。
+"""
+import sys
+import importlib
+import threading
+
+
+class _LazyObject:
+    """延迟解析的对象代理：调用、取属性、比较都会先完成导入"""
+    __slots__ = ("_lazy_module", "_lazy_attr", "_lazy_value")
+
+    def __init__(self, module_name, attr_name=None):
+        object.__setattr__(self, "_lazy_module", module_name)
+        object.__setattr__(self, "_lazy_attr", attr_name)
+        object.__setattr__(self, "_lazy_value", None)
+
+    def _resolve(self):
+        value = object.__getattribute__(self, "_lazy_value")
+        if value is None:
+            module_name = object.__getattribute__(self, "_lazy_module")
+            attr_name = object.__getattribute__(self, "_lazy_attr")
+            module = importlib.import_module(module_name)
+            if attr_name is None:
+                # 与 import a.b 一致：绑定的是顶层包 a
+                value = sys.modules[module_name.split(".")[0]]
+            else:
+                value = getattr(module, attr_name)
+            object.__setattr__(self, "_lazy_value", value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __eq__(self, other):
+        return self._resolve() == other
+
+    def __hash__(self):
+        return hash(self._resolve())
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __repr__(self):
+        module_name = object.__getattribute__(self, "_lazy_module")
+        attr_name = object.__getattribute__(self, "_lazy_attr")
+        if object.__getattribute__(self, "_lazy_value") is None:
+            return f"<延迟导入 {module_name}{'.' + attr_name if attr_name else ''}（未加载）>"
+        return repr(self._resolve())
+
+
+def lazy_module(name):
+    """延迟导入模块，等价于 import name（带点号时绑定顶层包）"""
+    return _LazyObject(name)
+
+
+def lazy_from(module_name, *names):
+    """
+    延迟导入模块中的名称，等价于 from module_name import names
+    :return: 单个名称返回一个代理，多个名称返回代理元组
+    """
+    proxies = tuple(_LazyObject(module_name, name) for name in names)
+    return proxies[0] if len(proxies) == 1 else proxies
+
+
+def is_loaded(module_name):
+    """模块是否已经被真正导入"""
+    return module_name in sys.modules
+
+
+def warm_up(root, *module_names, delay_ms=200):
+    """
+    窗口首次绘制后，在后台线程预加载重型库（用户点按钮时通常已加载完成）
+    :param root: Tk主窗口
+    :param module_names: 需要预加载的模块名
+    """
+    def _load():
+        for name in module_names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # 缺依赖时等用户真正使用时再报错，预加载阶段静默
+                pass
+
+    def _start():
+        threading.Thread(target=_load, name="warm-up-imports", daemon=True).start()
+
+    root.after(delay_ms, _start)
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+按需加载docx - 只改XML的工具打开文档时不把 word/media 等二进制部件读进内存
+1. open_document(path) 与 docx.Document(path) 用法相同：XML部件（document.xml、样式、关系等）照常解析，
+   图片等非XML部件只记下在源zip中的位置，第一次访问 part.blob 时才读取
+2. 保存时未被访问过的二进制部件直接从源zip流式拷贝到新文件（按块读写，保持原压缩方式），不经过内存；
+   保存到源文件本身时先写临时文件再替换
+3. 打开耗时和内存只与XML大小相关，与图片大小无关
+4. 源文件在打开后被其他程序修改时，读取二进制部件会报 SourceChanged，不会拼出错乱的文件
+5. 传入文件对象（如 media_optimizer 的内存文件）时按原方式完整加载
+6. document_from_members()：由已读出的成员字典建文档（shm_transport 用共享内存传来的部件）
+
+用法：
+    Document = lazy_from("lazy_package", "open_document")   # 工具中替换 docx.Document
+    doc = Document(file_path)
+    ...只修改表格/段落...
+    doc.save(file_path)
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+
+from docx.api import Document as _eager_document
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.package import PartFactory, Unmarshaller
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.phys_pkg import PhysPkgWriter
+from docx.opc.pkgreader import PackageReader, _ContentTypeMap
+from docx.opc.pkgwriter import PackageWriter
+from docx.package import Package
+
+COPY_CHUNK = 1024 * 1024
+
+
+class SourceChanged(RuntimeError):
+    """源docx在打开后被修改，尚未读取的二进制部件已不可用"""
+
+
+class _ZipSource:
+    """源zip文件：记录打开时的大小和修改时间，每次读取前核对"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.stamp = self._stat()
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_size, st.st_mtime_ns
+
+    def open(self):
+        if self._stat() != self.stamp:
+            raise SourceChanged(f"文件打开后已被修改，无法读取其中的图片等部件：{self.path}")
+        return zipfile.ZipFile(self.path, "r")
+
+    def refresh(self):
+        """保存回源文件后，以新文件为准（未读取的部件已原样拷入，成员名不变）"""
+        self.stamp = self._stat()
+
+
+class _ZipMember:
+    """二进制部件在源zip中的位置（代替 blob 存在部件中）"""
+    __slots__ = ("source", "name", "size")
+
+    def __init__(self, source, name, size):
+        self.source = source
+        self.name = name
+        self.size = size
+
+    def read(self):
+        with self.source.open() as z:
+            return z.read(self.name)
+
+
+class _LazyZipReader:
+    """与 python-docx 的 _ZipPkgReader 接口相同，只是非XML部件返回 _ZipMember 而不是字节"""
+
+    def __init__(self, source):
+        self.source = source
+        self.content_types = None
+        self._zipf = source.open()
+
+    def blob_for(self, pack_uri):
+        if self.content_types is not None and pack_uri != CONTENT_TYPES_URI \
+                and not pack_uri.membername.endswith(".rels"):
+            try:
+                content_type = self.content_types[pack_uri]
+            except KeyError:
+                content_type = ""
+            if not content_type.endswith("xml"):
+                info = self._zipf.getinfo(pack_uri.membername)
+                return _ZipMember(self.source, info.filename, info.file_size)
+        return self._zipf.read(pack_uri.membername)
+
+    def close(self):
+        self._zipf.close()
+
+    @property
+    def content_types_xml(self):
+        return self.blob_for(CONTENT_TYPES_URI)
+
+    def rels_xml_for(self, source_uri):
+        try:
+            return self.blob_for(source_uri.rels_uri)
+        except KeyError:
+            return None
+
+
+# ========== 部件：blob 在第一次访问时读取 ==========
+class _LazyBlobMixin:
+    """_blob 改为属性：实例中存的是 _ZipMember 时，第一次访问才从源zip读取"""
+
+    @property
+    def _blob(self):
+        blob = self.__dict__.get("_blob")
+        if isinstance(blob, _ZipMember):
+            blob = self.__dict__["_blob"] = blob.read()
+        return blob
+
+    @_blob.setter
+    def _blob(self, value):
+        self.__dict__["_blob"] = value
+
+
+_lazy_classes = {}
+
+
+def _lazy_class(cls):
+    if cls not in _lazy_classes:
+        _lazy_classes[cls] = type(f"Lazy{cls.__name__}", (_LazyBlobMixin, cls), {})
+    return _lazy_classes[cls]
+
+
+def pending_member(part):
+    """部件尚未读取时返回其 _ZipMember，否则返回None"""
+    blob = part.__dict__.get("_blob")
+    return blob if isinstance(blob, _ZipMember) else None
+
+
+class LazyPackage(Package):
+    """保存时未读取的二进制部件直接从源zip流式拷贝"""
+    source = None
+
+    def save(self, pkg_file):
+        for part in self.parts:
+            part.before_marshal()
+        parts = self.parts
+        if not any(pending_member(p) for p in parts):
+            PackageWriter.write(pkg_file, self.rels, parts)
+            return
+        in_place = isinstance(pkg_file, (str, os.PathLike)) and os.path.exists(pkg_file) \
+            and os.path.samefile(pkg_file, self.source.path)
+        if not in_place:
+            self._write(pkg_file, parts)
+            return
+        # 保存回源文件：写到同目录临时文件后替换（拷贝过程中还要读源文件）
+        fd, tmp = tempfile.mkstemp(suffix=".docx", dir=os.path.dirname(self.source.path))
+        os.close(fd)
+        try:
+            self._write(tmp, parts)
+            shutil.copymode(self.source.path, tmp)
+            os.replace(tmp, self.source.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.source.refresh()
+
+    def _write(self, pkg_file, parts):
+        with self.source.open() as src:
+            phys_writer = PhysPkgWriter(pkg_file)
+            try:
+                PackageWriter._write_content_types_stream(phys_writer, parts)
+                PackageWriter._write_pkg_rels(phys_writer, self.rels)
+                for part in parts:
+                    member = pending_member(part)
+                    if member is None:
+                        phys_writer.write(part.partname, part.blob)
+                    else:
+                        _copy_member(src, member.name, phys_writer._zipf, part.partname.membername)
+                    if len(part.rels):
+                        phys_writer.write(part.partname.rels_uri, part.rels.xml)
+            finally:
+                phys_writer.close()
+
+
+def _copy_member(src, name, dst, new_name):
+    """把源zip成员按块拷到目标zip（保持原压缩方式）"""
+    src_info = src.getinfo(name)
+    info = zipfile.ZipInfo(new_name, date_time=src_info.date_time)
+    info.compress_type = src_info.compress_type
+    info.external_attr = src_info.external_attr
+    info.file_size = src_info.file_size
+    with src.open(src_info) as reader, dst.open(info, "w") as writer:
+        shutil.copyfileobj(reader, writer, COPY_CHUNK)
+
+
+class _MemberReader:
+    """从已读出的成员字典 {成员名: bytes/memoryview} 提供部件（共享内存传来的包，见 shm_transport.py）"""
+
+    def __init__(self, members):
+        self.members = members
+        self.content_types = None
+
+    def blob_for(self, pack_uri):
+        blob = self.members[pack_uri.membername]
+        if isinstance(blob, memoryview) and not self._is_binary(pack_uri):
+            return bytes(blob)  # XML要解析，二进制部件保留 memoryview 不复制
+        return blob
+
+    def _is_binary(self, pack_uri):
+        if self.content_types is None or pack_uri == CONTENT_TYPES_URI or pack_uri.membername.endswith(".rels"):
+            return False
+        try:
+            return not self.content_types[pack_uri].endswith("xml")
+        except KeyError:
+            return True
+
+    def close(self):
+        pass
+
+    @property
+    def content_types_xml(self):
+        return self.blob_for(CONTENT_TYPES_URI)
+
+    def rels_xml_for(self, source_uri):
+        try:
+            return self.blob_for(source_uri.rels_uri)
+        except KeyError:
+            return None
+
+
+# ========== 打开 ==========
+def _unmarshal(phys_reader, package):
+    """与 PackageReader.from_file + Package.open 步骤相同，只是物理读取器可替换"""
+    try:
+        content_types = _ContentTypeMap.from_xml(phys_reader.content_types_xml)
+        phys_reader.content_types = content_types
+        pkg_srels = PackageReader._srels_for(phys_reader, PACKAGE_URI)
+        sparts = PackageReader._load_serialized_parts(phys_reader, pkg_srels, content_types)
+    finally:
+        phys_reader.close()
+    Unmarshaller.unmarshal(PackageReader(content_types, pkg_srels, sparts), package, PartFactory)
+    return package
+
+
+def _main_document(package, origin):
+    document_part = package.main_document_part
+    if document_part.content_type != CT.WML_DOCUMENT_MAIN:
+        raise ValueError(f"file '{origin}' is not a Word file, content type is '{document_part.content_type}'")
+    return document_part.document
+
+
+def open_package(path):
+    """按需加载的 LazyPackage"""
+    source = _ZipSource(path)
+    package = LazyPackage()
+    package.source = source
+    _unmarshal(_LazyZipReader(source), package)
+    for part in package.iter_parts():
+        if pending_member(part) is not None:
+            part.__class__ = _lazy_class(type(part))
+    return package
+
+
+def open_document(docx=None, lazy=True):
+    """
+    代替 docx.Document：传入路径时按需加载二进制部件；传入文件对象/None 或 lazy=False 时按原方式加载
+    """
+    if not lazy or not isinstance(docx, (str, os.PathLike)):
+        return _eager_document(docx)
+    return _main_document(open_package(docx), docx)
+
+
+def document_from_members(members, origin=""):
+    """
+    由成员字典构建文档：XML部件解析，二进制部件的 blob 直接使用传入的 bytes/memoryview（不复制）
+    :param members: {zip成员名: bytes 或 memoryview}
+    """
+    return _main_document(_unmarshal(_MemberReader(members), Package()), origin)
+
+
+def pending_bytes(doc):
+    """文档中尚未读入内存的二进制部件总字节数（用于统计）"""
+    return sum(m.size for m in map(pending_member, doc.part.package.iter_parts()) if m is not None)
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+日志控件 - 替代各工具里无限增长的 ScrolledText 日志
+1. 内存中只保留最近 capacity 条（环形缓冲，deque(maxlen)），超出的最早记录自动丢弃
+2. 虚拟滚动：文本框里只放当前可见的几十行，滚动条/滚轮按记录序号翻页，
+   日志再多插入和重绘的开销也不变；停在底部时自动跟随最新日志
+3. 按级别筛选（全部 / 警告及以上 / 仅错误），级别按 ❌/⚠️ 等标记自动判断，也可显式传入
+4. 完整日志写入滚动文件（默认 ~/.word_toolbox/logs/<工具名>.log，5MB×5份），
+   同时写一份 JSON 事件（<工具名>.events.jsonl，每行一个事件），写文件在后台线程进行
+5. 界面只显示多行消息（traceback等）的前几行，完整内容在日志文件中
+
+用法：
+    self.log_text = LogView(frame, "表格添加列", height=20, font=("Consolas", 9))
+    self.log_text.pack(fill=tk.BOTH, expand=True)
+    self.log_text.write("处理完成")                    # 级别自动判断
+    self.log_text.write("跳过", level="WARNING", file=path)   # 额外字段写入 JSON 事件
+    self.log_text.clear()
+
+读取 JSON 事件：
+    for event in iter_events("表格添加列"):
+        ...
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import itertools
+import subprocess
+from collections import deque
+import logging.handlers
+import tkinter as tk
+import tkinter.font as tkfont
+
+LOG_DIR = os.path.join(os.path.expanduser("~"), ".word_toolbox", "logs")
+DEFAULT_CAPACITY = 20000
+MAX_VIEW_LINES = 4  # 多行消息在界面中最多显示的行数
+LOG_FILE_BYTES = 5 * 1024 * 1024
+LOG_FILE_COUNT = 5
+
+# 筛选项：(显示名, 最低级别)
+FILTERS = [("全部", logging.DEBUG), ("警告及以上", logging.WARNING), ("仅错误", logging.ERROR)]
+LEVEL_COLORS = {logging.WARNING: "#B8860B", logging.ERROR: "#D03030"}
+_ERROR_MARKS = ("❌", "失败", "错误", "Traceback", "Error")
+_WARNING_MARKS = ("⚠", "跳过", "警告", "Warning")
+
+
+def classify(message):
+    """根据消息内容判断级别"""
+    if any(mark in message for mark in _ERROR_MARKS):
+        return logging.ERROR
+    if any(mark in message for mark in _WARNING_MARKS):
+        return logging.WARNING
+    return logging.INFO
+
+
+# ========== 文件日志 ==========
+class _JsonFormatter(logging.Formatter):
+    def __init__(self, tool):
+        super().__init__()
+        self.tool = tool
+
+    def format(self, record):
+        event = {"time": round(record.created, 3), "tool": self.tool,
+                 "level": record.levelname, "message": record.getMessage()}
+        event.update(getattr(record, "fields", None) or {})
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+_listeners = {}
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name) or "tool"
+
+
+def log_paths(name, log_dir=None):
+    """(文本日志路径, JSON事件路径)"""
+    log_dir = log_dir or LOG_DIR
+    base = os.path.join(log_dir, _safe_name(name))
+    return base + ".log", base + ".events.jsonl"
+
+
+def get_file_logger(name, log_dir=None):
+    """
+    工具的文件日志：文本 + JSON 两个滚动文件，经队列交给后台线程写入（调用方不等磁盘）
+    同一名称只创建一次
+    """
+    logger = logging.getLogger(f"word_toolbox.{_safe_name(name)}")
+    if name in _listeners:
+        return logger
+    text_path, events_path = log_paths(name, log_dir)
+    os.makedirs(os.path.dirname(text_path), exist_ok=True)
+    text_handler = logging.handlers.RotatingFileHandler(
+        text_path, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_COUNT, encoding="utf-8", delay=True)
+    text_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+    events_handler = logging.handlers.RotatingFileHandler(
+        events_path, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_COUNT, encoding="utf-8", delay=True)
+    events_handler.setFormatter(_JsonFormatter(name))
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, text_handler, events_handler)
+    listener.start()
+    _listeners[name] = listener
+    logger.handlers[:] = [logging.handlers.QueueHandler(records)]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+@atexit.register
+def _stop_listeners():
+    """退出前把队列里的日志写完"""
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
+
+
+def iter_events(name, log_dir=None):
+    """按时间顺序读取工具的全部 JSON 事件（含已滚动的旧文件）"""
+    _, events_path = log_paths(name, log_dir)
+    paths = [f"{events_path}.{i}" for i in range(LOG_FILE_COUNT, 0, -1)] + [events_path]
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _view_lines(message):
+    """消息在界面中显示的行（多行消息截断）"""
+    lines = message.split("\n")
+    if len(lines) > MAX_VIEW_LINES:
+        lines = lines[:MAX_VIEW_LINES] + [f"  …（共{len(lines)}行，完整内容见日志文件）"]
+    return lines
+
+
+def _view_line_count(message):
+    return min(message.count("\n") + 1, MAX_VIEW_LINES + 1)
+
+
+# ========== 界面控件 ==========
+class LogView(tk.Frame):
+    """有上限的日志控件（环形缓冲 + 虚拟滚动 + 级别筛选 + 滚动文件）"""
+
+    def __init__(self, master, name, height=12, font=("Consolas", 9), capacity=DEFAULT_CAPACITY,
+                 log_dir=None, **text_options):
+        super().__init__(master)
+        self.name = name
+        self.logger = get_file_logger(name, log_dir)
+        self.log_path, self.events_path = log_paths(name, log_dir)
+        self.total = 0
+        # 每个筛选级别一个环形缓冲，追加/丢弃都是O(1)，切换筛选不用重新扫描
+        self._views = {level: deque(maxlen=capacity) for _, level in FILTERS}
+        self._level = FILTERS[0][1]
+        self._top = 0
+        self._follow = True
+        self._render_pending = False
+        self._height = height
+
+        # 顶部：筛选 + 计数 + 打开日志文件
+        bar = tk.Frame(self)
+        bar.pack(fill=tk.X)
+        tk.Label(bar, text="显示：", font=("微软雅黑", 8)).pack(side=tk.LEFT)
+        self._filter_var = tk.StringVar(value=FILTERS[0][0])
+        for label, _ in FILTERS:
+            tk.Radiobutton(bar, text=label, value=label, variable=self._filter_var, command=self._on_filter,
+                           font=("微软雅黑", 8)).pack(side=tk.LEFT)
+        tk.Button(bar, text="打开日志文件", command=self.open_log_file, font=("微软雅黑", 8),
+                  relief=tk.FLAT, fg="#409EFF").pack(side=tk.RIGHT)
+        self._count_var = tk.StringVar()
+        tk.Label(bar, textvariable=self._count_var, fg="#888888", font=("微软雅黑", 8)).pack(side=tk.RIGHT)
+
+        # 文本框只显示可见的几十行，滚动由下面的滚动条/滚轮接管
+        body = tk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        text_options.pop("state", None)
+        text_options.setdefault("wrap", tk.NONE)
+        self.text = tk.Text(body, height=height, font=font, state=tk.DISABLED, **text_options)
+        self.scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for level, color in LEVEL_COLORS.items():
+            self.text.tag_configure(str(level), foreground=color)
+        self._linespace = tkfont.Font(font=self.text.cget("font")).metrics("linespace")
+        self.text.bind("<Configure>", lambda _e: self._schedule())
+        self.text.bind("<MouseWheel>", self._on_wheel)
+        self.text.bind("<Button-4>", lambda _e: self._scroll_by(-3))
+        self.text.bind("<Button-5>", lambda _e: self._scroll_by(3))
+        self._render()
+
+    # ----- 写入 -----
+    def write(self, message, level=None, **fields):
+        """追加一条日志（可在任意线程调用）；fields 只写入 JSON 事件"""
+        message = str(message)
+        level = level if isinstance(level, int) else logging.getLevelName(level) if level else classify(message)
+        self.logger.log(level, message, extra={"fields": fields})
+        record = (level, message)
+        self.total += 1
+        for min_level, view in self._views.items():
+            if level >= min_level:
+                view.append(record)
+        self._schedule()
+
+    def clear(self):
+        """清空界面（日志文件保留）"""
+        for view in self._views.values():
+            view.clear()
+        self.total = 0
+        self._top = 0
+        self._follow = True
+        self._schedule()
+
+    def open_log_file(self):
+        if not os.path.exists(self.log_path):
+            return
+        opener = getattr(os, "startfile", None)
+        if opener:
+            opener(self.log_path)
+        else:
+            subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", self.log_path])
+
+    # ----- 虚拟滚动 -----
+    def _rows(self):
+        height = self.text.winfo_height()
+        if self._linespace and height > 1:
+            return max(1, height // self._linespace)
+        return self._height
+
+    def _schedule(self):
+        """合并重绘：多次写入只在空闲时重绘一次"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    @staticmethod
+    def _max_top(view, rows):
+        """最后一屏的第一条记录：从末尾往前累加各条显示的行数，直到占满 rows 行"""
+        top, used = len(view), 0
+        for _, message in reversed(view):
+            if used >= rows:
+                break
+            used += _view_line_count(message)
+            top -= 1
+        return top
+
+    def _render(self):
+        self._render_pending = False
+        view = self._views[self._level]
+        count = len(view)
+        rows = self._rows()
+        max_top = self._max_top(view, rows)
+        if self._follow:
+            self._top = max_top
+        self._top = min(max(0, self._top), max_top)
+        at_bottom = self._top >= max_top
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        used = 0
+        for level, message in itertools.islice(view, self._top, self._top + rows):
+            lines = _view_lines(message)
+            self.text.insert(tk.END, ("\n" if used else "") + "\n".join(lines), str(level))
+            used += len(lines)
+            # 最后一屏画到最新一条为止（第一条可能只露出后几行）
+            if used >= rows and not at_bottom:
+                break
+        if at_bottom:
+            self.text.see(tk.END)  # 最后一屏超出可见行数或长消息自动换行时，保证最新一行可见
+        self.text.config(state=tk.DISABLED)
+
+        if max_top == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            # 一屏按最后一屏的记录数计，滑块到底时正好是 max_top
+            self.scrollbar.set(self._top / count, (self._top + count - max_top) / count)
+        dropped = self.total - len(self._views[FILTERS[0][1]])
+        self._count_var.set(f"{count} 条" + (f"（已移出最早 {dropped} 条，见日志文件）" if dropped else "") + "  ")
+
+    def _scroll_to(self, top):
+        max_top = self._max_top(self._views[self._level], self._rows())
+        self._top = max(0, min(top, max_top))
+        self._follow = self._top >= max_top
+        self._schedule()
+
+    def _scroll_by(self, lines):
+        self._scroll_to(self._top + lines)
+        return "break"
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self._views[self._level])))
+        else:
+            step = self._rows() if unit == "pages" else 1
+            self._scroll_by(int(amount) * step)
+
+    def _on_wheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_filter(self):
+        self._level = dict(FILTERS)[self._filter_var.get()]
+        self._follow = True
+        self._schedule()
@@ -1,9 +1,17 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
 import datetime
-from docx import Document
-from docxcompose.composer import Composer
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+Document = lazy_from("docx", "Document")
+MergeComposer = lazy_from("merge_engine", "MergeComposer")
+MediaOptimizer = lazy_from("media_optimizer", "MediaOptimizer")
+ParallelFeeder = lazy_from("shm_transport", "ParallelFeeder")
+SegmentRecorder, remerge = lazy_from("merge_segments", "SegmentRecorder", "remerge")
+filter_duplicates = lazy_from("input_dedup", "filter_duplicates")
+validate_inputs = lazy_from("docx_preflight", "validate_inputs")
+from mem_profile import MemoryProfiler, docx_structure_stats, profiling_requested
 
 # 安装依赖（执行以下命令）：
 # pip install python-docx python-docx-composer
@@ -13,7 +21,7 @@ class WordMergerGUI:
         # 主窗口配置
         self.root = root
         self.root.title("Word文档合并工具（保留页眉/图片/表格）")
-        self.root.geometry("700x400")
+        self.root.geometry("700x555")
         self.root.resizable(False, False)
         
         # ========== 1. 文件夹选择区域 ==========
@@ -55,6 +63,43 @@ class WordMergerGUI:
         frame3 = tk.Frame(root, padx=20, pady=20)
         frame3.pack(fill=tk.X)
         
+        # 内存分析模式（默认关闭，环境变量WORD_MEM_PROFILE=1时默认勾选）
+        self.mem_profile_var = tk.BooleanVar(value=profiling_requested())
+        tk.Checkbutton(
+            frame3, text="内存分析模式（每个文档采样内存，报告写在输出文件旁）",
+            variable=self.mem_profile_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 图片压缩（需要Pillow）：按显示尺寸降采样到150DPI，BMP/TIFF转PNG
+        self.optimize_media_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            frame3, text="合并前压缩图片（按显示尺寸降采样到150DPI，需要Pillow）",
+            variable=self.optimize_media_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 多进程预读：工作进程读取/压缩后面的文档，图片等部件经共享内存交给合并进程（不经pickle复制）
+        self.parallel_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            frame3, text="多进程预读（图片等部件经共享内存传输，文件多、图片大时更快）",
+            variable=self.parallel_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 增量合并：按输出文件旁的分段记录（.segments.json）只替换修改过/新增/删除的报告
+        self.incremental_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame3, text="增量合并（在输出文件旁写出 .segments.json，再次合并时只替换修改过的报告）",
+            variable=self.incremental_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 重复输入：字节相同或只有rsid/保存时间不同的副本（如批量改名留下的 _1 拷贝）
+        self.skip_duplicates_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame3, text="跳过重复文件（内容相同的副本只保留第一份；不勾选时只在日志中报告）",
+            variable=self.skip_duplicates_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 合并前文件检查：损坏/加密/不支持的文件排除后继续，或直接中止
+        self.exclude_bad_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame3, text="排除有问题的文件后继续（不勾选时发现损坏/加密/不支持的文件即中止合并）",
+            variable=self.exclude_bad_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        
         self.btn_merge = tk.Button(
             frame3, text="开始合并文档", command=self.merge_documents,
             font=("微软雅黑", 14, "bold"), bg="#32CD32", fg="white",
@@ -67,7 +112,7 @@ class WordMergerGUI:
         frame4.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame4, text="操作日志：", font=("微软雅黑", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame4, height=8, font=("Consolas", 9))
+        self.log_text = LogView(frame4, "合并Word", height=8, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
         # 初始化日志
@@ -77,8 +122,7 @@ class WordMergerGUI:
     def log(self, content):
         """添加带时间戳的日志"""
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)  # 自动滚动到最新日志
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()  # 实时刷新
 
     def select_folder(self):
@@ -129,39 +173,128 @@ class WordMergerGUI:
                 messagebox.showwarning("警告", "所选文件夹内无有效的.docx文件！")
                 return
             
+            # 合并前检查（多进程，数秒内完成）：有问题的文件在合并开始前排除或中止，不会合并到一半才失败
+            docx_files, bad_files = validate_inputs(docx_files, log=self.log)
+            if bad_files and not self.exclude_bad_var.get():
+                messagebox.showerror("文件检查未通过", f"{len(bad_files)} 个文件有问题（详见日志），已取消合并")
+                return
+            if not docx_files:
+                messagebox.showwarning("警告", "没有可合并的文件（全部未通过检查）！")
+                return
+            
+            # 重复输入（多进程计算指纹）：勾选时跳过，否则只报告
+            policy = "skip" if self.skip_duplicates_var.get() else "report"
+            docx_files, _ = filter_duplicates(docx_files, policy, log=self.log)
+            
             self.log("="*50)
             self.log(f"🚀 开始合并 - 共 {len(docx_files)} 个文件")
             self.log("="*50)
             
-            # 4. 核心合并逻辑（docxcompose是最稳定的方式）
-            # 以第一个文档为基础
-            master_doc = Document(docx_files[0])
-            composer = Composer(master_doc)
+            optimizer = None
+            if self.optimize_media_var.get():
+                try:
+                    optimizer = MediaOptimizer(log=self.log)
+                    self.log("🗜️ 已开启图片压缩（目标150DPI）")
+                except ImportError:
+                    self.log("⚠️ 未安装Pillow（pip install Pillow），跳过图片压缩")
+            open_source = optimizer.open_docx if optimizer else (lambda path: path)
+            # 影响合并结果的选项，与分段记录中的不同时不能增量合并
+            options = {"optimize_media": optimizer is not None}
             
-            # 逐个追加其他文档
-            for idx, file_path in enumerate(docx_files[1:], 2):
-                self.log(f"📄 正在合并第 {idx} 个文件：{os.path.basename(file_path)}")
-                doc = Document(file_path)
-                composer.append(doc)  # 保留所有格式、页眉、图片、表格
+            if self.incremental_var.get():
+                result = remerge(output_path, docx_files, source_folder, options,
+                                 open_input=lambda path: Document(open_source(path)), log=self.log)
+                if result is not None:
+                    self.log(f"⚡ 增量合并：替换 {result.changed} 个，删除 {result.removed} 个，"
+                             f"新增 {result.added} 个，复用 {result.unchanged} 个")
+                    if optimizer:
+                        self.log(optimizer.summary())
+                        optimizer.close()
+                    self._report_success(output_path, len(docx_files))
+                    return
             
-            # 5. 保存合并后的文档
-            composer.save(output_path)
+            feeder = None
+            if self.parallel_var.get():
+                # 图片压缩改在工作进程中进行
+                feeder = ParallelFeeder(docx_files, optimize_dpi=optimizer.target_dpi if optimizer else None,
+                                        log=self.log)
+                if optimizer:
+                    optimizer.close()
+                    optimizer = None
+                self.log(f"🔀 已开启多进程预读（{feeder.workers} 个进程）")
             
-            # 6. 合并完成
-            self.log("="*50)
-            self.log(f"🎉 合并成功！")
-            self.log(f"📁 输出文件：{output_path}")
-            self.log("="*50)
+            profiler = None
+            if self.mem_profile_var.get():
+                # 在打开第一个文档前开始，基础文档的内存也计入
+                profiler = MemoryProfiler(log=self.log)
+                profiler.start()
+                self.log("🧠 已开启内存分析模式")
+            try:
+                # 4. 核心合并逻辑（docxcompose是最稳定的方式）
+                # 以第一个文档为基础（多进程时它的共享内存段一直持有到保存完成）
+                master_doc = next(feeder)[0] if feeder else Document(open_source(docx_files[0]))
+                composer = MergeComposer(master_doc)
+                recorder = SegmentRecorder(composer, source_folder, options)
+                recorder.add_master(docx_files[0])
+                if feeder:
+                    composer.known_digest = feeder.digest  # 图片哈希已在工作进程算好
+                
+                # 逐个追加其他文档
+                for idx, file_path in enumerate(docx_files[1:], 2):
+                    self.log(f"📄 正在合并第 {idx} 个文件：{os.path.basename(file_path)}")
+                    if feeder:
+                        doc, lease = next(feeder)
+                        recorder.append(doc, file_path)
+                        feeder.keep(composer.take_new_parts())  # 合并结果引用的段保存前不释放
+                        lease.release()
+                    else:
+                        doc = Document(open_source(file_path))
+                        recorder.append(doc, file_path)
+                    del doc
+                    if profiler:
+                        profiler.sample(
+                            os.path.basename(file_path),
+                            docx_structure_stats(master_doc, composer, profiler.want_element_count())
+                        )  # 保留所有格式、页眉、图片、表格
+                
+                # 5. 保存合并后的文档
+                composer.save(output_path)
+                if self.incremental_var.get():
+                    recorder.save(output_path)  # 分段记录，下次增量合并使用（不勾选增量合并时不写出）
+            finally:
+                if feeder:
+                    feeder.close()
+                if profiler:
+                    profiler.stop()  # 合并出错时也要关闭 tracemalloc，否则之后的合并都变慢
+            self.log(composer.media_summary())
+            self.log(composer.style_summary())
+            if feeder:
+                self.log(feeder.summary())
+            if optimizer:
+                self.log(optimizer.summary())
+                optimizer.close()
+            if profiler:
+                report_path = profiler.write_report(output_path)
+                self.log(f"🧠 内存分析报告：{report_path}")
             
-            messagebox.showinfo("合并完成", 
-                f"✅ 文档合并成功！\n"
-                f"📄 共合并 {len(docx_files)} 个Word文件\n"
-                f"💾 输出路径：\n{output_path}")
+            # 6. 合并完成
+            self._report_success(output_path, len(docx_files))
         
         except Exception as e:
             self.log(f"❌ 合并失败：{str(e)}")
             messagebox.showerror("合并失败", f"合并过程出错：\n{str(e)}")
 
+    def _report_success(self, output_path, file_count):
+        self.log("="*50)
+        self.log(f"🎉 合并成功！")
+        self.log(f"📁 输出文件：{output_path}")
+        self.log("="*50)
+        
+        messagebox.showinfo("合并完成", 
+            f"✅ 文档合并成功！\n"
+            f"📄 共合并 {file_count} 个Word文件\n"
+            f"💾 输出路径：\n{output_path}")
+
 if __name__ == "__main__":
     # 适配Windows高分屏（解决界面模糊）
     try:
@@ -173,4 +306,6 @@ if __name__ == "__main__":
     # 启动主窗口（无弹窗，直接显示界面）
     root = tk.Tk()
     app = WordMergerGUI(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx", "merge_engine")
     root.mainloop()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+裕量/限值评估 - 根据表格里的 Frequency/QuasiPeak/Margin/Limit 数据生成「备注」行文字
+1. 一次运行中全部文件的全部表格拼成一组 NumPy 数组，整批向量化计算（不逐行循环）：
+   - 裕量 = QuasiPeak - Limit（表格里的 Margin 列为空时按此计算），大于0即超限
+   - 按频段（传导 0.15-0.5/0.5-5/5-30MHz，辐射 30-230/230-1000MHz）统计每个表格的最大裕量
+   - 落在背景噪声频段（FM广播等）内的超限单独标记，不判为不合格
+2. 按评估结果生成备注：
+   - 无超限：各频段峰值均低于限值，并给出最接近限值的频点
+   - 只有背景噪声频段超限：背景噪声超限值频段除外（列出频段），其余频段峰值均低于限值
+   - 其余频段超限：列出超限频段和最大超出量，不合格
+3. 表格数据用 table_extract 的 iterparse 流式读取（多进程），不经过 python-docx
+
+依赖：pip install numpy
+
+用法：
+    remarks = evaluate_files(paths)              # {绝对路径: {表格序号: 评估结果}}
+    remark_text(remarks[path][0])                # "备注：……"
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from table_extract import extract_file
+
+# 频段边界（MHz），相邻频段共用边界，超出范围的频点归入「其他」
+BAND_EDGES_MHZ = [0.15, 0.5, 5.0, 30.0, 230.0, 1000.0]
+# 背景噪声频段：(起始MHz, 终止MHz, 名称)
+AMBIENT_BANDS_MHZ = [
+    (87.5, 108.0, "FM广播"),
+    (470.0, 806.0, "电视广播"),
+    (870.0, 960.0, "移动通信"),
+]
+
+
+def _fmt_freq(freq):
+    return f"{freq:.3f}".rstrip("0").rstrip(".") + "MHz"
+
+
+def band_labels():
+    edges = [_fmt_freq(edge)[:-3] for edge in BAND_EDGES_MHZ]
+    return [f"{lo}-{hi}MHz" for lo, hi in zip(edges, edges[1:])] + ["其他"]
+
+
+def evaluate_tables(tables):
+    """
+    批量评估多个表格
+    :param tables: [{"frequency": [...], "quasi_peak": [...], "margin": [...], "limit": [...]}, ...]
+                   （数值或None）
+    :return: 与输入对应的评估结果列表；表格没有有效数据时为None
+    """
+    import numpy as np
+    if not tables:
+        return []
+    lengths = np.array([len(t["frequency"]) for t in tables])
+
+    def column(name):
+        values = [v for t in tables for v in t[name]]
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    freq = column("frequency")
+    quasi_peak = column("quasi_peak")
+    limit = column("limit")
+    margin = column("margin")
+    margin = np.where(np.isnan(margin), quasi_peak - limit, margin)
+    table_id = np.repeat(np.arange(len(tables)), lengths)
+    valid = ~(np.isnan(freq) | np.isnan(margin))
+    freq, margin, table_id = freq[valid], margin[valid], table_id[valid]
+
+    labels = band_labels()
+    other = len(labels) - 1
+    band = np.searchsorted(BAND_EDGES_MHZ, freq, side="right") - 1
+    band = np.where((band < 0) | (band >= other), other, band)
+    band[freq == BAND_EDGES_MHZ[-1]] = other - 1  # 上边界归入最后一个频段
+    ambient = np.full(freq.shape, -1)
+    for idx, (low, high, _) in enumerate(AMBIENT_BANDS_MHZ):
+        ambient[(ambient < 0) & (freq >= low) & (freq <= high)] = idx
+    exceed = margin > 0
+    hard_exceed = exceed & (ambient < 0)
+
+    count = len(tables)
+    rows = np.bincount(table_id, minlength=count)
+    exceed_count = np.bincount(table_id, weights=hard_exceed, minlength=count).astype(int)
+    ambient_count = np.bincount(table_id, weights=exceed & (ambient >= 0), minlength=count).astype(int)
+    # 每个(表格, 频段)的最大裕量
+    band_worst = np.full(count * len(labels), -np.inf)
+    np.maximum.at(band_worst, table_id * len(labels) + band, margin)
+    band_worst = band_worst.reshape(count, len(labels))
+    # 每个表格最大裕量所在行：按 (表格, -裕量) 排序后取每个表格的第一行
+    order = np.lexsort((-margin, table_id))
+    first = np.searchsorted(table_id[order], np.arange(count))
+    # 不含背景噪声频段的最大裕量
+    hard_margin = np.where(ambient < 0, margin, -np.inf)
+    hard_order = np.lexsort((-hard_margin, table_id))
+    hard_first = np.searchsorted(table_id[hard_order], np.arange(count))
+
+    # 超限行通常很少，只对这些行逐个归类
+    ambient_hits = [set() for _ in range(count)]
+    exceed_bands = [set() for _ in range(count)]
+    for i in np.nonzero(exceed)[0]:
+        if ambient[i] >= 0:
+            ambient_hits[table_id[i]].add(AMBIENT_BANDS_MHZ[ambient[i]][2])
+        else:
+            exceed_bands[table_id[i]].add(int(band[i]))
+
+    results = []
+    for t in range(count):
+        if rows[t] == 0:
+            results.append(None)
+            continue
+        worst = order[first[t]]
+        hard = hard_order[hard_first[t]]
+        results.append({
+            "rows": int(rows[t]),
+            "pass": bool(exceed_count[t] == 0),
+            "exceed": int(exceed_count[t]),
+            "ambient_exceed": int(ambient_count[t]),
+            "ambient_bands": sorted(ambient_hits[t]),
+            "exceed_bands": [labels[b] for b in sorted(exceed_bands[t])],
+            "worst_margin": float(margin[worst]),
+            "worst_frequency": float(freq[worst]),
+            "worst_hard_margin": float(hard_margin[hard]) if np.isfinite(hard_margin[hard]) else None,
+            "worst_hard_frequency": float(freq[hard]) if np.isfinite(hard_margin[hard]) else None,
+            "band_worst": {labels[b]: float(v) for b, v in enumerate(band_worst[t]) if np.isfinite(v)},
+        })
+    return results
+
+
+def remark_text(result):
+    """根据评估结果生成备注；无有效数据时返回None（沿用原配置的备注）"""
+    if not result:
+        return None
+    if not result["pass"]:
+        return (f"备注：{'、'.join(result['exceed_bands'])}频段超限值，最大超出"
+                f"{result['worst_hard_margin']:.2f}dB（{_fmt_freq(result['worst_hard_frequency'])}），不合格")
+    if result["ambient_exceed"]:
+        return f"备注：背景噪声超限值频段（{'、'.join(result['ambient_bands'])}）除外，其余频段峰值均低于限值"
+    worst = result["worst_hard_margin"] if result["worst_hard_margin"] is not None else result["worst_margin"]
+    frequency = result["worst_hard_frequency"] or result["worst_frequency"]
+    return f"备注：各频段峰值均低于限值，最小裕量{abs(worst):.2f}dB（{_fmt_freq(frequency)}）"
+
+
+def evaluate_files(paths, max_workers=None):
+    """
+    读取多个文件的全部测量表格并整批评估
+    :return: {绝对路径: {表格序号: 评估结果}}
+    """
+    paths = [os.path.abspath(p) for p in paths]
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    if max_workers == 1 or len(paths) < 8:
+        extracted = [extract_file(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            extracted = list(executor.map(extract_file, paths, chunksize=max(1, len(paths) // (max_workers * 4))))
+    keys = []
+    tables = []
+    for path, records, _ in extracted:
+        grouped = {}
+        for record in records:
+            grouped.setdefault(record["table_index"], []).append(record)
+        for table_idx, rows in grouped.items():
+            keys.append((path, table_idx))
+            tables.append({name: [r[name] for r in rows] for name in ("frequency", "quasi_peak", "margin", "limit")})
+    evaluated = {path: {} for path in paths}
+    for (path, table_idx), result in zip(keys, evaluate_tables(tables)):
+        evaluated[path][table_idx] = result
+    return evaluated
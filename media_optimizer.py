@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+图片压缩（合并/转PDF前的可选步骤）
+功能：
+1. 读取docx里正文、页眉、页脚引用的每张图片的显示尺寸（wp:extent）
+2. 按目标DPI计算需要的像素，超出的图片降采样；BMP/TIFF等未压缩格式一律重新编码为PNG
+3. 每张 word/media 图片只解码一次（多处引用时取最大显示尺寸），多张图片在线程池中并行处理
+4. 结果按「图片内容sha256 + 目标像素」缓存（内存 + 可选磁盘目录），同一Logo/参考图整批只处理一次
+5. 文件扩展名变化时同步改写 .rels 的 Target 和 [Content_Types].xml，显示尺寸不变
+
+依赖：pip install Pillow（未安装时 MediaOptimizer() 抛出 ImportError，调用方跳过该步骤）
+
+用法：
+    optimizer = MediaOptimizer(target_dpi=150, log=self.log)
+    doc = Document(optimizer.open_docx(path))          # 在内存中压缩后直接打开
+    optimizer.optimize_file(src_path, dst_path)         # 或写出压缩后的副本
+    self.log(optimizer.summary())
+    optimizer.close()
+"""
+import io
+import os
+import re
+import hashlib
+import posixpath
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+EMU_PER_INCH = 914400
+NS = {
+    "wp": "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+}
+_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_IMAGE_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+# 会引用图片的XML部件
+_IMAGE_HOST_RE = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+# 可处理的图片格式（EMF/WMF/SVG等矢量图不动）
+RASTER_EXTS = {"png", "bmp", "tif", "tiff", "jpg", "jpeg", "gif"}
+# 未压缩格式：即使尺寸合适也重新编码
+UNCOMPRESSED_EXTS = {"bmp", "tif", "tiff"}
+CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "jpg": "image/jpeg"}
+
+
+def _rels_name(part_name):
+    folder, name = posixpath.split(part_name)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def collect_display_sizes(zin):
+    """
+    统计每个媒体部件的最大显示尺寸
+    :return: {"word/media/image1.png": (宽英寸, 高英寸)}
+    """
+    names = set(zin.namelist())
+    sizes = {}
+    for part_name in names:
+        if not _IMAGE_HOST_RE.match(part_name):
+            continue
+        rels_name = _rels_name(part_name)
+        if rels_name not in names:
+            continue
+        targets = {}
+        for rel in ET.fromstring(zin.read(rels_name)).iter(f"{{{_REL_NS}}}Relationship"):
+            if rel.get("Type") == _IMAGE_REL_TYPE and rel.get("TargetMode") != "External":
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part_name), rel.get("Target")))
+                targets[rel.get("Id")] = target
+        if not targets:
+            continue
+        root = ET.fromstring(zin.read(part_name))
+        for tag in ("inline", "anchor"):
+            for drawing in root.iter(f"{{{NS['wp']}}}{tag}"):
+                extent = drawing.find("wp:extent", NS)
+                if extent is None:
+                    continue
+                width = int(extent.get("cx", 0)) / EMU_PER_INCH
+                height = int(extent.get("cy", 0)) / EMU_PER_INCH
+                for blip in drawing.iter(f"{{{NS['a']}}}blip"):
+                    target = targets.get(blip.get(f"{{{NS['r']}}}embed"))
+                    if target:
+                        old = sizes.get(target, (0, 0))
+                        sizes[target] = (max(old[0], width), max(old[1], height))
+    return sizes
+
+
+def transcode_image(blob, ext, target_px, jpeg_quality=85):
+    """
+    解码一次，按需降采样并重新编码
+    :param target_px: (宽, 高) 需要的像素；None 表示只重新编码不缩放
+    :return: (新字节, 新扩展名)；无收益时返回 None
+    """
+    from PIL import Image
+    img = Image.open(io.BytesIO(blob))
+    if getattr(img, "n_frames", 1) > 1:
+        return None  # 动图保持原样
+    img.load()
+    resized = False
+    if target_px:
+        scale = min(target_px[0] / img.width, target_px[1] / img.height)
+        if scale < 0.95:
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(size, Image.LANCZOS)
+            resized = True
+    if not resized and ext not in UNCOMPRESSED_EXTS:
+        return None
+
+    out = io.BytesIO()
+    if ext in ("jpg", "jpeg"):
+        img.convert("RGB").save(out, "JPEG", quality=jpeg_quality, optimize=True)
+        new_ext = ext
+    else:
+        # 曲线图/截图颜色少，调色板PNG无损且体积小；颜色多时保存为优化过的PNG
+        if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.mode in ("RGB", "L") and img.getcolors(256) is not None:
+            img = img.convert("P", palette=Image.ADAPTIVE, colors=256)
+        img.save(out, "PNG", optimize=True)
+        new_ext = "png"
+    data = out.getvalue()
+    if new_ext == ext and len(data) >= len(blob):
+        return None
+    return data, new_ext
+
+
+class MediaOptimizer:
+    """docx图片压缩器，缓存和线程池在整批文档间共享"""
+
+    def __init__(self, target_dpi=150, jpeg_quality=85, cache_dir=None, max_workers=None, log=None):
+        """
+        :param target_dpi: 按显示尺寸计算像素时使用的DPI
+        :param cache_dir: 磁盘缓存目录（可选，跨次运行复用）
+        :param max_workers: 并行处理图片的线程数（Pillow解码/缩放/编码时释放GIL）
+        """
+        import PIL  # noqa: F401  未安装时由调用方提示并跳过
+        self.target_dpi = target_dpi
+        self.jpeg_quality = jpeg_quality
+        self.cache_dir = cache_dir
+        self.log = log or (lambda message: None)
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 2)
+        self.images_optimized = 0
+        self.cache_hits = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # ========== 缓存 ==========
+    def _cache_key(self, blob, target_px):
+        size = f"{target_px[0]}x{target_px[1]}" if target_px else "orig"
+        return f"{hashlib.sha256(blob).hexdigest()}_{size}_q{self.jpeg_quality}"
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key in self._cache:
+                return True, self._cache[key]
+        if self.cache_dir:
+            for ext in ("png", "jpeg", "jpg", "keep"):
+                path = os.path.join(self.cache_dir, f"{key}.{ext}")
+                if not os.path.exists(path):
+                    continue
+                if ext == "keep":
+                    result = None
+                else:
+                    with open(path, "rb") as f:
+                        result = (f.read(), ext)
+                with self._lock:
+                    self._cache[key] = result
+                return True, result
+        return False, None
+
+    def _cache_put(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+        if self.cache_dir:
+            ext = result[1] if result else "keep"
+            with open(os.path.join(self.cache_dir, f"{key}.{ext}"), "wb") as f:
+                f.write(result[0] if result else b"")
+
+    def _process(self, blob, ext, target_px):
+        key = self._cache_key(blob, target_px)
+        hit, result = self._cache_get(key)
+        if hit:
+            with self._lock:
+                self.cache_hits += 1
+            return result
+        try:
+            result = transcode_image(blob, ext, target_px, self.jpeg_quality)
+        except Exception as e:
+            self.log(f"⚠️ 图片处理失败，保留原图：{e}")
+            result = None
+        self._cache_put(key, result)
+        return result
+
+    # ========== docx处理 ==========
+    def optimize_bytes(self, data):
+        """
+        压缩docx字节中的图片
+        :return: 新的docx字节（没有可压缩的图片时原样返回）
+        """
+        with zipfile.ZipFile(io.BytesIO(data)) as zin:
+            sizes = collect_display_sizes(zin)
+            jobs = []
+            for name in zin.namelist():
+                ext = name.rsplit(".", 1)[-1].lower()
+                if not name.startswith("word/media/") or ext not in RASTER_EXTS:
+                    continue
+                inches = sizes.get(name)
+                target_px = None
+                if inches and inches[0] > 0 and inches[1] > 0:
+                    target_px = (max(1, round(inches[0] * self.target_dpi)),
+                                 max(1, round(inches[1] * self.target_dpi)))
+                elif ext not in UNCOMPRESSED_EXTS:
+                    continue
+                jobs.append((name, zin.read(name), ext, target_px))
+            if not jobs:
+                return data
+
+            results = self._pool.map(lambda job: self._process(job[1], job[2], job[3]), jobs)
+            replaced = {}
+            for (name, blob, ext, _), result in zip(jobs, results):
+                if result is None:
+                    continue
+                new_blob, new_ext = result
+                new_name = name if new_ext == ext else name.rsplit(".", 1)[0] + "." + new_ext
+                replaced[name] = (new_name, new_blob)
+                self.images_optimized += 1
+                self.bytes_before += len(blob)
+                self.bytes_after += len(new_blob)
+            if not replaced:
+                return data
+            return self._rewrite(zin, replaced)
+
+    def _rewrite(self, zin, replaced):
+        """写出新docx：替换图片，改名的图片同步修改 .rels 和 [Content_Types].xml"""
+        # 改名后不能与原有成员、也不能与本次已改好的新名称重复（如 image1.bmp、image1.tif 都转成 png）
+        taken = set(zin.namelist())
+        renames = {}
+        for old_name, (new_name, blob) in list(replaced.items()):
+            if new_name == old_name:
+                continue
+            base, ext = new_name.rsplit(".", 1)
+            suffix = 0
+            while new_name in taken:
+                suffix += 1
+                new_name = f"{base}_opt{suffix if suffix > 1 else ''}.{ext}"
+            taken.add(new_name)
+            replaced[old_name] = (new_name, blob)
+            renames[old_name] = new_name
+
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+            for item in zin.infolist():
+                name = item.filename
+                if name in replaced:
+                    new_name, blob = replaced[name]
+                    # 已压缩的图片格式不再deflate
+                    zout.writestr(new_name, blob, compress_type=zipfile.ZIP_STORED)
+                    continue
+                data = zin.read(name)
+                if renames and name.endswith(".rels"):
+                    data = self._rewrite_rels(name, data, renames)
+                elif renames and name == "[Content_Types].xml":
+                    data = self._rewrite_content_types(data, renames)
+                zout.writestr(item, data)
+        return out.getvalue()
+
+    @staticmethod
+    def _rewrite_rels(rels_name, data, renames):
+        # word/_rels/document.xml.rels 中的 Target 相对 word/ 目录
+        base = posixpath.dirname(posixpath.dirname(rels_name))
+        text = data.decode("utf-8")
+        for old_name, new_name in renames.items():
+            old_target = posixpath.relpath(old_name, base)
+            new_target = posixpath.relpath(new_name, base)
+            text = text.replace(f'Target="{old_target}"', f'Target="{new_target}"')
+            text = text.replace(f'Target="/{old_name}"', f'Target="/{new_name}"')
+        return text.encode("utf-8")
+
+    @staticmethod
+    def _rewrite_content_types(data, renames):
+        text = data.decode("utf-8")
+        for old_name, new_name in renames.items():
+            text = text.replace(f'PartName="/{old_name}"', f'PartName="/{new_name}"')
+        root = ET.fromstring(data)
+        defaults = {d.get("Extension", "").lower() for d in root.iter(f"{{{_CT_NS}}}Default")}
+        for ext in {n.rsplit(".", 1)[1] for n in renames.values()} - defaults:
+            text = text.replace(
+                "</Types>",
+                f'<Default Extension="{ext}" ContentType="{CONTENT_TYPES.get(ext, "image/" + ext)}"/></Types>'
+            )
+        return text.encode("utf-8")
+
+    def open_docx(self, path):
+        """返回压缩后的docx内存文件，可直接传给 Document()"""
+        with open(path, "rb") as f:
+            return io.BytesIO(self.optimize_bytes(f.read()))
+
+    def optimize_file(self, src_path, dst_path=None):
+        """压缩docx并写到 dst_path（为空时覆盖原文件），返回写出的路径"""
+        with open(src_path, "rb") as f:
+            data = self.optimize_bytes(f.read())
+        dst_path = dst_path or src_path
+        with open(dst_path, "wb") as f:
+            f.write(data)
+        return dst_path
+
+    # ========== 统计 ==========
+    def summary(self):
+        saved = self.bytes_before - self.bytes_after
+        return (f"🗜️ 图片压缩：处理 {self.images_optimized} 张（缓存命中 {self.cache_hits} 次），"
+                f"{self.bytes_before / 1024 / 1024:.2f} MB → {self.bytes_after / 1024 / 1024:.2f} MB，"
+                f"节省 {saved / 1024 / 1024:.2f} MB")
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+合并过程内存分析（可选开启）
+功能：
+1. 每追加一个文档采样一次：进程RSS + tracemalloc快照
+2. 统计主文档结构规模：XML元素数、图片部件数量/字节数、Composer映射表、PDF页数
+3. 把内存增长归因到分配位置（文件:行号），并按库汇总（lxml/python-docx/docxcompose/PyPDF2）
+4. 合并结束后在输出文件旁写出报告：<输出文件>.memprofile.txt / .json
+
+说明：lxml的XML树由libxml2直接分配，tracemalloc看不到，只体现在RSS和XML元素数上；
+图片字节、Composer映射表、PyPDF2对象都是Python对象，能被tracemalloc归因。
+
+开启方式：GUI勾选「内存分析模式」，或设置环境变量 WORD_MEM_PROFILE=1
+"""
+import os
+import json
+import time
+import tracemalloc
+
+# 分配位置路径中包含这些片段时，归入对应类别（按顺序匹配）
+CATEGORY_PATTERNS = [
+    ("docxcompose", "docxcompose"),
+    ("python-docx", os.sep + "docx" + os.sep),
+    ("lxml", "lxml"),
+    ("PyPDF2", "PyPDF2"),
+    ("zipfile", "zipfile"),
+]
+
+
+# 分析工具自身的分配不计入结果
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def profiling_requested():
+    """环境变量是否要求开启内存分析"""
+    return os.environ.get("WORD_MEM_PROFILE", "").strip() not in ("", "0", "false", "False")
+
+
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return 0
+
+
+def _category(filename):
+    for name, pattern in CATEGORY_PATTERNS:
+        if pattern in filename:
+            return name
+    return "其他"
+
+
+def _mb(value):
+    return value / 1024 / 1024
+
+
+def docx_structure_stats(doc, composer=None, count_elements=True):
+    """
+    统计主文档中可能持续增长的结构
+    :param doc: python-docx Document
+    :param composer: docxcompose Composer（可选）
+    """
+    stats = {}
+    if count_elements:
+        stats["xml_elements"] = sum(1 for _ in doc.element.iter())
+    image_count = 0
+    image_bytes = 0
+    part_count = 0
+    for part in doc.part.package.iter_parts():
+        part_count += 1
+        if part.partname.startswith("/word/media/"):
+            image_count += 1
+            image_bytes += len(part.blob)
+    stats["parts"] = part_count
+    stats["media_parts"] = image_count
+    stats["media_mb"] = round(_mb(image_bytes), 2)
+    if composer is not None:
+        stats["composer_num_id_mapping"] = len(getattr(composer, "num_id_mapping", {}))
+        stats["composer_preserved_styles"] = len(getattr(composer, "_preserved_styles", {}))
+    return stats
+
+
+def pdf_structure_stats(merger):
+    """统计PdfMerger已持有的页数"""
+    return {"pdf_pages": len(getattr(merger, "pages", []))}
+
+
+class MemoryProfiler:
+    """
+    用法：
+        profiler = MemoryProfiler(log=self.log)
+        profiler.start()
+        ... 每追加一个文档：profiler.sample(文件名, docx_structure_stats(master, composer))
+        profiler.stop()
+        profiler.write_report(output_path)
+    """
+    def __init__(self, nframes=10, top=10, element_every=10, log=None):
+        """
+        :param nframes: tracemalloc记录的调用栈深度（越深归因越准，开销越大）
+        :param top: 每次采样/最终报告列出的分配位置数量
+        :param element_every: 每隔多少次采样统计一次XML元素数（遍历大文档有开销）
+        """
+        self.nframes = nframes
+        self.top = top
+        self.element_every = element_every
+        self.log = log
+        self.samples = []
+        self._baseline = None
+        self._previous = None
+        self._started_here = False
+        self._start_time = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._started_here = True
+        self._start_time = time.perf_counter()
+        self._baseline = _snapshot()
+        self._previous = self._baseline
+        self.samples.append({"label": "开始", "rss_mb": round(_mb(_rss()), 1), "traced_mb": 0.0})
+
+    def want_element_count(self):
+        """本次采样是否需要统计XML元素数"""
+        return self.element_every > 0 and len(self.samples) % self.element_every == 0
+
+    def sample(self, label, structure=None):
+        """追加一个文档后调用，记录RSS、Python堆增长和本次增长最多的分配位置"""
+        snapshot = _snapshot()
+        traced, _ = tracemalloc.get_traced_memory()
+        diff = snapshot.compare_to(self._previous, "lineno")
+        growth = [
+            {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_diff_kb": round(stat.size_diff / 1024, 1)}
+            for stat in diff[:self.top // 2 or 1] if stat.size_diff > 0
+        ]
+        record = {
+            "label": label,
+            "elapsed_s": round(time.perf_counter() - self._start_time, 2),
+            "rss_mb": round(_mb(_rss()), 1),
+            "traced_mb": round(_mb(traced), 1),
+            "top_growth": growth,
+        }
+        if structure:
+            record.update(structure)
+        self.samples.append(record)
+        self._previous = snapshot
+        if self.log:
+            self.log(f"  🧠 内存：RSS {record['rss_mb']}MB | Python堆 {record['traced_mb']}MB"
+                     + (f" | 图片 {structure.get('media_parts')}个/{structure.get('media_mb')}MB"
+                        if structure and "media_parts" in structure else ""))
+        return record
+
+    def stop(self):
+        """结束采样，计算相对开始时的总增长归因"""
+        final = _snapshot()
+        diff = final.compare_to(self._baseline, "traceback")
+        categories = {}
+        for stat in diff:
+            if stat.size_diff <= 0:
+                continue
+            # 取调用栈中第一个属于已知库的帧作为归属（最内层优先）
+            category = "其他"
+            for frame in stat.traceback:
+                category = _category(frame.filename)
+                if category != "其他":
+                    break
+            categories[category] = categories.get(category, 0) + stat.size_diff
+        self.category_growth = {k: round(_mb(v), 2) for k, v in
+                                sorted(categories.items(), key=lambda kv: -kv[1])}
+        self.top_sites = [
+            {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_diff_mb": round(_mb(stat.size_diff), 2), "count_diff": stat.count_diff}
+            for stat in final.compare_to(self._baseline, "lineno")[:self.top]
+        ]
+        if self._started_here:
+            tracemalloc.stop()
+
+    def suggested_chunk_size(self, memory_budget_mb=2048):
+        """按每个文档的平均RSS增长估算内存预算内一批可合并的文档数"""
+        if len(self.samples) < 3:
+            return None
+        per_doc = (self.samples[-1]["rss_mb"] - self.samples[0]["rss_mb"]) / (len(self.samples) - 1)
+        if per_doc <= 0:
+            return None
+        return max(1, int((memory_budget_mb - self.samples[0]["rss_mb"]) / per_doc))
+
+    def write_report(self, output_path):
+        """在输出文件旁写出文本报告和JSON明细，返回文本报告路径"""
+        txt_path = output_path + ".memprofile.txt"
+        json_path = output_path + ".memprofile.json"
+        first, last = self.samples[0], self.samples[-1]
+        lines = [
+            f"内存分析报告：{os.path.basename(output_path)}",
+            f"采样次数：{len(self.samples) - 1}",
+            f"RSS：{first['rss_mb']}MB → {last['rss_mb']}MB（增长 {last['rss_mb'] - first['rss_mb']:.1f}MB）",
+            f"Python堆（tracemalloc）：{last.get('traced_mb', 0)}MB",
+            "",
+            "按库归因的Python堆增长（MB）：",
+        ]
+        for name, size in getattr(self, "category_growth", {}).items():
+            lines.append(f"  {name:<14}{size:>10}")
+        lines += ["", "增长最多的分配位置："]
+        for site in getattr(self, "top_sites", []):
+            lines.append(f"  {site['size_diff_mb']:>8}MB  {site['count_diff']:>8}个  {site['site']}")
+        chunk = self.suggested_chunk_size()
+        if chunk:
+            lines += ["", f"按当前增长速度，2GB内存预算下建议每批合并不超过 {chunk} 个文件"]
+        lines += ["", "逐文档采样："]
+        for s in self.samples[1:]:
+            extra = "".join(f" {k}={s[k]}" for k in ("xml_elements", "media_parts", "media_mb", "pdf_pages") if k in s)
+            lines.append(f"  [{s['elapsed_s']:>7}s] RSS {s['rss_mb']:>8}MB  堆 {s['traced_mb']:>8}MB{extra}  {s['label']}")
+
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"samples": self.samples,
+                       "category_growth_mb": getattr(self, "category_growth", {}),
+                       "top_sites": getattr(self, "top_sites", [])}, f, ensure_ascii=False, indent=2)
+        return txt_path
@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""
+合并引擎 - 在 docxcompose.Composer 基础上做跨文档的媒体去重和模板缓存
+1. 合并开始时对主文档已有的 word/media、word/embeddings 部件计算 sha256 建立索引
+2. 追加文档时，图片/嵌入对象的字节与索引中某个部件相同，就直接引用已有部件（只新增关系ID），
+   不再复制一份新的 imageN 部件
+3. 统计复用次数和节省的字节数，合并结束后输出到日志
+4. 按 styles.xml + numbering.xml 内容给每个输入文档算模板指纹，样式ID映射结果按指纹缓存：
+   同一模板的文档再次追加时直接改写样式ID，跳过逐元素的样式比对
+5. 每文档独立分节（section_per_document=True）：追加时一次完成——上一文档的节属性移入其最后一段，
+   新文档的节属性（含页眉页脚部件）成为文档末尾的节属性，首节写入 w:type=nextPage 和
+   w:pgNumType w:start="1"，每个报告的页码都从1开始；不再遍历已合并的主文档
+
+用法（替代 Composer）：
+    composer = MergeComposer(master_doc)                              # 或 section_per_document=True
+    composer.append(doc)
+    composer.save(output_path)
+    log(composer.media_summary())
+    log(composer.style_summary())
+
+说明：原生 Composer 只对正文图片按sha1线性查找去重，页眉页脚/嵌入对象等经 add_relationship
+复制的媒体不去重，且每次查找、生成新部件名都要遍历全部部件（几百个文档时接近平方级）。
+这里统一用字典索引，查找和命名都是常数时间。
+原生 Composer 对每个正文元素都重新列出主文档全部样式ID、在 numbering.xml 中扫描最大编号，
+模板相同的输入文档反复做同样的比对；这里把结论按模板指纹缓存，编号ID改为增量计数。
+settings.xml 合并时不参与比对，不计入指纹。
+"""
+import re
+import hashlib
+from copy import deepcopy
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.enum.section import WD_SECTION_START
+from docx.opc.packuri import PackURI
+from docx.oxml import OxmlElement
+from docx.opc.part import Part, XmlPart
+from docx.parts.image import ImagePart
+from docxcompose.composer import Composer
+from docx.oxml.ns import qn
+from docxcompose.utils import NS, xpath
+
+# 按字节去重的部件（无下级关系的二进制部件）
+MEDIA_PREFIXES = ("/word/media/", "/word/embeddings/")
+_PARTNAME_IDX_RE = re.compile(r"^(.*?)(\d+)\.[^.]+$")
+_HDRFTR_RELTYPES = (RT.HEADER, RT.FOOTER)
+# w:sectPr 中排在 w:pgNumType 之后的元素（按schema顺序插入）
+_PGNUMTYPE_SUCCESSORS = (
+    "w:cols", "w:formProt", "w:vAlign", "w:noEndnote", "w:titlePg", "w:textDirection",
+    "w:bidi", "w:rtlGutter", "w:docGrid", "w:printerSettings", "w:sectPrChange",
+)
+
+
+def _is_media_part(part):
+    return (
+        not isinstance(part, XmlPart)
+        and part.partname.startswith(MEDIA_PREFIXES)
+        and not part.rels
+    )
+
+
+class TemplatePlan:
+    """同一模板（指纹相同）的输入文档共用的样式映射结论"""
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        # 输入文档样式ID -> 样式名
+        self.id2name = None
+        # 输入文档样式ID -> (主文档样式ID, 编号映射 (源abstractNumId, 主文档abstractNumId) 或 None)
+        self.styles = {}
+        self.documents = 0
+
+
+def template_fingerprint(doc):
+    """输入文档的模板指纹：styles.xml + numbering.xml 内容的sha1"""
+    digest = hashlib.sha1()
+    for reltype in (RT.STYLES, RT.NUMBERING):
+        try:
+            digest.update(doc.part.rels.part_with_reltype(reltype).blob)
+        except KeyError:
+            digest.update(b"-")
+    return digest.hexdigest()
+
+
+def format_size(num_bytes):
+    """字节数转为易读字符串"""
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / 1024 / 1024:.2f} MB"
+    return f"{num_bytes / 1024:.1f} KB"
+
+
+def use_section_page_count(element):
+    """页眉/页脚中的总页数域（NUMPAGES）改为本节页数（SECTIONPAGES），"第X页/共Y页"按报告计算"""
+    for instr in xpath(element, ".//w:instrText"):
+        if instr.text and "NUMPAGES" in instr.text:
+            instr.text = instr.text.replace("NUMPAGES", "SECTIONPAGES")
+    for fld in xpath(element, ".//w:fldSimple"):
+        fld.set(qn("w:instr"), fld.get(qn("w:instr"), "").replace("NUMPAGES", "SECTIONPAGES"))
+
+
+def restart_page_numbering(sect_pr):
+    """节从新页开始，页码从1重新编号"""
+    sect_pr.start_type = WD_SECTION_START.NEW_PAGE
+    pg_num_type = sect_pr.find(qn("w:pgNumType"))
+    if pg_num_type is None:
+        pg_num_type = OxmlElement("w:pgNumType")
+        sect_pr.insert_element_before(pg_num_type, *_PGNUMTYPE_SUCCESSORS)
+    pg_num_type.set(qn("w:start"), "1")
+
+
+class MergeComposer(Composer):
+    """带媒体去重的 Composer，接口与 Composer 完全一致"""
+
+    def __init__(self, doc, preserve_styles=False, section_per_document=False, known_digest=None):
+        """
+        :param section_per_document: 每个源文档独立成节（新页开始、页码从1开始、保留各自页眉页脚）
+        :param known_digest: 可选，part -> 已知的sha256（见下），主文档已有部件建索引时也使用
+        """
+        super().__init__(doc, preserve_styles)
+        # sha256 -> 已在合并结果中的部件
+        self._media_index = {}
+        # 可选：part -> 已知的sha256（共享内存传来的部件在工作进程中已算好），返回None时现算
+        self.known_digest = known_digest
+        # 上次 take_new_parts() 以来新建的二进制部件
+        self._new_parts = []
+        # 部件名前缀（如 /word/media/image）-> 已用的最大序号
+        self._partname_counters = {}
+        self.media_added = 0
+        self.media_reused = 0
+        self.bytes_saved = 0
+        # 模板指纹 -> TemplatePlan
+        self._plans = {}
+        self._plan = None
+        self._style_name2id = None
+        self._master_style_count = -1
+        # 主文档样式ID -> (是否有大纲级别, 样式自带的numId)；主文档已有样式的内容不会再变
+        self._restart_info = {}
+        # (已用最大numId, 已用最大abstractNumId)，首次使用时从numbering.xml统计
+        self._numbering_max = None
+        self.style_cache_hits = 0
+        # 页眉页脚去重：内容+关系的指纹 -> 已复制的部件
+        self._hdrftr_index = {}
+        self.section_per_document = section_per_document
+        self._single_section_source = False
+        if section_per_document:
+            body = self.doc.element.body
+            first_sect_pr = body.find("w:p/w:pPr/w:sectPr", NS)
+            restart_page_numbering(first_sect_pr if first_sect_pr is not None else body.get_or_add_sectPr())
+            if first_sect_pr is None:
+                for ref in xpath(body.sectPr, "w:headerReference|w:footerReference"):
+                    use_section_page_count(self.doc.part.rels[ref.get(qn("r:id"))].target_part.element)
+        for part in self.pkg.iter_parts():
+            self._track_partname(part.partname)
+            if _is_media_part(part):
+                self._media_index.setdefault(self._digest(part), part)
+
+    def _digest(self, part):
+        if self.known_digest is not None:
+            digest = self.known_digest(part)
+            if digest:
+                return digest
+        return hashlib.sha256(part.blob).hexdigest()
+
+    def take_new_parts(self):
+        """取出上次调用以来新建的二进制部件（shm_transport 据此继续持有它们引用的共享内存段）"""
+        parts, self._new_parts = self._new_parts, []
+        return parts
+
+    def _track_partname(self, partname):
+        match = _PARTNAME_IDX_RE.match(partname)
+        if match:
+            prefix, idx = match.group(1), int(match.group(2))
+            if idx > self._partname_counters.get(prefix, 0):
+                self._partname_counters[prefix] = idx
+
+    def _next_partname(self, partname):
+        """按前缀计数生成新部件名（不再遍历全部部件）"""
+        match = _PARTNAME_IDX_RE.match(partname)
+        prefix = match.group(1) if match else partname.rsplit(".", 1)[0]
+        idx = self._partname_counters.get(prefix, 0) + 1
+        self._partname_counters[prefix] = idx
+        return PackURI(f"{prefix}{idx}.{partname.ext}")
+
+    def _dedup_media_part(self, src_part):
+        """返回合并结果中与 src_part 字节相同的部件，没有则新建一个并加入索引"""
+        digest = self._digest(src_part)
+        existing = self._media_index.get(digest)
+        if existing is not None:
+            self.media_reused += 1
+            self.bytes_saved += len(src_part.blob)
+            return existing
+        partname = self._next_partname(src_part.partname)
+        if isinstance(src_part, ImagePart) or src_part.partname.startswith("/word/media/"):
+            new_part = ImagePart(partname, src_part.content_type, src_part.blob)
+            self.pkg.image_parts.append(new_part)
+        else:
+            new_part = Part(partname, src_part.content_type, src_part.blob, self.pkg)
+        self._media_index[digest] = new_part
+        self._new_parts.append(new_part)
+        self.media_added += 1
+        return new_part
+
+    # ========== 覆盖 Composer 的复制逻辑 ==========
+    def add_relationship(self, src_part, dst_part, relationship):
+        if relationship.is_external or not _is_media_part(relationship.target_part):
+            new_rel = super().add_relationship(src_part, dst_part, relationship)
+            if not new_rel.is_external:
+                self._track_partname(new_rel.target_part.partname)
+                self._new_parts.append(new_rel.target_part)
+            return new_rel
+        new_part = self._dedup_media_part(relationship.target_part)
+        new_rid = dst_part.relate_to(new_part, relationship.reltype)
+        return dst_part.rels[new_rid]
+
+    def add_images(self, doc, element):
+        blips = xpath(element, "(.//a:blip|.//asvg:svgBlip)[@r:embed]")
+        for blip in blips:
+            rid = blip.get("{%s}embed" % NS["r"])
+            new_img_part = self._dedup_media_part(doc.part.rels[rid].target_part)
+            blip.set("{%s}embed" % NS["r"], self.doc.part.relate_to(new_img_part, RT.IMAGE))
+
+            # 图片既嵌入又带外部链接时，链接关系照常复制
+            rid = blip.get("{%s}link" % NS["r"])
+            if rid:
+                new_rel = self.add_relationship(None, self.doc.part, doc.part.rels[rid])
+                blip.set("{%s}link" % NS["r"], new_rel.rId)
+
+    def add_shapes(self, doc, element):
+        for shape in xpath(element, ".//v:shape/v:imagedata"):
+            rid = shape.get("{%s}id" % NS["r"])
+            new_img_part = self._dedup_media_part(doc.part.rels[rid].target_part)
+            shape.set("{%s}id" % NS["r"], self.doc.part.relate_to(new_img_part, RT.IMAGE))
+
+    # ========== 样式/编号（按模板指纹缓存） ==========
+    def insert(self, index, doc, remove_property_fields=True):
+        fingerprint = template_fingerprint(doc)
+        self._plan = self._plans.get(fingerprint)
+        if self._plan is None:
+            self._plan = self._plans[fingerprint] = TemplatePlan(fingerprint)
+        self._plan.documents += 1
+        super().insert(index, doc, remove_property_fields)
+
+    def _create_style_id_mapping(self, doc):
+        plan = self._plan
+        if plan is None:
+            return super()._create_style_id_mapping(doc)
+        if plan.id2name is None:
+            plan.id2name = {s.style_id: s.name for s in doc.styles}
+        self._style_id2name = plan.id2name
+        # 主文档样式只会增加，数量不变时名称->ID映射无需重建
+        style_count = len(self.doc.styles.element)
+        if self._style_name2id is None or style_count != self._master_style_count:
+            self._style_name2id = {s.name: s.style_id for s in self.doc.styles}
+            self._master_style_count = style_count
+
+    def add_styles(self, doc, element):
+        plan = self._plan
+        if plan is None or self.preserve_styles:
+            return super().add_styles(doc, element)
+        style_elements = xpath(element, ".//w:tblStyle|.//w:pStyle|.//w:rStyle")
+        if not style_elements:
+            return
+        used_style_ids = {e.val for e in style_elements}
+        if all(style_id in plan.styles for style_id in used_style_ids):
+            for el in style_elements:
+                our_style_id = plan.styles[el.val][0]
+                if our_style_id != el.val:
+                    el.val = our_style_id
+            for style_id in used_style_ids:
+                anum_entry = plan.styles[style_id][1]
+                if anum_entry:
+                    self.anum_id_mapping[anum_entry[0]] = anum_entry[1]
+            self.style_cache_hits += 1
+            return
+
+        # 首次遇到：走原生比对；比对前主文档已有的样式，结论记入缓存（新复制进来的样式下次再记录）
+        existing = {s.style_id for s in self.doc.styles}
+        pending = {
+            style_id: self.mapped_style_id(style_id)
+            for style_id in used_style_ids if style_id not in plan.styles
+        }
+        super().add_styles(doc, element)
+        for style_id, our_style_id in pending.items():
+            if our_style_id in existing:
+                plan.styles[style_id] = (our_style_id, self._style_anum_entry(doc, style_id, our_style_id))
+
+    def _style_anum_entry(self, doc, style_id, our_style_id):
+        """与 Composer.add_styles 相同的规则：带编号的已有样式，源abstractNumId映射到主文档的"""
+        style_element = doc.styles.element.get_by_id(style_id)
+        if style_element is None:
+            return None
+        num_ids = xpath(style_element, ".//w:numId/@w:val")
+        if not num_ids:
+            return None
+        anum_ids = xpath(
+            doc.part.numbering_part.element,
+            './/w:num[@w:numId="%s"]/w:abstractNumId/@w:val' % num_ids[0],
+        )
+        our_style_element = self.doc.styles.element.get_by_id(our_style_id)
+        our_num_ids = xpath(our_style_element, ".//w:numId/@w:val") if our_style_element is not None else []
+        if not anum_ids or not our_num_ids:
+            return None
+        our_anum_ids = xpath(
+            self.numbering_part().element,
+            './/w:num[@w:numId="%s"]/w:abstractNumId/@w:val' % our_num_ids[0],
+        )
+        if not our_anum_ids:
+            return None
+        return int(anum_ids[0]), int(our_anum_ids[0])
+
+    def restart_first_numbering(self, doc, element):
+        if not self.restart_numbering:
+            return
+        style_ids = xpath(element, ".//w:pStyle/@w:val")
+        if not style_ids or style_ids[0] in self._numbering_restarted:
+            return
+        info = self._restart_info.get(style_ids[0])
+        if info is None:
+            style_element = self.doc.styles.element.get_by_id(style_ids[0])
+            if style_element is None:
+                return
+            style_num_ids = xpath(style_element, ".//w:numId/@w:val")
+            info = (bool(xpath(style_element, ".//w:outlineLvl")), style_num_ids[0] if style_num_ids else None)
+            self._restart_info[style_ids[0]] = info
+        has_outline, style_num_id = info
+        # 标题样式、既无段落编号也无样式编号的段落不需要重新编号，省去后续查找
+        if has_outline or (style_num_id is None and not xpath(element, ".//w:numPr/w:numId/@w:val")):
+            return
+        super().restart_first_numbering(doc, element)
+
+    def _next_numbering_ids(self):
+        if self._numbering_max is None:
+            next_num_id, next_anum_id = super()._next_numbering_ids()
+            self._numbering_max = [next_num_id - 1, next_anum_id - 1]
+        return self._numbering_max[0] + 1, self._numbering_max[1] + 1
+
+    def _insert_num(self, element):
+        super()._insert_num(element)
+        if self._numbering_max is not None:
+            self._numbering_max[0] = max(self._numbering_max[0], element.numId)
+
+    def _insert_abstract_num(self, element):
+        super()._insert_abstract_num(element)
+        if self._numbering_max is not None:
+            anum_id = int(element.get("{%s}abstractNumId" % NS["w"]))
+            self._numbering_max[1] = max(self._numbering_max[1], anum_id)
+
+    # ========== 每文档独立分节 ==========
+    def append(self, doc, remove_property_fields=True):
+        if not self.section_per_document:
+            return super().append(doc, remove_property_fields)
+        body = self.doc.element.body
+        index = self._close_current_section()
+        src_body = doc.element.body
+        src_sect_pr = src_body.get_or_add_sectPr()
+        # 源文档首节：多节文档在第一个段落级节属性，单节文档就是末尾的节属性
+        first_sect_pr = src_body.find("w:p/w:pPr/w:sectPr", NS)
+        restart_page_numbering(first_sect_pr if first_sect_pr is not None else src_sect_pr)
+        self._single_section_source = first_sect_pr is None
+
+        new_sect_pr = deepcopy(src_sect_pr)
+        self._copy_hdrftr_references(doc, new_sect_pr)
+        self.insert(index, doc, remove_property_fields=remove_property_fields)
+        body.replace(body.sectPr, new_sect_pr)
+
+    def _close_current_section(self):
+        """
+        把文档末尾的节属性（属于上一个源文档的最后一节）移到其最后一段，返回新内容的插入位置
+        最后一个元素是表格或已带节属性时补一个空段落
+        """
+        body = self.doc.element.body
+        sect_pr = body.get_or_add_sectPr()
+        index = body.index(sect_pr)
+        last = body[index - 1] if index else None
+        if last is None or last.tag != qn("w:p") or last.find("w:pPr/w:sectPr", NS) is not None:
+            last = OxmlElement("w:p")
+            body.insert(index, last)
+            index += 1
+        last.get_or_add_pPr().append(deepcopy(sect_pr))
+        return index
+
+    def remove_header_and_footer_references(self, doc, element):
+        if not self.section_per_document:
+            return super().remove_header_and_footer_references(doc, element)
+        # 源文档中间各节的页眉页脚保留，部件复制到主文档
+        if element.tag == qn("w:p"):
+            sect_pr = element.find("w:pPr/w:sectPr", NS)
+            if sect_pr is not None:
+                self._copy_hdrftr_references(doc, sect_pr)
+
+    def fix_section_types(self, doc):
+        if not self.section_per_document:
+            super().fix_section_types(doc)
+
+    def fix_header_and_footers(self, doc):
+        if not self.section_per_document:
+            super().fix_header_and_footers(doc)
+
+    def _copy_hdrftr_references(self, doc, sect_pr):
+        """把节属性引用的页眉/页脚部件复制到主文档（内容相同的只保留一份），改写引用的关系ID"""
+        for ref in xpath(sect_pr, "w:headerReference|w:footerReference"):
+            rel = doc.part.rels[ref.get(qn("r:id"))]
+            new_part = self._hdrftr_part(doc, rel.target_part)
+            ref.set(qn("r:id"), self.doc.part.relate_to(new_part, rel.reltype))
+
+    def _hdrftr_part(self, doc, src_part):
+        element = deepcopy(src_part.element)
+        if self._single_section_source:
+            use_section_page_count(element)
+
+        new_part = XmlPart(self._next_partname(src_part.partname), src_part.content_type, element, self.pkg)
+        # 页眉里的图片等先复制（图片走媒体去重），再按新关系ID改写XML
+        rid_map = {}
+        for rid, rel in src_part.rels.items():
+            rid_map[rid] = self.add_relationship(src_part, new_part, rel).rId
+        for attr in ("r:embed", "r:link", "r:id"):
+            for el in xpath(element, f".//*[@{attr}]"):
+                el.set(qn(attr), rid_map.get(el.get(qn(attr)), el.get(qn(attr))))
+
+        # 去重键：XML内容 + 各关系指向的部件（图片已去重，相同图片指向同一部件）
+        key = hashlib.sha256(new_part.blob).hexdigest() + "|" + "|".join(
+            sorted(f"{r.rId}:{r.reltype}:{r.target_ref}" for r in new_part.rels.values())
+        )
+        existing = self._hdrftr_index.get(key)
+        if existing is not None:
+            return existing
+        self._hdrftr_index[key] = new_part
+        return new_part
+
+    # ========== 统计 ==========
+    def media_stats(self):
+        return {
+            "media_parts": len(self._media_index),
+            "media_added": self.media_added,
+            "media_reused": self.media_reused,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def style_summary(self):
+        """一行日志：模板数和样式比对缓存命中次数"""
+        documents = sum(plan.documents for plan in self._plans.values())
+        return (f"🎨 样式缓存：{documents} 个文档共 {len(self._plans)} 种模板，"
+                f"跳过样式比对 {self.style_cache_hits} 次")
+
+    def media_summary(self):
+        """一行日志：新增/复用的媒体数和节省的空间"""
+        return (f"🖼️ 媒体去重：新增 {self.media_added} 个，复用 {self.media_reused} 个，"
+                f"节省 {format_size(self.bytes_saved)}")
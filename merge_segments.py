@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+分段记录与增量合并 - main.py 合并时在输出文件旁写出分段记录（<输出文件>.segments.json），
+改了少数报告后再次合并，只替换变化的报告，其余内容原样复用
+1. 分段记录：每个输入文件的名称、大小/修改时间、sha256、在合并结果正文中的元素范围 [start, end)、
+   这些元素引用的关系ID、段内的节属性个数；另记合并结果中图片部件的 sha256 和输出文件的大小/修改时间
+2. 再次合并时先比较大小/修改时间，有变化的才计算 sha256；内容相同的报告不打开
+3. 修改过的报告：删除其元素范围，在原位置插入新版本；删除的报告：只删除；新增的报告（排在末尾）：追加。
+   只被删除范围引用的关系一并删除，不再被引用的图片等部件保存时自动丢弃
+4. 合并结果用 lazy_package 按需打开：未变化报告的图片不读入内存，保存时从原输出文件流式拷贝；
+   图片去重索引直接用记录中的 sha256。耗时主要取决于变化的报告数（另有一次正文XML解析/写出）
+5. 以下情况返回 None，由调用方完整合并：没有记录或版本不符、输出文件在记录后被修改、
+   第一个文件（模板）变化、合并选项不同、原有文件顺序变化或新增文件不在末尾、
+   涉及的报告含多个节（原生 Composer 合并多节文档时会改动前面的节属性，无法局部替换）
+6. 脚注、样式、编号定义中只被删除报告使用的条目保留在合并结果中（不被引用，不影响显示）
+7. 增量结果与完整合并语义等价（正文内容、格式、图片相同），但不逐字节/逐元素相同：
+   关系ID（rId）和图形编号（wp:docPr id）沿用原合并结果并在其后编号，删除/替换处会留下空号
+
+用法：
+    recorder = SegmentRecorder(composer, source_folder, options)    # 完整合并
+    recorder.add_master(docx_files[0])
+    for path in docx_files[1:]:
+        recorder.append(Document(path), path)
+    composer.save(output_path)
+    recorder.save(output_path)
+
+    result = remerge(output_path, docx_files, source_folder, options, open_input=Document, log=self.log)
+    if result is None:
+        ...完整合并...
+
+命令行（查看分段记录）：
+python merge_segments.py 合并结果.docx
+"""
+import os
+import sys
+import json
+from collections import namedtuple
+
+from docx.oxml.ns import qn
+from docxcompose.utils import NS, xpath
+
+from restore_journal import file_sha256
+
+SEGMENT_MAP_VERSION = 1
+
+RemergeResult = namedtuple("RemergeResult", "changed removed added unchanged")
+
+
+def segment_map_path(output_path):
+    return output_path + ".segments.json"
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _folder_key(folder):
+    return os.path.normcase(os.path.abspath(folder))
+
+
+def _content_end(body):
+    """正文内容元素个数（不含末尾的 w:sectPr）"""
+    count = len(body)
+    if count and body[count - 1].tag == qn("w:sectPr"):
+        count -= 1
+    return count
+
+
+def _scan(body, start, end):
+    """元素范围内引用的关系ID、段落级节属性个数"""
+    rids, sections = set(), 0
+    for element in body[start:end]:
+        rids.update(xpath(element, "descendant-or-self::*/@r:*"))
+        sections += len(xpath(element, "descendant-or-self::w:p/w:pPr/w:sectPr"))
+    return rids, sections
+
+
+def _has_sections(doc):
+    return doc.element.body.find("w:p/w:pPr/w:sectPr", NS) is not None
+
+
+def _file_entry(path):
+    size, mtime_ns = _stamp(path)
+    return {"name": os.path.basename(path), "size": size, "mtime_ns": mtime_ns, "sha256": file_sha256(path)}
+
+
+def _media_digests(composer):
+    """合并结果中仍被引用的图片部件：{部件名: sha256}"""
+    reachable = set(composer.pkg.iter_parts())
+    return {str(part.partname): digest for digest, part in composer._media_index.items() if part in reachable}
+
+
+def _write_map(output_path, source_folder, options, segments, media):
+    size, mtime_ns = _stamp(output_path)
+    data = {
+        "version": SEGMENT_MAP_VERSION,
+        "source_folder": _folder_key(source_folder),
+        "options": options,
+        "output": {"size": size, "mtime_ns": mtime_ns},
+        "media": media,
+        "segments": segments,
+    }
+    path = segment_map_path(output_path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def load_segment_map(output_path):
+    """读取分段记录，不存在或损坏时返回 None"""
+    try:
+        with open(segment_map_path(output_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != SEGMENT_MAP_VERSION:
+        return None
+    return data
+
+
+# ========== 完整合并时记录 ==========
+class SegmentRecorder:
+    """完整合并时记录每个输入文件在合并结果中的范围"""
+
+    def __init__(self, composer, source_folder, options=None):
+        self.composer = composer
+        self.source_folder = source_folder
+        self.options = dict(options or {})
+        self.segments = []
+        self._body = composer.doc.element.body
+
+    def _record(self, path, start, end):
+        rids, sections = _scan(self._body, start, end)
+        entry = _file_entry(path)
+        entry.update(start=start, end=end, rids=sorted(rids), sections=sections)
+        self.segments.append(entry)
+
+    def add_master(self, path):
+        """第一个文件（合并的基础文档）"""
+        self._record(path, 0, _content_end(self._body))
+
+    def append(self, doc, path):
+        """追加一个文档并记录其范围"""
+        start = _content_end(self._body)
+        self.composer.append(doc)
+        self._record(path, start, _content_end(self._body))
+
+    def save(self, output_path):
+        """合并结果保存后调用，写出分段记录，返回记录文件路径"""
+        return _write_map(output_path, self.source_folder, self.options, self.segments,
+                          _media_digests(self.composer))
+
+
+# ========== 增量合并 ==========
+def _unchanged(entry, path):
+    """按大小/修改时间判断，变化时再比较sha256（内容相同则更新记录中的时间）"""
+    size, mtime_ns = _stamp(path)
+    if (size, mtime_ns) == (entry["size"], entry["mtime_ns"]):
+        return True
+    if file_sha256(path) != entry["sha256"]:
+        return False
+    entry["size"], entry["mtime_ns"] = size, mtime_ns
+    return True
+
+
+def _plan(data, docx_files, log):
+    """
+    对比记录与当前文件列表
+    :return: (各段的新路径或None（删除）, 修改过的段序号集合, 新增文件路径列表)；需要完整合并时返回 None
+    """
+    segments = data["segments"]
+    by_name = {os.path.basename(p): p for p in docx_files}
+    names = [os.path.basename(p) for p in docx_files]
+    if not segments or names[0] != segments[0]["name"]:
+        log("ℹ️ 第一个文件（模板）不同，需要完整合并")
+        return None
+    if not _unchanged(segments[0], docx_files[0]):
+        log("ℹ️ 第一个文件（模板）已修改，需要完整合并")
+        return None
+
+    old_names = {s["name"] for s in segments}
+    kept = [s["name"] for s in segments[1:] if s["name"] in by_name]
+    existing = [n for n in names[1:] if n in old_names]
+    if kept != existing:
+        log("ℹ️ 文件顺序已变化，需要完整合并")
+        return None
+    added = [by_name[n] for n in names[1:] if n not in old_names]
+    if added and names.index(os.path.basename(added[0])) <= max((names.index(n) for n in kept), default=0):
+        log("ℹ️ 新增文件不在末尾，需要完整合并")
+        return None
+
+    paths = [docx_files[0]] + [by_name.get(s["name"]) for s in segments[1:]]
+    changed = {idx for idx, path in enumerate(paths) if idx and path and not _unchanged(segments[idx], path)}
+    for idx, path in enumerate(paths):
+        if (path is None or idx in changed) and segments[idx]["sections"]:
+            log(f"ℹ️ {segments[idx]['name']} 含多个节，需要完整合并")
+            return None
+    return paths, changed, added
+
+
+def remerge(output_path, docx_files, source_folder, options=None, open_input=None, log=None):
+    """
+    按分段记录增量更新已有的合并结果
+    :param docx_files: 当前的输入文件（顺序与合并顺序一致，第一个为模板）
+    :param options: 合并选项（与完整合并时记录的不同则完整合并）
+    :param open_input: 打开输入文件的函数，默认 docx.Document
+    :return: RemergeResult；需要完整合并时返回 None（合并结果未被修改）
+    """
+    log = log or (lambda message: None)
+    options = dict(options or {})
+    if not os.path.exists(output_path):
+        return None
+    data = load_segment_map(output_path)
+    if data is None:
+        log("ℹ️ 没有可用的分段记录，需要完整合并")
+        return None
+    if data.get("source_folder") != _folder_key(source_folder) or data.get("options") != options:
+        log("ℹ️ 源文件夹或合并选项与上次不同，需要完整合并")
+        return None
+    if list(_stamp(output_path)) != [data["output"]["size"], data["output"]["mtime_ns"]]:
+        log("ℹ️ 合并结果在上次合并后被修改过，需要完整合并")
+        return None
+    plan = _plan(data, docx_files, log)
+    if plan is None:
+        return None
+    paths, changed, added = plan
+    segments = data["segments"]
+    removed = [idx for idx, path in enumerate(paths) if path is None]
+    unchanged = len(segments) - len(changed) - len(removed)
+    if not changed and not removed and not added:
+        _write_map(output_path, source_folder, options, segments, data["media"])  # 更新文件时间
+        log(f"✅ 所有文件都未变化，合并结果无需更新（{unchanged} 个）")
+        return RemergeResult(0, 0, 0, unchanged)
+
+    # 先打开要插入的新文档（少量），确认都能局部替换后再改合并结果
+    if open_input is None:
+        from docx import Document as open_input
+    new_docs = {}
+    for idx in sorted(changed):
+        new_docs[idx] = open_input(paths[idx])
+    added_docs = [open_input(path) for path in added]
+    incoming = [(segments[idx]["name"], doc) for idx, doc in new_docs.items()]
+    incoming += [(os.path.basename(path), doc) for path, doc in zip(added, added_docs)]
+    for name, doc in incoming:
+        if _has_sections(doc):
+            log(f"ℹ️ {name} 含多个节，需要完整合并")
+            return None
+
+    from lazy_package import open_document
+    from merge_engine import MergeComposer
+    media = data["media"]
+    master_doc = open_document(output_path)
+    body = master_doc.element.body
+    if _content_end(body) != segments[-1]["end"] or any(
+            a["end"] != b["start"] for a, b in zip(segments, segments[1:])):
+        log("ℹ️ 分段记录与合并结果不一致，需要完整合并")
+        return None
+    # 只对合并结果中已有的部件使用记录的 sha256（输入文档的部件名可能相同）
+    known = {part: media[str(part.partname)] for part in master_doc.part.package.iter_parts()
+             if str(part.partname) in media}
+    composer = MergeComposer(master_doc, known_digest=known.get)
+
+    # 新增的追加在末尾；修改/删除从后往前处理，前面各段的位置不受影响
+    lengths = [s["end"] - s["start"] for s in segments]
+    new_rids = {}
+    for path, doc in zip(added, added_docs):
+        log(f"➕ 新增：{os.path.basename(path)}")
+        start = _content_end(body)
+        composer.append(doc)
+        end = _content_end(body)
+        entry = _file_entry(path)
+        entry.update(start=start, end=end, sections=0)
+        new_rids[len(segments)] = _scan(body, start, end)[0]
+        segments.append(entry)
+        lengths.append(end - start)
+    dropped = set()
+    for idx in sorted(changed | set(removed), reverse=True):
+        entry = segments[idx]
+        start, end = entry["start"], entry["end"]
+        dropped.update(entry["rids"])
+        for element in body[start:end]:
+            body.remove(element)
+        lengths[idx] = 0
+        if idx in new_docs:
+            log(f"🔁 替换：{entry['name']}")
+            before = _content_end(body)
+            composer.insert(start, new_docs[idx])
+            lengths[idx] = _content_end(body) - before
+            entry.update(_file_entry(paths[idx]))
+            new_rids[idx] = _scan(body, start, start + lengths[idx])[0]
+        else:
+            log(f"➖ 删除：{entry['name']}")
+
+    # 重新计算各段范围，删除不再被引用的关系
+    kept_segments, position = [], 0
+    for idx, entry in enumerate(segments):
+        if idx in removed:
+            continue
+        entry["start"], entry["end"] = position, position + lengths[idx]
+        if idx in new_rids:
+            entry["rids"], entry["sections"] = sorted(new_rids[idx]), 0
+        position = entry["end"]
+        kept_segments.append(entry)
+    in_use = {rid for entry in kept_segments for rid in entry["rids"]}
+    if body.sectPr is not None:
+        in_use.update(xpath(body.sectPr, "descendant-or-self::*/@r:*"))
+    rels = master_doc.part.rels
+    for rid in dropped - in_use:
+        if rid in rels:
+            rels.pop(rid)
+
+    composer.save(output_path)
+    _write_map(output_path, source_folder, options, kept_segments, _media_digests(composer))
+    return RemergeResult(len(changed), len(removed), len(added), unchanged)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("用法：python merge_segments.py 合并结果.docx")
+        return 1
+    data = load_segment_map(argv[0])
+    if data is None:
+        print(f"❌ 没有可用的分段记录：{segment_map_path(argv[0])}")
+        return 1
+    print(f"源文件夹：{data['source_folder']}  选项：{data['options']}  图片部件：{len(data['media'])} 个")
+    for entry in data["segments"]:
+        print(f"  [{entry['start']:>7}, {entry['end']:>7})  {entry['sha256'][:12]}  "
+              f"关系 {len(entry['rids']):>3}  节 {entry['sections']}  {entry['name']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,11 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
 import datetime
-from docx import Document
-from docxcompose.composer import Composer
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+Document = lazy_from("docx", "Document")
+MergeComposer = lazy_from("merge_engine", "MergeComposer")
 
 # 安装依赖（执行以下命令）：
 # pip install python-docx python-docx-composer
@@ -67,7 +69,7 @@ class WordMergerGUI:
         frame4.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame4, text="操作日志：", font=("微软雅黑", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame4, height=8, font=("Consolas", 9))
+        self.log_text = LogView(frame4, "合并Word(new GUI)", height=8, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
         # 初始化日志
@@ -77,8 +79,7 @@ class WordMergerGUI:
     def log(self, content):
         """添加带时间戳的日志"""
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)  # 自动滚动到最新日志
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()  # 实时刷新
 
     def select_folder(self):
@@ -136,7 +137,7 @@ class WordMergerGUI:
             # 4. 核心合并逻辑（docxcompose是最稳定的方式）
             # 以第一个文档为基础
             master_doc = Document(docx_files[0])
-            composer = Composer(master_doc)
+            composer = MergeComposer(master_doc)
             
             # 逐个追加其他文档
             for idx, file_path in enumerate(docx_files[1:], 2):
@@ -146,6 +147,8 @@ class WordMergerGUI:
             
             # 5. 保存合并后的文档
             composer.save(output_path)
+            self.log(composer.media_summary())
+            self.log(composer.style_summary())
             
             # 6. 合并完成
             self.log("="*50)
@@ -173,4 +176,6 @@ if __name__ == "__main__":
     # 启动主窗口（无弹窗，直接显示界面）
     root = tk.Tk()
     app = WordMergerGUI(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx", "merge_engine")
     root.mainloop()
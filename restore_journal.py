@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+回滚日志 - 每次批量修改都持久化记录，程序退出后仍可整批或按文件回滚
+1. 目录结构（默认 ~/.word_toolbox/journal）：
+   runs.jsonl            所有运行的开始/结束记录（只追加）
+   runs/<运行ID>.jsonl    该次运行的逐文件记录（只追加）：backup（修改前哈希）/ commit（修改后哈希）/ rollback
+   objects/<哈希前2位>/<sha256>   修改前的文件内容，按内容去重（同一文件多次备份只存一份）
+2. 每条记录写入后立即 fsync；备份记录在修改文件之前写入，进程中途崩溃也知道动过哪些文件
+3. 回滚只读该次运行自己的记录文件（与文件数成正比）：
+   - 当前内容 = 修改后哈希（或没有 commit 记录，说明修改中断）→ 用备份恢复（先写临时文件再替换）
+   - 当前内容 = 修改前哈希 → 无需恢复
+   - 运行之后文件又被改过 → 默认跳过，force=True 时强制恢复
+
+用法：
+    run = RestoreJournal().begin("表格添加列", folder)
+    run.backup(path)      # 修改前
+    ...修改并保存...
+    run.commit(path)      # 修改后
+    run.end()
+    RestoreJournal().rollback(run.id)               # 整批回滚
+    RestoreJournal().rollback(run.id, [path])       # 只回滚部分文件
+
+命令行：
+python restore_journal.py list                         # 最近的运行
+python restore_journal.py show 20250101-120000-1a2b3c  # 某次运行修改过的文件
+python restore_journal.py rollback 20250101-120000-1a2b3c [--files a.docx b.docx] [--force]
+python restore_journal.py prune --days 30              # 删除30天前的运行和不再引用的备份
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import datetime
+import tempfile
+import uuid
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".word_toolbox", "journal")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _append(path, record):
+    """追加一行JSON并落盘"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_lines(path):
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass  # 崩溃时写了一半的最后一行
+    return records
+
+
+class JournalRun:
+    """一次批量运行"""
+
+    def __init__(self, journal, run_id, tool="", folder="", started=None):
+        self.journal = journal
+        self.id = run_id
+        self.tool = tool
+        self.folder = folder
+        self.started = started
+        self.ended = None
+        # {路径: {"before": 哈希, "after": 哈希/None, "rolled_back": bool}}
+        self.files = {}
+        self.path = os.path.join(journal.root, "runs", f"{run_id}.jsonl")
+
+    def _record(self, event, **fields):
+        record = {"event": event, "time": time.time()}
+        record.update(fields)
+        _append(self.path, record)
+        return record
+
+    def backup(self, path):
+        """
+        修改前调用：把当前内容存入备份库并记录
+        :return: 备份文件路径
+        """
+        path = os.path.abspath(path)
+        entry = self.files.get(path)
+        if entry:
+            return self.journal.object_path(entry["before"])
+        sha = self.journal.store(path)
+        self.files[path] = {"before": sha, "after": None, "rolled_back": False}
+        self._record("backup", path=path, before=sha)
+        return self.journal.object_path(sha)
+
+    def commit(self, path):
+        """修改完成后调用：记录修改后的内容哈希"""
+        path = os.path.abspath(path)
+        if path not in self.files or not os.path.exists(path):
+            return
+        sha = file_sha256(path)
+        self.files[path]["after"] = sha
+        self._record("commit", path=path, after=sha)
+
+    def end(self):
+        """结束本次运行（重复调用无影响）"""
+        if self.ended:
+            return
+        changed = sum(1 for f in self.files.values() if f["after"] and f["after"] != f["before"])
+        self.ended = time.time()
+        self._record("end", files=len(self.files), changed=changed)
+        _append(self.journal.index_path, {"event": "end", "run": self.id, "time": self.ended,
+                                          "files": len(self.files), "changed": changed})
+
+    @property
+    def changed_files(self):
+        return [p for p, f in self.files.items() if f["after"] != f["before"]]
+
+    def rollback(self, files=None, force=False):
+        """
+        回滚本次运行（files为空时整批）
+        :return: [(路径, 状态, 说明)]，状态为 restored / unchanged / conflict / missing_backup
+        """
+        targets = self.files if files is None else {
+            os.path.abspath(p): self.files[os.path.abspath(p)] for p in files if os.path.abspath(p) in self.files}
+        results = []
+        for path, entry in targets.items():
+            backup = self.journal.object_path(entry["before"])
+            current = file_sha256(path) if os.path.exists(path) else None
+            if current == entry["before"]:
+                results.append((path, "unchanged", "已是修改前的内容"))
+                continue
+            if entry["after"] and current not in (entry["after"], None) and not force:
+                results.append((path, "conflict", "本次运行之后文件又被修改，跳过（可强制回滚）"))
+                continue
+            if not os.path.exists(backup):
+                results.append((path, "missing_backup", "备份已被清理"))
+                continue
+            # 先复制到同目录临时文件再替换，避免恢复到一半
+            folder = os.path.dirname(path) or "."
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix="~restore_", suffix=".tmp", dir=folder)
+            os.close(fd)
+            try:
+                shutil.copyfile(backup, tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            entry["rolled_back"] = True
+            self._record("rollback", path=path, restored=entry["before"])
+            results.append((path, "restored", "已恢复"))
+        return results
+
+
+class RestoreJournal:
+    """回滚日志库（多个工具/进程共用一个目录）"""
+
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_ROOT
+        self.index_path = os.path.join(self.root, "runs.jsonl")
+        os.makedirs(os.path.join(self.root, "runs"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+
+    # ----- 备份库 -----
+    def object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], sha)
+
+    def store(self, path):
+        """文件内容存入备份库（边读边算哈希，已有相同内容时不再写入）"""
+        objects = os.path.join(self.root, "objects")
+        fd, tmp = tempfile.mkstemp(prefix="~store_", dir=objects)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            sha = digest.hexdigest()
+            target = self.object_path(sha)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return sha
+
+    # ----- 运行 -----
+    def begin(self, tool, folder=""):
+        started = time.time()
+        run_id = f"{datetime.datetime.fromtimestamp(started):%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        run = JournalRun(self, run_id, tool, os.path.abspath(folder) if folder else "", started)
+        record = {"event": "begin", "run": run_id, "time": started, "tool": tool, "folder": run.folder}
+        _append(run.path, record)
+        _append(self.index_path, record)
+        return run
+
+    def load(self, run_id):
+        """从记录文件重建一次运行（只读这一次运行的记录）"""
+        path = os.path.join(self.root, "runs", f"{run_id}.jsonl")
+        records = _read_lines(path)
+        if not records:
+            raise KeyError(f"没有这次运行：{run_id}")
+        first = records[0]
+        run = JournalRun(self, run_id, first.get("tool", ""), first.get("folder", ""), first.get("time"))
+        for record in records[1:]:
+            event = record.get("event")
+            if event == "backup":
+                run.files[record["path"]] = {"before": record["before"], "after": None, "rolled_back": False}
+            elif event == "commit" and record["path"] in run.files:
+                run.files[record["path"]]["after"] = record["after"]
+            elif event == "rollback" and record["path"] in run.files:
+                run.files[record["path"]]["rolled_back"] = True
+            elif event == "end":
+                run.ended = record["time"]
+        return run
+
+    def runs(self, limit=None):
+        """运行列表（新的在前）：[{"run", "time", "tool", "folder", "ended", "files", "changed"}]"""
+        runs = {}
+        for record in _read_lines(self.index_path):
+            if record.get("event") == "begin":
+                runs[record["run"]] = dict(record, ended=None, files=None, changed=None)
+            elif record.get("event") == "end" and record.get("run") in runs:
+                runs[record["run"]].update(ended=record["time"], files=record["files"], changed=record["changed"])
+        ordered = sorted(runs.values(), key=lambda r: r["time"], reverse=True)
+        return ordered[:limit] if limit else ordered
+
+    def rollback(self, run_id, files=None, force=False):
+        return self.load(run_id).rollback(files, force)
+
+    def prune(self, days):
+        """删除早于 days 天的运行记录，以及不再被任何运行引用的备份"""
+        cutoff = time.time() - days * 86400
+        expired = {r["run"] for r in self.runs() if r["time"] < cutoff}
+        keep = [r for r in _read_lines(self.index_path) if r.get("run") not in expired]
+        for run_id in expired:
+            path = os.path.join(self.root, "runs", f"{run_id}.jsonl")
+            if os.path.exists(path):
+                os.remove(path)
+        removed_runs = len(expired)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in keep)
+        os.replace(tmp, self.index_path)
+        referenced = set()
+        for name in os.listdir(os.path.join(self.root, "runs")):
+            for record in _read_lines(os.path.join(self.root, "runs", name)):
+                if record.get("event") == "backup":
+                    referenced.add(record["before"])
+        removed_objects = 0
+        objects = os.path.join(self.root, "objects")
+        for prefix in os.listdir(objects):
+            folder = os.path.join(objects, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for sha in os.listdir(folder):
+                if sha not in referenced:
+                    os.remove(os.path.join(folder, sha))
+                    removed_objects += 1
+        return removed_runs, removed_objects
+
+
+STATUS_TEXT = {"restored": "✅ 已恢复", "unchanged": "➖ 无需恢复", "conflict": "⚠️  已跳过", "missing_backup": "❌ 无备份"}
+
+
+def format_rollback(results):
+    lines = [f"{STATUS_TEXT[status]}  {os.path.basename(path)}：{message}" for path, status, message in results]
+    restored = sum(1 for _, status, _ in results if status == "restored")
+    lines.append(f"共 {len(results)} 个文件，恢复 {restored} 个")
+    return "\n".join(lines)
+
+
+# ========== 图形界面 ==========
+def open_journal_window(parent, journal=None):
+    """回滚窗口：左侧运行列表，右侧该运行修改过的文件，可整批或按所选文件回滚"""
+    import tkinter as tk
+    from tkinter import messagebox, scrolledtext
+    journal = journal or RestoreJournal()
+    window = tk.Toplevel(parent)
+    window.title("批量修改记录 / 回滚")
+    window.geometry("900x520")
+
+    body = tk.Frame(window, padx=10, pady=8)
+    body.pack(fill=tk.BOTH, expand=True)
+    left = tk.Frame(body)
+    left.pack(side=tk.LEFT, fill=tk.Y)
+    tk.Label(left, text="运行记录（新的在前）：", font=("微软雅黑", 9)).pack(anchor=tk.W)
+    run_list = tk.Listbox(left, width=48, font=("微软雅黑", 9), exportselection=False)
+    run_list.pack(fill=tk.Y, expand=True)
+    right = tk.Frame(body, padx=8)
+    right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    tk.Label(right, text="修改过的文件（可多选）：", font=("微软雅黑", 9)).pack(anchor=tk.W)
+    file_list = tk.Listbox(right, selectmode=tk.EXTENDED, font=("微软雅黑", 9), exportselection=False)
+    file_list.pack(fill=tk.BOTH, expand=True)
+    log_text = scrolledtext.ScrolledText(window, height=7, font=("Consolas", 9))
+    log_text.pack(fill=tk.X, padx=10, pady=(0, 8))
+
+    state = {"runs": [], "run": None, "paths": []}
+
+    def refresh_runs():
+        run_list.delete(0, tk.END)
+        state["runs"] = journal.runs(limit=200)
+        for r in state["runs"]:
+            when = datetime.datetime.fromtimestamp(r["time"]).strftime("%m-%d %H:%M")
+            status = f"{r['changed']}个已修改" if r["ended"] else "未正常结束"
+            run_list.insert(tk.END, f"{when}  {r['tool']}  {status}")
+
+    def show_run(_event=None):
+        selection = run_list.curselection()
+        if not selection:
+            return
+        run = journal.load(state["runs"][selection[0]]["run"])
+        state["run"] = run
+        state["paths"] = run.changed_files
+        file_list.delete(0, tk.END)
+        for path in state["paths"]:
+            mark = "（已回滚）" if run.files[path]["rolled_back"] else ""
+            file_list.insert(tk.END, f"{os.path.basename(path)}{mark}")
+        log_text.insert(tk.END, f"运行 {run.id}：{run.tool}  {run.folder}\n")
+        log_text.see(tk.END)
+
+    def do_rollback(selected_only):
+        run = state["run"]
+        if run is None:
+            messagebox.showinfo("提示", "请先选择一次运行！", parent=window)
+            return
+        files = [state["paths"][i] for i in file_list.curselection()] if selected_only else run.changed_files
+        if not files:
+            messagebox.showinfo("提示", "没有需要回滚的文件！", parent=window)
+            return
+        if not messagebox.askyesno("确认", f"回滚 {len(files)} 个文件到修改前的内容？", parent=window):
+            return
+        log_text.insert(tk.END, format_rollback(run.rollback(files)) + "\n")
+        log_text.see(tk.END)
+        show_run()
+
+    run_list.bind("<<ListboxSelect>>", show_run)
+    buttons = tk.Frame(right, pady=5)
+    buttons.pack(fill=tk.X)
+    tk.Button(buttons, text="回滚整批", command=lambda: do_rollback(False),
+              bg="#F56C6C", fg="white", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=4)
+    tk.Button(buttons, text="回滚所选文件", command=lambda: do_rollback(True),
+              font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=4)
+    tk.Button(buttons, text="刷新", command=refresh_runs, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=4)
+    refresh_runs()
+    return window
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量修改回滚日志")
+    parser.add_argument("--root", help="日志目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="列出最近的运行")
+    p_list.add_argument("--limit", type=int, default=20)
+    p_show = sub.add_parser("show", help="查看一次运行")
+    p_show.add_argument("run")
+    p_rollback = sub.add_parser("rollback", help="回滚一次运行")
+    p_rollback.add_argument("run")
+    p_rollback.add_argument("--files", nargs="+", help="只回滚这些文件")
+    p_rollback.add_argument("--force", action="store_true", help="运行之后又被修改的文件也强制恢复")
+    p_prune = sub.add_parser("prune", help="清理旧记录和备份")
+    p_prune.add_argument("--days", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    journal = RestoreJournal(args.root)
+    if args.command == "list":
+        for r in journal.runs(limit=args.limit):
+            when = datetime.datetime.fromtimestamp(r["time"]).strftime("%Y-%m-%d %H:%M:%S")
+            status = f"修改 {r['changed']}/{r['files']} 个文件" if r["ended"] else "未正常结束"
+            print(f"{r['run']}  {when}  {r['tool']:<16}{status}  {r['folder']}")
+        return 0
+    if args.command == "prune":
+        runs, objects = journal.prune(args.days)
+        print(f"已删除 {runs} 次运行记录、{objects} 个不再引用的备份")
+        return 0
+    try:
+        run = journal.load(args.run)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    if args.command == "show":
+        print(f"{run.id}  {run.tool}  {run.folder}")
+        for path, entry in run.files.items():
+            if entry["after"] == entry["before"]:
+                state = "未修改"
+            elif entry["rolled_back"]:
+                state = "已回滚"
+            else:
+                state = "已修改" if entry["after"] else "修改未完成"
+            print(f"  {state}  {path}")
+        return 0
+    results = run.rollback(args.files, args.force)
+    print(format_rollback(results))
+    return 0 if all(status in ("restored", "unchanged") for _, status, _ in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+规则文件 - 把各工具里写死的「文件名关键词 → 表格内容/新增列/备注」配置移到外部 JSON / YAML 文件
+1. 规则文件默认放在 rules/ 目录（与工具脚本同名，如 rules/表格添加不同列.json），
+   新增测试模式只需编辑规则文件，不用修改和重新分发脚本
+2. 启动时校验并编译：关键词按文件中的顺序（即优先级）预处理大小写，表格内容预先排成 TableSpec
+   （行、合并、列宽），工具直接按规格建表；校验失败时报出具体的规则位置
+3. 编译结果按「规则文件内容哈希」缓存到 ~/.word_toolbox/rule_cache，内容不变时直接读缓存
+4. 热重载：RuleFile.current() 发现文件修改时间变化就重新编译，工具箱/任务服务等常驻进程无需重启；
+   新文件有错误时继续使用上一份有效规则并报告错误
+
+规则文件格式（JSON；YAML 结构相同，需要 pip install pyyaml）：
+  表头表格（word顶部批量添加6种表格 / 两种表格）：
+    {"kind": "header_table", "case_sensitive": false,
+     "defaults": {"row1_col1": "试验供电电源：380V AC/50Hz"},
+     "rules": [{"keyword": "M1_ME_H", "row1_col2": "试验频率范围：150kHz-30MHz", "row2_merged": "样品运行模式：1"}]}
+  新增列（表格添加不同列）：
+    {"kind": "column_table", "case_sensitive": true,
+     "rules": [{"keyword": "ME_H", "data_values": ["130", "H", "——"], "remark": "备注：——"}],
+     "default": {"data_values": ["", "", ""], "remark": "备注：无匹配关键词"}}
+
+用法：
+    self.rules = RuleFile(rule_path("表格添加不同列.json"), log=self._log)
+    rule = self.rules.current().match(file_name)     # 未匹配时返回 default（可能为None）
+
+命令行（校验/查看编译结果）：
+python rule_config.py rules/表格添加不同列.json
+"""
+import os
+import sys
+import json
+import pickle
+import hashlib
+from collections import namedtuple
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_DIR = os.path.join(TOOLS_DIR, "rules")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".word_toolbox", "rule_cache")
+# 编译结果结构变化时加1，旧缓存自动失效
+COMPILER_VERSION = 1
+
+# 表格规格：rows 为每行单元格文字（合并单元格只写一次），merges 为 (行, 起始列, 结束列)
+TableSpec = namedtuple("TableSpec", "rows cols merges col_widths_in")
+HeaderRule = namedtuple("HeaderRule", "keyword table")
+ColumnRule = namedtuple("ColumnRule", "keyword data_values remark")
+
+HEADER_FIELDS = ("row1_col1", "row1_col2", "row2_merged")
+NEW_COLUMN_COUNT = 3
+
+
+class RuleError(ValueError):
+    """规则文件格式错误"""
+
+
+def rule_path(file_name):
+    return os.path.join(RULES_DIR, file_name)
+
+
+def _read(path, data=None):
+    """读取规则文件（JSON或YAML）"""
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    text = data.decode("utf-8-sig")
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise RuleError(f"{os.path.basename(path)}：读取YAML规则需要先安装：pip install pyyaml")
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RuleError(f"{os.path.basename(path)}：YAML格式错误：{e}")
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise RuleError(f"{os.path.basename(path)}：JSON格式错误：{e}")
+
+
+def _text(value, where):
+    if not isinstance(value, str):
+        raise RuleError(f"{where} 应为文字，实际为 {type(value).__name__}")
+    return value
+
+
+# ========== 编译 ==========
+class CompiledRules:
+    """编译后的规则：按优先级匹配文件名"""
+
+    def __init__(self, kind, source, sha, rules, default=None, case_sensitive=True):
+        self.kind = kind
+        self.source = source
+        self.sha = sha
+        self.rules = tuple(rules)
+        self.default = default
+        self.case_sensitive = case_sensitive
+        self._keys = tuple(r.keyword if case_sensitive else r.keyword.lower() for r in self.rules)
+
+    def match(self, file_name):
+        """返回文件名中第一个（按规则文件顺序）出现的关键词对应的规则，未匹配时返回 default"""
+        name = os.path.basename(file_name)
+        if not self.case_sensitive:
+            name = name.lower()
+        for key, rule in zip(self._keys, self.rules):
+            if key in name:
+                return rule
+        return self.default
+
+    @property
+    def keywords(self):
+        return [r.keyword for r in self.rules]
+
+    def __len__(self):
+        return len(self.rules)
+
+
+def _compile_header_table(data, where):
+    defaults = data.get("defaults") or {}
+    if not isinstance(defaults, dict):
+        raise RuleError(f"{where}.defaults 应为对象")
+    rules = []
+    for idx, raw in enumerate(data.get("rules") or []):
+        at = f"{where}.rules[{idx}]"
+        if not isinstance(raw, dict):
+            raise RuleError(f"{at} 应为对象")
+        merged = dict(defaults, **raw)
+        keyword = _text(merged.get("keyword"), f"{at}.keyword").strip()
+        if not keyword:
+            raise RuleError(f"{at}.keyword 不能为空")
+        missing = [f for f in HEADER_FIELDS if f not in merged]
+        if missing:
+            raise RuleError(f"{at}（{keyword}）缺少：{', '.join(missing)}")
+        unknown = set(merged) - set(HEADER_FIELDS) - {"keyword"}
+        if unknown:
+            raise RuleError(f"{at}（{keyword}）有未知字段：{', '.join(sorted(unknown))}")
+        cells = [_text(merged[f], f"{at}.{f}") for f in HEADER_FIELDS]
+        table = TableSpec(rows=((cells[0], cells[1]), (cells[2],)), cols=2, merges=((1, 0, 1),),
+                          col_widths_in=(3.0, 3.0))
+        rules.append(HeaderRule(keyword, table))
+    return rules, None
+
+
+def _compile_column_rule(raw, at, keyword_required=True):
+    if not isinstance(raw, dict):
+        raise RuleError(f"{at} 应为对象")
+    keyword = raw.get("keyword", "")
+    if keyword_required:
+        keyword = _text(keyword, f"{at}.keyword").strip()
+        if not keyword:
+            raise RuleError(f"{at}.keyword 不能为空")
+    values = raw.get("data_values")
+    if not isinstance(values, list) or len(values) != NEW_COLUMN_COUNT:
+        raise RuleError(f"{at}（{keyword or 'default'}）.data_values 应为{NEW_COLUMN_COUNT}个文字的列表")
+    values = tuple(_text(v, f"{at}.data_values") for v in values)
+    remark = _text(raw.get("remark"), f"{at}.remark")
+    return ColumnRule(keyword, values, remark)
+
+
+def _compile_column_table(data, where):
+    rules = [_compile_column_rule(raw, f"{where}.rules[{idx}]") for idx, raw in enumerate(data.get("rules") or [])]
+    if data.get("default") is None:
+        raise RuleError(f"{where}：缺少 default（文件名不含任何关键词时使用）")
+    return rules, _compile_column_rule(data["default"], f"{where}.default", keyword_required=False)
+
+
+COMPILERS = {"header_table": _compile_header_table, "column_table": _compile_column_table}
+
+
+def compile_rules(data, source="", sha=""):
+    """校验并编译规则数据"""
+    where = os.path.basename(source) or "规则"
+    if not isinstance(data, dict):
+        raise RuleError(f"{where}：顶层应为对象")
+    kind = data.get("kind")
+    if kind not in COMPILERS:
+        raise RuleError(f"{where}.kind 应为 {' / '.join(COMPILERS)}，实际为 {kind!r}")
+    rules, default = COMPILERS[kind](data, where)
+    if not rules:
+        raise RuleError(f"{where}：没有任何规则")
+    seen = set()
+    case_sensitive = bool(data.get("case_sensitive", True))
+    for rule in rules:
+        key = rule.keyword if case_sensitive else rule.keyword.lower()
+        if key in seen:
+            raise RuleError(f"{where}：关键词重复：{rule.keyword}")
+        seen.add(key)
+    return CompiledRules(kind, source, sha, rules, default, case_sensitive)
+
+
+def load_rules(path, use_cache=True):
+    """读取并编译规则文件（按内容哈希缓存编译结果）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    sha = hashlib.sha256(data + f"|{COMPILER_VERSION}".encode()).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"{sha}.pickle")
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                compiled = pickle.load(f)
+            compiled.source = os.path.abspath(path)
+            return compiled
+        except Exception:
+            pass  # 缓存损坏时重新编译
+    compiled = compile_rules(_read(path, data), os.path.abspath(path), sha)
+    if use_cache:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass  # 缓存只是加速，写不进去不影响使用
+    return compiled
+
+
+class RuleFile:
+    """规则文件 + 热重载"""
+
+    def __init__(self, path, log=None):
+        self.path = path
+        self.log = log
+        self._stamp = None
+        self._rules = None
+        self.current()
+
+    def current(self):
+        """
+        返回当前规则；文件修改时间/大小变化时重新编译
+        新规则有错误时：已有有效规则则继续使用并报告，否则抛出 RuleError
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if self._rules is None:
+                raise RuleError(f"找不到规则文件：{self.path}") from e
+            return self._rules
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return self._rules
+        self._stamp = stamp
+        try:
+            rules = load_rules(self.path)
+        except (RuleError, OSError) as e:
+            if self._rules is None:
+                raise
+            self._report(f"⚠️  规则文件有错误，继续使用上一份规则：{e}")
+            return self._rules
+        reloaded = self._rules is not None
+        self._rules = rules
+        self._report(f"{'🔄 已重新加载' if reloaded else '📐 已加载'}规则：{os.path.basename(self.path)}"
+                     f"（{len(rules)} 条）")
+        return self._rules
+
+    def _report(self, message):
+        if self.log:
+            self.log(message)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("用法：python rule_config.py 规则文件 [规则文件 ...]")
+        return 1
+    code = 0
+    for path in argv:
+        try:
+            rules = load_rules(path, use_cache=False)
+        except (RuleError, OSError) as e:
+            print(f"❌ {e}")
+            code = 1
+            continue
+        print(f"✅ {path}：{rules.kind}，{len(rules)} 条规则（{'区分' if rules.case_sensitive else '不区分'}大小写）")
+        for rule in rules.rules:
+            detail = " | ".join(" / ".join(row) for row in rule.table.rows) if rules.kind == "header_table" \
+                else f"{list(rule.data_values)}  {rule.remark}"
+            print(f"  {rule.keyword:<16}{detail}")
+        if rules.default is not None:
+            print(f"  {'(未匹配)':<16}{list(rules.default.data_values)}  {rules.default.remark}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
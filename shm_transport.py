@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+共享内存传输 - 合并时由工作进程读取（可选压缩图片）输入文档，部件字节经共享内存交给合并主进程
+1. 工作进程把docx的每个成员（图片、XML）写入 multiprocessing.shared_memory 段，结果里只返回句柄
+   SegmentRef(段名, 字节数, sha256)；小于 INLINE_LIMIT 的成员直接随结果返回（pickle开销可忽略）
+2. 主进程 SegmentStore 按句柄映射同一段内存：XML部件解析时读取，图片部件的 blob 直接是
+   共享内存上的 memoryview，去重哈希和写出合并文件都不复制字节；sha256 在工作进程中已算好
+3. 引用计数：每个输入文档持有自己的段，追加完成后释放；被合并结果引用的图片段由合并结果继续持有，
+   保存后统一释放并删除（unlink）。主进程异常退出时由 multiprocessing 的 resource_tracker 清理
+4. Windows 上共享内存在最后一个句柄关闭时消失，工作进程保留句柄直到主进程确认已映射。
+   确认随后续任务带给工作进程，但任务由哪个工作进程执行不确定：主进程把尚未确认释放的段名都带上，
+   工作进程只关闭自己创建的段并在结果中报告已关闭的段名，主进程据此移除，其余段名下次继续带上
+  （合并结束关闭进程池时全部释放）；Linux/macOS 上工作进程写完即关闭
+5. 共享内存不可用（如 /dev/shm 空间不足）时自动改为随结果返回字节
+
+用法（main.py 勾选「多进程预读」时）：
+    with ParallelFeeder(docx_files, optimize_dpi=150, log=self.log) as feeder:
+        master_doc, _ = next(feeder)
+        composer = MergeComposer(master_doc)
+        for doc, lease in feeder:
+            composer.append(doc)
+            feeder.keep(composer.take_new_parts())   # 合并结果引用的段继续持有
+            lease.release()
+        composer.save(output_path)
+        log(feeder.summary())
+"""
+import io
+import os
+import hashlib
+import zipfile
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+INLINE_LIMIT = 64 * 1024
+DEFAULT_WINDOW = 8  # 同时在途（已读取未追加）的文档数上限，限制共享内存占用
+
+SegmentRef = namedtuple("SegmentRef", "name size sha256")
+
+
+# ========== 工作进程侧 ==========
+_hold_handles = os.name == "nt"   # 发布后保留句柄直到主进程确认（Windows必需）
+_held = {}        # 已发布、主进程尚未确认的段（保留句柄）
+_optimizer = None
+
+
+def _init_worker(hold_handles):
+    global _hold_handles
+    _hold_handles = hold_handles
+
+
+def publish(data, inline_limit=INLINE_LIMIT):
+    """把字节放入共享内存段，返回 SegmentRef；太小（或 inline_limit=None）、共享内存不可用时原样返回字节"""
+    if inline_limit is None or len(data) < inline_limit:
+        return data
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+    except OSError:
+        return data
+    shm.buf[:len(data)] = data
+    ref = SegmentRef(shm.name, len(data), hashlib.sha256(data).hexdigest())
+    if _hold_handles:
+        _held[shm.name] = shm
+    else:
+        shm.close()  # 段在主进程 unlink 前一直存在
+    return ref
+
+
+def release_held(names):
+    """主进程已映射的段：工作进程关闭自己持有的句柄，返回实际关闭的段名（其他进程创建的段忽略）"""
+    released = []
+    for name in names:
+        shm = _held.pop(name, None)
+        if shm is not None:
+            shm.close()
+            released.append(name)
+    return released
+
+
+def _get_optimizer(target_dpi):
+    global _optimizer
+    if _optimizer is None or _optimizer.target_dpi != target_dpi:
+        from media_optimizer import MediaOptimizer
+        # 已经是多进程，进程内不再开图片线程池
+        _optimizer = MediaOptimizer(target_dpi=target_dpi, max_workers=1)
+    return _optimizer
+
+
+def load_members(path, optimize_dpi=None, attached=(), inline_limit=INLINE_LIMIT):
+    """
+    工作进程任务：读取docx（可选压缩图片），各成员写入共享内存
+    :param attached: 主进程已映射、尚未确认释放的段名（只释放本进程持有的句柄）
+    :param inline_limit: 小于此大小的成员随结果返回；None 时全部随结果返回（pickle，用于对比）
+    :return: (路径, {成员名: SegmentRef 或 bytes}, 图片压缩统计 (张数, 压缩前字节, 压缩后字节),
+              本次关闭句柄的段名, (进程号, 本进程仍持有的段数))
+    """
+    released = release_held(attached)
+    with open(path, "rb") as f:
+        data = f.read()
+    stats = (0, 0, 0)
+    if optimize_dpi:
+        optimizer = _get_optimizer(optimize_dpi)
+        before = (optimizer.images_optimized, optimizer.bytes_before, optimizer.bytes_after)
+        data = optimizer.optimize_bytes(data)
+        stats = (optimizer.images_optimized - before[0], optimizer.bytes_before - before[1],
+                 optimizer.bytes_after - before[2])
+    members = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        for info in z.infolist():
+            if not info.is_dir():
+                members[info.filename] = publish(z.read(info), inline_limit)
+    return path, members, stats, released, (os.getpid(), len(_held))
+
+
+# ========== 主进程侧 ==========
+class SegmentStore:
+    """主进程映射的共享内存段（引用计数，计数归零时关闭并删除）"""
+
+    def __init__(self, hold_handles=False):
+        """:param hold_handles: 工作进程保留句柄，映射后需要确认"""
+        if os.name != "nt":
+            # 先启动 resource_tracker，工作进程与主进程共用，主进程异常退出时由它清理
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+        self._lock = threading.Lock()
+        self._segments = {}   # 段名 -> [SharedMemory, memoryview, 引用数]
+        self._owner = {}      # id(memoryview) -> 段名
+        self.hold_handles = hold_handles
+        self._unacked = {}    # 已映射、工作进程尚未报告关闭句柄的段名（有序）
+        self.segments_total = 0
+        self.bytes_total = 0
+        self.bytes_inline = 0
+        self.hashes = {}      # id(memoryview) -> sha256（工作进程已算好）
+
+    def attach(self, ref):
+        """映射一个段，引用数为1，返回该段上的 memoryview"""
+        shm = shared_memory.SharedMemory(name=ref.name)
+        view = shm.buf[:ref.size]
+        with self._lock:
+            self._segments[ref.name] = [shm, view, 1]
+            self._owner[id(view)] = ref.name
+            self.hashes[id(view)] = ref.sha256
+            if self.hold_handles:
+                self._unacked[ref.name] = None
+            self.segments_total += 1
+            self.bytes_total += ref.size
+        return view
+
+    def owner(self, blob):
+        """blob 是本存储中某段的 memoryview 时返回段名"""
+        if isinstance(blob, memoryview):
+            return self._owner.get(id(blob))
+        return None
+
+    def hold(self, name):
+        with self._lock:
+            self._segments[name][2] += 1
+
+    def release(self, name):
+        with self._lock:
+            entry = self._segments.get(name)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] > 0:
+                return
+            del self._segments[name]
+            self._owner.pop(id(entry[1]), None)
+            self.hashes.pop(id(entry[1]), None)
+        self._free(entry)
+
+    @staticmethod
+    def _free(entry):
+        shm, view, _ = entry
+        try:
+            view.release()
+            shm.close()
+        except BufferError:
+            pass  # 仍有导出的缓冲区（极少见），映射随对象回收释放；段名照样删除
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def unacknowledged(self):
+        """已映射但工作进程尚未关闭句柄的段名（随下一个任务发给工作进程）"""
+        with self._lock:
+            return list(self._unacked)
+
+    def acknowledge(self, names):
+        """工作进程报告已关闭句柄的段名"""
+        with self._lock:
+            for name in names:
+                self._unacked.pop(name, None)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._segments.values())
+            self._segments.clear()
+            self._owner.clear()
+            self.hashes.clear()
+        for entry in entries:
+            self._free(entry)
+
+
+class Lease:
+    """一个输入文档持有的段，追加完成后 release()"""
+
+    def __init__(self, store, names):
+        self.store = store
+        self.names = list(names)
+
+    def release(self):
+        names, self.names = self.names, []
+        for name in names:
+            self.store.release(name)
+
+
+def _part_blob(part):
+    return part.__dict__.get("_blob")
+
+
+class ParallelFeeder:
+    """
+    按顺序产出 (文档, Lease)：进程池提前读取后面的文档（最多 window 个在途），
+    部件经共享内存传回
+    """
+
+    def __init__(self, paths, workers=None, window=DEFAULT_WINDOW, optimize_dpi=None, log=None, transport="shm",
+                 hold_handles=None):
+        """
+        :param transport: "shm" 共享内存；"pickle" 全部字节随结果返回（对比用）
+        :param hold_handles: 工作进程保留句柄直到确认，默认仅 Windows
+        """
+        if hold_handles is None:
+            hold_handles = os.name == "nt"
+        self.paths = list(paths)
+        self.inline_limit = INLINE_LIMIT if transport == "shm" else None
+        self.workers = workers or max(1, min(os.cpu_count() or 2, 8))
+        self.window = max(1, window)
+        self.optimize_dpi = optimize_dpi
+        self.log = log or (lambda message: None)
+        self.store = SegmentStore(hold_handles)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(hold_handles,))
+        self._pending = deque()
+        self._attach_lock = threading.Lock()
+        self._next = 0
+        self.worker_held = {}   # 工作进程号 -> 最近一次任务结束时仍持有的段数
+        self.images_optimized = 0
+        self.image_bytes_before = 0
+        self.image_bytes_after = 0
+
+    # ----- 预读 -----
+    def _submit(self):
+        while self._next < len(self.paths) and len(self._pending) < self.window:
+            future = self._pool.submit(load_members, self.paths[self._next], self.optimize_dpi,
+                                       self.store.unacknowledged(), self.inline_limit)
+            # 结果一到就映射（Windows上工作进程据此尽早关闭句柄）
+            future.add_done_callback(self._attach_result)
+            self._pending.append(future)
+            self._next += 1
+
+    def _attach_result(self, future):
+        """映射一个结果中的全部段（回调线程和主线程都可能调用，只执行一次）"""
+        with self._attach_lock:
+            if hasattr(future, "attached") or future.cancelled() or future.exception() is not None:
+                return
+            path, members, stats, released, (pid, held) = future.result()
+            self.store.acknowledge(released)
+            self.worker_held[pid] = held
+            attached = {}
+            for name, value in members.items():
+                if isinstance(value, SegmentRef):
+                    attached[name] = self.store.attach(value)
+                else:
+                    attached[name] = value
+                    self.store.bytes_inline += len(value)
+            future.attached = (path, attached, stats)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._submit()
+        if not self._pending:
+            raise StopIteration
+        future = self._pending.popleft()
+        future.result()  # 工作进程中的异常在这里抛出
+        # 完成回调可能还没执行（result() 先于回调返回）
+        self._attach_result(future)
+        path, members, stats = future.attached
+        self._submit()
+
+        self.images_optimized += stats[0]
+        self.image_bytes_before += stats[1]
+        self.image_bytes_after += stats[2]
+        names = [self.store.owner(v) for v in members.values() if isinstance(v, memoryview)]
+        from lazy_package import document_from_members
+        try:
+            doc = document_from_members(members, path)
+        except Exception:
+            Lease(self.store, names).release()
+            raise
+        # 文档部件直接引用的段（图片）由文档持有，其余（XML，已解析）立即释放
+        kept = {self.store.owner(_part_blob(part)) for part in doc.part.package.iter_parts()}
+        kept.discard(None)
+        for name in names:
+            if name not in kept:
+                self.store.release(name)
+        return doc, Lease(self.store, kept)
+
+    # ----- 追加后 -----
+    def keep(self, parts):
+        """合并结果中新建的部件若引用了共享内存段，则增加引用（保存前不释放）"""
+        for part in parts:
+            name = self.store.owner(_part_blob(part))
+            if name:
+                self.store.hold(name)
+
+    def digest(self, part):
+        """工作进程已算好的 sha256（没有时返回None）"""
+        return self.store.hashes.get(id(_part_blob(part)))
+
+    def summary(self):
+        text = (f"🔀 多进程预读：{self.workers} 个进程，共享内存传输 {self.store.segments_total} 段 "
+                f"{self.store.bytes_total / 1024 / 1024:.2f} MB，随结果直接传输 "
+                f"{self.store.bytes_inline / 1024 / 1024:.2f} MB")
+        if self.optimize_dpi:
+            saved = self.image_bytes_before - self.image_bytes_after
+            text += (f"\n🗜️ 图片压缩：处理 {self.images_optimized} 张，"
+                     f"{self.image_bytes_before / 1024 / 1024:.2f} MB → {self.image_bytes_after / 1024 / 1024:.2f} MB，"
+                     f"节省 {saved / 1024 / 1024:.2f} MB")
+        return text
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._pool.shutdown(wait=True)
+        # 已完成但未取走的结果也要释放
+        for future in self._pending:
+            attached = getattr(future, "attached", None)
+            if attached:
+                for value in attached[1].values():
+                    name = self.store.owner(value)
+                    if name:
+                        self.store.release(name)
+        self._pending.clear()
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
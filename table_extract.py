@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+测量表格批量导出 - 把成千上万份报告里的表格数据（Frequency/QuasiPeak/Margin/Limit，以及
+「表格添加不同列」添加的天线高度/天线极化/转台角度）导出为 CSV / Parquet / Arrow，直接用于跨批次分析
+1. 多进程并行，每个文件用 lxml iterparse 流式读取 word/document.xml 中的 w:tbl，不经过 python-docx
+   （横向合并的单元格按列重复、纵向合并沿用上一行内容，与 python-docx 的 row.cells 一致）
+2. 按表头识别列（英文原表头和替换后的中文表头都认），没有 Frequency/频率 列的表格跳过
+3. 数值列转为浮点数（"——"、空白等记为空），每行附带来源文件、文件名关键词、表格序号、行号
+4. 「备注：……」合并行不作为数据行，内容写入该表格每一行的 remark 列
+
+依赖：CSV 只需标准库；Parquet / Arrow 需要 pip install pyarrow
+
+命令行：
+python table_extract.py D:\\报告 -o 测量数据.csv
+python table_extract.py D:\\报告 D:\\报告2 -o 测量数据.parquet --recursive --workers 6
+"""
+import os
+import re
+import sys
+import csv
+import time
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from doc_catalog import name_facts, paragraph_text
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_NUMBER_RE = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+
+# 表头 → 列名（表头去掉空格、括号内单位后比较，不区分大小写）
+HEADER_ALIASES = {
+    "frequency": "frequency", "freq": "frequency", "频率": "frequency",
+    "quasipeak": "quasi_peak", "qp": "quasi_peak", "准峰值": "quasi_peak",
+    "margin": "margin", "裕量": "margin",
+    "limit": "limit", "限值": "limit",
+    "天线高度": "antenna_height_cm", "antennaheight": "antenna_height_cm",
+    "天线极化": "polarization", "polarization": "polarization",
+    "转台角度": "turntable_deg", "turntableangle": "turntable_deg",
+}
+MEASURE_COLUMNS = [
+    ("frequency", "float"), ("quasi_peak", "float"), ("margin", "float"), ("limit", "float"),
+    ("antenna_height_cm", "float"), ("polarization", "str"), ("turntable_deg", "float"),
+]
+SOURCE_COLUMNS = [
+    ("source_file", "str"), ("source_path", "str"), ("name_prefix", "str"), ("name_keyword", "str"),
+    ("table_index", "int"), ("row_index", "int"),
+]
+COLUMNS = SOURCE_COLUMNS + MEASURE_COLUMNS + [("remark", "str")]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+
+def _header_key(text):
+    text = re.sub(r"[（(].*?[）)]", "", text)
+    return re.sub(r"\s+", "", text).lower()
+
+
+def to_number(text):
+    """表格文本转浮点数，无法识别（——、空白、N/A）时返回None"""
+    match = _NUMBER_RE.match(text or "")
+    return float(match.group(1)) if match else None
+
+
+def _table_rows(tbl):
+    """表格每行的单元格文本（横向合并按列重复，纵向合并沿用上一行）"""
+    rows = []
+    previous = []
+    for tr in tbl.iterchildren(_W + "tr"):
+        row = []
+        for tc in tr.iterchildren(_W + "tc"):
+            tc_pr = tc.find(_W + "tcPr")
+            span = 1
+            continuing = False
+            if tc_pr is not None:
+                grid_span = tc_pr.find(_W + "gridSpan")
+                if grid_span is not None:
+                    span = int(grid_span.get(_W + "val", "1"))
+                v_merge = tc_pr.find(_W + "vMerge")
+                continuing = v_merge is not None and v_merge.get(_W + "val", "continue") == "continue"
+            col = len(row)
+            if continuing and col < len(previous):
+                text = previous[col]
+            else:
+                text = "\n".join(paragraph_text(p) for p in tc.iterchildren(_W + "p")).strip()
+            row.extend([text] * span)
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def _measure_rows(rows):
+    """
+    识别一个表格的列并转为数据行
+    :return: (数据行字典列表, 备注)；不是测量表格时返回 (None, None)
+    """
+    if not rows:
+        return None, None
+    columns = {}
+    for idx, header in enumerate(rows[0]):
+        name = HEADER_ALIASES.get(_header_key(header))
+        if name and name not in columns:
+            columns[name] = idx
+    if "frequency" not in columns:
+        return None, None
+    records = []
+    remark = None
+    for row_idx, row in enumerate(rows[1:], 1):
+        if row and len(set(row)) == 1 and row[0].startswith("备注"):
+            remark = row[0]
+            continue
+        record = {"row_index": row_idx}
+        for name, kind in MEASURE_COLUMNS:
+            idx = columns.get(name)
+            text = row[idx] if idx is not None and idx < len(row) else ""
+            record[name] = to_number(text) if kind == "float" else (text or None)
+        if record["frequency"] is None:
+            continue  # 空行/小计行
+        records.append(record)
+    return records, remark
+
+
+def extract_file(path):
+    """
+    导出一个docx中所有测量表格的数据行（在工作进程中执行）
+    :return: (路径, 数据行列表, 错误信息)
+    """
+    from lxml import etree
+    base = {"source_file": os.path.basename(path), "source_path": os.path.abspath(path)}
+    base.update(name_facts(os.path.basename(path)))
+    records = []
+    try:
+        with zipfile.ZipFile(path) as z:
+            with z.open("word/document.xml") as stream:
+                table_idx = 0
+                for _, tbl in etree.iterparse(stream, events=("end",), tag=_W + "tbl"):
+                    parent = tbl.getparent()
+                    if parent is None or parent.tag != _W + "body":
+                        continue  # 嵌套表格随外层表格一起释放
+                    rows, remark = _measure_rows(_table_rows(tbl))
+                    if rows:
+                        for row in rows:
+                            row.update(base, table_index=table_idx, remark=remark)
+                        records.extend(rows)
+                    table_idx += 1
+                    # 释放已处理的部分，大文件内存保持平稳
+                    tbl.clear()
+                    while tbl.getprevious() is not None:
+                        del parent[0]
+    except Exception as e:
+        return path, records, str(e) or e.__class__.__name__
+    return path, records, None
+
+
+# ========== 输出 ==========
+class _CsvSink:
+    def __init__(self, path):
+        # utf-8-sig：Excel直接打开不乱码
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMN_NAMES)
+        self.writer.writeheader()
+
+    def write(self, records):
+        self.writer.writerows(records)
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowSink:
+    """Parquet / Arrow IPC（按批写入，内存中只保留一批）"""
+    BATCH_ROWS = 50000
+
+    def __init__(self, path, fmt):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("导出 Parquet/Arrow 需要先安装：pip install pyarrow")
+        types = {"float": pa.float64(), "int": pa.int32(), "str": pa.string()}
+        self.pa = pa
+        self.schema = pa.schema([pa.field(name, types[kind]) for name, kind in COLUMNS])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+            self.sink = None
+        else:
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+        self.pending = []
+
+    def write(self, records):
+        self.pending.extend(records)
+        if len(self.pending) >= self.BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        data = {name: [record.get(name) for record in self.pending] for name in COLUMN_NAMES}
+        self.writer.write_table(self.pa.Table.from_pydict(data, schema=self.schema))
+        self.pending = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+def open_sink(path, fmt=None):
+    """按格式（或扩展名 .csv/.parquet/.arrow/.feather）打开输出"""
+    fmt = fmt or os.path.splitext(path)[1].lower().lstrip(".")
+    if fmt == "csv":
+        return _CsvSink(path)
+    if fmt in ("parquet", "arrow", "feather"):
+        return _ArrowSink(path, "parquet" if fmt == "parquet" else "arrow")
+    raise ValueError(f"不支持的输出格式：{fmt}（可用 csv / parquet / arrow）")
+
+
+def list_docx(folders, recursive=False):
+    files = []
+    for folder in folders:
+        if recursive:
+            for dirpath, _, names in os.walk(folder):
+                files.extend(os.path.join(dirpath, n) for n in names
+                             if n.lower().endswith(".docx") and not n.startswith("~$"))
+        else:
+            files.extend(os.path.join(folder, n) for n in os.listdir(folder)
+                         if n.lower().endswith(".docx") and not n.startswith("~$"))
+    return sorted(files)
+
+
+def export_tables(files, output_path, fmt=None, max_workers=None, log=print):
+    """
+    并行导出多个文件的测量表格
+    :return: {"files", "rows", "failed", "seconds"}
+    """
+    started = time.perf_counter()
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    sink = open_sink(output_path, fmt)
+    total_rows = 0
+    failed = 0
+    try:
+        if max_workers == 1 or len(files) < 8:
+            results = map(extract_file, files)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            results = executor.map(extract_file, files, chunksize=max(1, min(64, len(files) // (max_workers * 4))))
+        try:
+            for done, (path, records, error) in enumerate(results, 1):
+                if error:
+                    failed += 1
+                    log(f"❌ {os.path.basename(path)}：{error}")
+                sink.write(records)
+                total_rows += len(records)
+                if done % 500 == 0:
+                    log(f"已处理 {done}/{len(files)} 个文件，{total_rows} 行")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    finally:
+        sink.close()
+    return {"files": len(files), "rows": total_rows, "failed": failed,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导出Word报告中的测量表格")
+    parser.add_argument("folders", nargs="+", help="报告文件夹")
+    parser.add_argument("-o", "--output", required=True, help="输出文件（.csv / .parquet / .arrow）")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], help="输出格式（默认按扩展名）")
+    parser.add_argument("--recursive", action="store_true", help="包含子文件夹")
+    parser.add_argument("--workers", type=int, help="并行进程数")
+    args = parser.parse_args(argv)
+
+    files = list_docx(args.folders, args.recursive)
+    if not files:
+        print("⚠️  未找到docx文件")
+        return 1
+    print(f"📊 导出 {len(files)} 个文件的测量表格 → {args.output}")
+    stats = export_tables(files, args.output, args.format, args.workers)
+    rate = stats["files"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"✅ 完成：{stats['rows']} 行，失败 {stats['failed']} 个文件，耗时 {stats['seconds']:.2f}s"
+          f"（{rate:.0f} 个文件/s）")
+    return 0 if not stats["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
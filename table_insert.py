@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+表格插入引擎 - 「在正文某个位置插入带边框的表格 + 空白段落」的统一实现
+（顶部添加表格 / word顶部批量添加两种表格 / word顶部批量添加6种表格 / word顶部按照条件添加表格 共用）
+1. 输入：锚点（正文序号 / 第一个图片之前或之后 / 标题文字之后）+ 表格规格（rule_config.TableSpec）
+   + 表格样式 + 空白行策略；输出：一次树修改
+2. 表格直接按规格拼成 w:tbl（列宽、合并、边框、字体一次写好）并解析一次，
+   不再「文档末尾 add_table → 逐格设置 → 摘下 → 重新插入」，也不需要占位段落
+3. 表格和空白段落组成一个片段，用 body[i:i] = 片段 一次插入
+4. 批量插入：一个文档插多张表时，先在未修改的文档上一次扫描解析全部锚点，
+   再从后往前插入，前面的插入不会让后面的位置失效；任一锚点找不到时整批不修改
+5. 插入位置不会越过末尾的 w:sectPr（节属性）
+
+用法：
+    insert_table(doc, at_index(1), spec, HEADER_STYLE, BlankLines(after=2))
+    insert_tables(doc, [Insertion(after_first_image(), spec_a), Insertion(after_heading("测试结果"), spec_b)])
+"""
+from collections import namedtuple
+from xml.sax.saxutils import escape, quoteattr
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+# 锚点：kind 为 index / before_image / after_image / after_heading
+Anchor = namedtuple("Anchor", "kind value")
+# 表格样式：边框粗细（1/8磅）、字体（None为不设置）、字号（磅）、单元格文字垂直居中
+TableStyle = namedtuple("TableStyle", "border_sz font_name font_size_pt v_center")
+# 空白行策略：表格前/后各插入几行空白段落；reuse=True 时锚点处已有的空白段落也计入（重复执行不叠加）
+BlankLines = namedtuple("BlankLines", "before after reuse", defaults=(0, 2, False))
+Insertion = namedtuple("Insertion", "anchor table style blank", defaults=(None, None))
+
+# 两种/6种表格：0.5磅边框、宋体10号、垂直居中
+HEADER_STYLE = TableStyle(border_sz=4, font_name="宋体", font_size_pt=10, v_center=True)
+# 顶部添加表格/按条件添加表格：1磅边框、10号
+PLAIN_STYLE = TableStyle(border_sz=8, font_name=None, font_size_pt=10, v_center=False)
+
+_HEADING_STYLES = ("heading", "标题", "title")
+
+
+class AnchorNotFound(LookupError):
+    """文档中找不到锚点（如没有图片、没有对应标题）"""
+
+
+def at_index(index):
+    """正文第 index 个元素之前（0为最前面）；正文元素不足时先补空段落"""
+    return Anchor("index", index)
+
+
+def before_first_image():
+    return Anchor("before_image", None)
+
+
+def after_first_image():
+    return Anchor("after_image", None)
+
+
+def after_heading(text):
+    """包含 text 的第一个段落之后（标题样式的段落优先）"""
+    return Anchor("after_heading", text)
+
+
+# ========== 构建表格XML ==========
+def _twips(inches):
+    return int(round(inches * 1440))
+
+
+def _run_xml(text, style):
+    props = ""
+    if style.font_name:
+        props += f"<w:rFonts w:ascii={quoteattr(style.font_name)} w:hAnsi={quoteattr(style.font_name)}/>"
+    if style.font_size_pt:
+        props += f'<w:sz w:val="{int(style.font_size_pt * 2)}"/>'
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return (f"<w:r>{f'<w:rPr>{props}</w:rPr>' if props else ''}"
+            f"<w:t{space}>{escape(text)}</w:t></w:r>")
+
+
+def build_table_xml(spec, style=HEADER_STYLE):
+    """按表格规格拼出 w:tbl（不含命名空间声明）"""
+    widths = list(spec.col_widths_in) + [spec.col_widths_in[-1] if spec.col_widths_in else 1.0] * spec.cols
+    widths = widths[:spec.cols]
+    spans = {(row, first): last - first + 1 for row, first, last in spec.merges}
+    border = f'w:val="single" w:sz="{style.border_sz}" w:space="0" w:color="000000"'
+    borders = "<w:tcBorders>" + "".join(f"<w:{side} {border}/>" for side in ("top", "left", "bottom", "right")) \
+              + "</w:tcBorders>"
+    v_align = '<w:vAlign w:val="center"/>' if style.v_center else ""
+
+    rows_xml = []
+    for row_idx, texts in enumerate(spec.rows):
+        cells, col, text_idx = [], 0, 0
+        while col < spec.cols:
+            span = spans.get((row_idx, col), 1)
+            text = texts[text_idx] if text_idx < len(texts) else ""
+            grid = f'<w:gridSpan w:val="{span}"/>' if span > 1 else ""
+            width = _twips(sum(widths[col:col + span]))
+            cells.append(f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/>{grid}{borders}{v_align}</w:tcPr>'
+                         f"<w:p>{_run_xml(text, style)}</w:p></w:tc>")
+            col += span
+            text_idx += 1
+        rows_xml.append("<w:tr>" + "".join(cells) + "</w:tr>")
+    grid_cols = "".join(f'<w:gridCol w:w="{_twips(w)}"/>' for w in widths)
+    return ('<w:tbl><w:tblPr><w:tblW w:type="auto" w:w="0"/><w:jc w:val="left"/>'
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" '
+            'w:noVBand="1" w:val="04A0"/></w:tblPr>'
+            f"<w:tblGrid>{grid_cols}</w:tblGrid>{''.join(rows_xml)}</w:tbl>")
+
+
+def build_fragment(spec, style, pad_before=0, blank_before=0, blank_after=0):
+    """表格 + 前后空白段落，解析一次得到元素列表"""
+    blank = "<w:p/>"
+    xml = blank * (pad_before + blank_before) + build_table_xml(spec, style) + blank * blank_after
+    wrapper = parse_xml(f"<w:body {nsdecls('w')}>{xml}</w:body>")
+    return list(wrapper)
+
+
+# ========== 解析锚点 ==========
+def _content_count(body):
+    """正文内容元素个数（不含末尾的 w:sectPr）"""
+    count = len(body)
+    if count and body[count - 1].tag == qn("w:sectPr"):
+        count -= 1
+    return count
+
+
+def _paragraph_text(elem):
+    return "".join(t.text or "" for t in elem.iter(qn("w:t")))
+
+
+def _is_heading(elem):
+    p_pr = elem.find(qn("w:pPr"))
+    if p_pr is None:
+        return False
+    if p_pr.find(qn("w:outlineLvl")) is not None:
+        return True
+    p_style = p_pr.find(qn("w:pStyle"))
+    name = (p_style.get(qn("w:val")) or "").lower() if p_style is not None else ""
+    return any(key in name for key in _HEADING_STYLES)
+
+
+def _is_blank(elem):
+    return elem.tag == qn("w:p") and not _paragraph_text(elem).strip() \
+        and not any(True for _ in elem.iter(qn("w:drawing"), qn("w:pict"), qn("w:object")))
+
+
+class _BodyIndex:
+    """正文一次扫描的结果：第一个图片的位置、各标题文字的位置（按需扫描，只扫一遍）"""
+
+    def __init__(self, body):
+        self.body = body
+        self.count = _content_count(body)
+        self._scanned = False
+        self.first_image = None
+        self.paragraphs = []  # (位置, 文字, 是否标题)
+
+    def _scan(self):
+        if self._scanned:
+            return
+        self._scanned = True
+        p_tag, image_tags = qn("w:p"), (qn("w:drawing"), qn("w:pict"))
+        for idx in range(self.count):
+            elem = self.body[idx]
+            if self.first_image is None and any(True for _ in elem.iter(*image_tags)):
+                self.first_image = idx
+            if elem.tag == p_tag:
+                self.paragraphs.append((idx, _paragraph_text(elem).strip(), _is_heading(elem)))
+
+    def resolve(self, anchor):
+        """返回 (插入位置, 需补的空段落数)"""
+        if anchor.kind == "index":
+            index = max(0, int(anchor.value))
+            return min(index, self.count), max(0, index - self.count)
+        self._scan()
+        if anchor.kind in ("before_image", "after_image"):
+            if self.first_image is None:
+                raise AnchorNotFound("文档中没有图片")
+            return self.first_image + (1 if anchor.kind == "after_image" else 0), 0
+        if anchor.kind == "after_heading":
+            matches = [(not heading, idx) for idx, text, heading in self.paragraphs if anchor.value in text]
+            if not matches:
+                raise AnchorNotFound(f"文档中没有包含「{anchor.value}」的段落")
+            return min(matches)[1] + 1, 0
+        raise ValueError(f"未知锚点类型：{anchor.kind}")
+
+    def blanks_around(self, index):
+        """插入位置前、后已有的连续空白段落数"""
+        before = 0
+        while index - before - 1 >= 0 and _is_blank(self.body[index - before - 1]):
+            before += 1
+        after = 0
+        while index + after < self.count and _is_blank(self.body[index + after]):
+            after += 1
+        return before, after
+
+
+# ========== 插入 ==========
+def _body_of(doc):
+    """接受 Document、document.element 或 w:body 元素"""
+    if hasattr(doc, "element"):
+        return doc.element.body
+    if doc.tag == qn("w:document"):
+        return doc.find(qn("w:body"))
+    return doc
+
+
+def insert_tables(doc, insertions):
+    """
+    在一个文档中插入多张表格
+    :param insertions: Insertion 列表；位置都按插入前的文档解析，同一位置按列表顺序排列
+    :return: 插入的 w:tbl 元素列表（与 insertions 顺序一致）
+    :raises AnchorNotFound: 任一锚点找不到时（此时文档未被修改）
+    """
+    body = _body_of(doc)
+    index = _BodyIndex(body)
+    planned = []
+    for order, item in enumerate(insertions):
+        style = item.style or HEADER_STYLE
+        blank = item.blank or BlankLines()
+        pos, pad = index.resolve(item.anchor)
+        before, after = blank.before, blank.after
+        if blank.reuse:
+            have_before, have_after = index.blanks_around(pos)
+            before, after = max(0, before - have_before), max(0, after - have_after)
+        planned.append((pos, order, build_fragment(item.table, style, pad, before, after)))
+
+    tables = [None] * len(planned)
+    # 从后往前插入：前面位置的元素序号不受影响；同一位置先插后面的，保证最终按列表顺序排列
+    for pos, order, fragment in sorted(planned, key=lambda p: (p[0], p[1]), reverse=True):
+        body[pos:pos] = fragment
+        tables[order] = next(e for e in fragment if e.tag == qn("w:tbl"))
+    return tables
+
+
+def insert_table(doc, anchor, spec, style=HEADER_STYLE, blank=BlankLines()):
+    """在一个位置插入一张表格，返回插入的 w:tbl 元素"""
+    return insert_tables(doc, [Insertion(anchor, spec, style, blank)])[0]
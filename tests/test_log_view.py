@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""log_view：最后一屏按显示行数计算，多行记录不会挡住最新日志"""
+import os
+import sys
+import logging
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_view import LogView, MAX_VIEW_LINES
+
+
+def _view(messages):
+    return deque((logging.INFO, message) for message in messages)
+
+
+def test_max_top_single_line_records():
+    view = _view([f"第{i}条" for i in range(30)])
+    assert LogView._max_top(view, 10) == 20
+
+
+def test_max_top_counts_multiline_records():
+    traceback = "\n".join(["Traceback"] + [f"  line {i}" for i in range(20)])
+    view = _view(["a"] * 20 + [traceback, "b", "c"])
+    # 最后两条各1行，traceback 显示 MAX_VIEW_LINES + 1 行
+    assert LogView._max_top(view, 2 + MAX_VIEW_LINES + 1) == 20
+    assert LogView._max_top(view, 3) == 20
+    assert LogView._max_top(view, 2) == 21
+
+
+def test_max_top_short_view():
+    assert LogView._max_top(_view(["a", "b"]), 10) == 0
+    assert LogView._max_top(_view([]), 10) == 0
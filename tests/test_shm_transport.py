@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""shm_transport：工作进程保留句柄时，确认要送到创建该段的进程，_held 不会一直增长"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shm_transport
+from bench_corpus import generate_corpus
+from shm_transport import ParallelFeeder
+
+
+def test_release_held_only_own_segments(monkeypatch):
+    monkeypatch.setattr(shm_transport, "_hold_handles", True)
+    monkeypatch.setattr(shm_transport, "_held", {})
+    ref = shm_transport.publish(b"x" * 1024, inline_limit=1)
+    try:
+        assert shm_transport.release_held(["psm_other_worker"]) == []
+        assert ref.name in shm_transport._held
+        assert shm_transport.release_held([ref.name, "psm_other_worker"]) == [ref.name]
+        assert shm_transport._held == {}
+    finally:
+        from multiprocessing import shared_memory
+        shared_memory.SharedMemory(name=ref.name).unlink()
+
+
+def test_held_drains_with_more_parts_than_workers(tmp_path):
+    paths = generate_corpus(str(tmp_path), count=16, images=1)
+    workers, window = 2, 2
+    with ParallelFeeder(paths, workers=workers, window=window, hold_handles=True) as feeder:
+        master, lease = next(feeder)
+        lease.release()
+        for doc, lease in feeder:
+            lease.release()
+        per_doc = feeder.store.segments_total / len(paths)
+        # 每个工作进程只保留还没轮到确认的段：不超过在途窗口加上每个进程最后一个任务
+        bound = per_doc * (window + workers)
+        assert feeder.store.segments_total > bound
+        assert len(feeder.store.unacknowledged()) <= bound
+        assert sum(feeder.worker_held.values()) <= bound
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+工具注册表 + 共享服务 - 供「工具箱.py」统一调度各个工具脚本
+1. 每个工具脚本注册为一个操作（插件），脚本本身用到时才加载
+2. 共享服务：文件发现（带缓存）、日志、备份、常驻工作进程池
+3. 同一文件夹可排队执行多个操作，单进程内复用已加载的工具和预热的工作进程
+
+操作类型：
+  per_file —— 逐个文件处理，可分发到进程池并行执行
+  folder   —— 整个文件夹一次处理（合并、转换、重命名等），在主进程执行
+"""
+import os
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler import lpt_order
+
+
+class ToolSpec:
+    """一个已注册的操作"""
+    def __init__(self, name, file_name, kind, runner, description="", class_name=None):
+        """
+        :param name: 操作名称（界面显示）
+        :param file_name: 工具脚本文件名
+        :param kind: "per_file" / "folder"
+        :param runner: per_file: runner(tool, path)；folder: runner(tool, folder, services)
+        :param description: 功能说明
+        """
+        self.name = name
+        self.file_name = file_name
+        self.kind = kind
+        self.runner = runner
+        self.description = description
+        self.class_name = class_name
+
+
+REGISTRY = {}
+
+
+def register(name, file_name, kind, runner, description="", class_name=None):
+    """注册一个操作（重复注册时覆盖）"""
+    REGISTRY[name] = ToolSpec(name, file_name, kind, runner, description, class_name)
+    return REGISTRY[name]
+
+
+def get_spec(name):
+    return REGISTRY[name]
+
+
+# ========== 各工具的调用方式 ==========
+def _run_single_file_tool(tool, path):
+    """
+    单文件工具：设置当前文件后走完整处理流程（含备份）
+    process_word 不返回结果，按本次新增的日志（❌）和错误弹窗判断是否失败
+    """
+    logs = getattr(tool, "headless_logs", [])
+    dialogs = getattr(tool, "headless_dialogs", [])
+    logs_before, dialogs_before = len(logs), len(dialogs)
+    tool.current_file = path
+    if hasattr(tool, "file_var"):
+        tool.file_var.set(path)
+    tool.process_word()
+    failed = (any("❌" in line for line in logs[logs_before:])
+              or any(name == "showerror" for name, _ in dialogs[dialogs_before:]))
+    return not failed
+
+
+def _run_conditional(tool, path):
+    """没有ME/RE关键词的文件跳过（不算失败）"""
+    keyword = tool._detect_keyword(path)
+    if keyword:
+        return tool._add_table_to_docx(path, keyword)
+    return None
+
+
+def _run_different_columns(tool, path):
+    tool._modify_docx_table(path, tool._get_file_config(os.path.basename(path)))
+
+
+def _run_merge(tool, folder, services):
+    output = services.output_path(folder, "merged", ".docx")
+    tool.folder_var.set(folder)
+    tool.output_var.set(output)
+    tool.merge_documents()
+
+
+def _run_pdf(tool, folder, services):
+    tool.word_folder.set(folder)
+    tool.pdf_output_folder.set(os.path.join(folder, "转换后的PDF"))
+    tool.merge_output_path.set(services.output_path(folder, "合并后的PDF", ".pdf"))
+    tool.execute_all()
+
+
+def _run_rtf(tool, folder, services):
+    tool.folder_path.set(folder)
+    tool.batch_convert()
+    services.invalidate(folder)
+
+
+def _run_rename(tool, folder, services):
+    tool.folder_path.set(folder)
+    tool.batch_rename()
+    for line in tool.rename_log:
+        services.log(line)
+    services.invalidate(folder)
+
+
+register("顶部添加表格", "顶部添加表格.py", "per_file", lambda t, p: t._add_table_to_docx(p),
+         "文档顶部插入2×2试验条件表格")
+register("顶部批量添加两种表格", "word顶部批量添加两种表格.py", "per_file",
+         lambda t, p: t._process_single_file(p), "按文件名关键词插入两种表格")
+register("顶部批量添加6种表格", "word顶部批量添加6种表格.py", "per_file",
+         lambda t, p: t._process_single_file(p), "按文件名12种关键词插入表格")
+register("顶部按照条件添加表格", "word顶部按照条件添加表格.py", "per_file", _run_conditional,
+         "按正文ME/RE插入不同频率范围表格")
+register("表格添加列", "表格添加列.py", "per_file", lambda t, p: t._modify_docx_table(p),
+         "表格第三列右侧添加三列")
+register("表格添加三列内容", "表格添加三列内容.py", "per_file", lambda t, p: t._modify_docx_table(p),
+         "表格添加三列并填充内容")
+register("表格添加不同列", "表格添加不同列.py", "per_file", _run_different_columns,
+         "按关键词添加三列+备注行")
+register("修改多个表格", "1-修改多个表格.py", "per_file", lambda t, p: t.process_single_document(p),
+         "删除首个表格、替换表头、删列换列")
+register("修改单个表格", "修改单个表格.py", "per_file", _run_single_file_tool,
+         "删除表格5-9列、交换3/4列、替换表头")
+register("移动表格和图片位置", "移动表格和图片位置.py", "per_file", _run_single_file_tool,
+         "删除图片上方内容，表格移到图片上方")
+register("添加空行", "添加空行.py", "per_file", _run_single_file_tool,
+         "表格/图片上下保留空行")
+register("图片正下方添加文字", "图片正下方添加文字.py", "per_file", _run_single_file_tool,
+         "图片下方居中添加极化文字")
+register("图片下方添加极化说明（全部图片）", "图片正下方添加文字.py", "per_file",
+         lambda t, p: t.caption_all_images(p), "每个图片正下方按文件名H/V添加水平/垂直极化")
+register("调换图片和表格位置", "调换图片和表格位置.py", "per_file",
+         lambda t, p: t._process_single_file(p), "表格移到图片上方并添加说明")
+register("合并Word", "main.py", "folder", _run_merge, "合并文件夹内全部docx（保留页眉/图片/表格）")
+register("合并Word（每文档独立页）", "合并多个word文档并且保持独立页码.py", "folder", _run_merge,
+         "合并时每个源文档从新页开始")
+register("Word转PDF并合并", "大量word转PDF并且合并PDF.py", "folder", _run_pdf, "需要安装Microsoft Word")
+register("RTF转DOCX", "Rtf to .docx.py", "folder", _run_rtf, "需要安装Microsoft Word")
+register("批量重命名", "批量修改word名字.py", "folder", _run_rename, "M1_/Ambient_等前缀移到P1_后面")
+
+
+# ========== 工作进程（常驻，工具实例在进程内复用） ==========
+_WORKER_TOOLS = {}
+
+
+def _worker_run(op_name, path):
+    """
+    在工作进程中处理一个文件
+    :return: (路径, 是否成功, 日志列表)
+    """
+    from headless import create_headless_tool
+    spec = get_spec(op_name)
+    tool = _WORKER_TOOLS.get(op_name)
+    if tool is None:
+        tool = create_headless_tool(spec.file_name, spec.class_name)
+        _WORKER_TOOLS[op_name] = tool
+    del tool.headless_logs[:]
+    try:
+        result = spec.runner(tool, path)
+        ok = result not in (False, "fail")
+    except Exception as e:
+        tool.headless_logs.append(f"❌ {os.path.basename(path)}：{e}")
+        ok = False
+    return path, ok, list(tool.headless_logs)
+
+
+def _warm_worker():
+    """进程池初始化：预先导入python-docx，首个任务不再承担导入耗时"""
+    try:
+        import docx  # noqa: F401
+    except ImportError:
+        pass
+
+
+# ========== 共享服务 ==========
+class ToolServices:
+    """文件发现、日志、备份、进程池 —— 工具箱内所有操作共享一份"""
+    def __init__(self, log=print, max_workers=None, progress=None, schedule="lpt"):
+        """
+        :param progress: 进度回调 progress(操作名, 已完成数, 总数)（可选）
+        :param schedule: 并行分发顺序，"lpt"=估算成本大的先分发（见 scheduler.py），"fifo"=按文件顺序
+        """
+        self.log = log
+        self.progress = progress
+        self.schedule = schedule
+        # 本会话生成的输出文件（合并结果等），按生成顺序记录
+        self.artifacts = []
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._discovery = {}
+        self._pool = None
+        self._journal = None
+        self._tools = {}
+
+    # ----- 文件发现（按文件夹修改时间缓存） -----
+    def discover(self, folder, extensions=(".docx",)):
+        """列出文件夹内指定类型文件（排除~$临时文件），文件夹未变化时直接返回缓存"""
+        key = (os.path.abspath(folder), tuple(extensions))
+        mtime = os.stat(folder).st_mtime_ns
+        cached = self._discovery.get(key)
+        if cached and cached[0] == mtime:
+            return list(cached[1])
+        files = sorted(
+            os.path.join(folder, f) for f in os.listdir(folder)
+            if f.lower().endswith(tuple(extensions)) and not f.startswith("~$")
+            and os.path.isfile(os.path.join(folder, f))
+        )
+        self._discovery[key] = (mtime, files)
+        return list(files)
+
+    def invalidate(self, folder=None):
+        """文件夹内容被操作改变后清除发现缓存"""
+        if folder is None:
+            self._discovery.clear()
+            return
+        folder = os.path.abspath(folder)
+        for key in [k for k in self._discovery if k[0] == folder]:
+            del self._discovery[key]
+
+    # ----- 备份（持久化回滚日志，见 restore_journal.py） -----
+    def begin_backup(self, tool, folder, files):
+        """执行前把文件备份到回滚日志，返回本次运行；执行后调用 end_backup 记录修改结果"""
+        from restore_journal import RestoreJournal
+        if self._journal is None:
+            self._journal = RestoreJournal()
+        run = self._journal.begin(tool, folder)
+        for path in files:
+            run.backup(path)
+        return run
+
+    def end_backup(self, run):
+        """记录每个文件修改后的哈希并结束本次运行"""
+        for path in list(run.files):
+            run.commit(path)
+        run.end()
+        self.log(f"📒 已记录 {len(run.changed_files)} 个文件的修改，回滚：python restore_journal.py rollback {run.id}")
+
+    def output_path(self, folder, prefix, ext):
+        """在文件夹旁生成带时间戳的输出路径"""
+        stamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        path = os.path.join(os.path.dirname(os.path.abspath(folder)), f"{prefix}_{stamp}{ext}")
+        self.artifacts.append(path)
+        return path
+
+    # ----- 进程池 -----
+    @property
+    def pool(self):
+        """首次使用时创建，之后一直复用（工作进程内的工具实例也一直保留）"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    # ----- 操作执行 -----
+    def local_tool(self, spec):
+        """主进程内的无界面工具实例（folder类操作用），加载一次后复用"""
+        from headless import create_headless_tool
+        tool = self._tools.get(spec.name)
+        if tool is None:
+            # 通过lambda转发，self.log 被替换（如按任务切换日志）后工具日志跟着走
+            tool = create_headless_tool(spec.file_name, spec.class_name, log=lambda message: self.log(message))
+            self._tools[spec.name] = tool
+        return tool
+
+    def run_operation(self, op_name, folder, parallel=True):
+        """
+        在文件夹上执行一个操作
+        :return: (成功数, 失败数)
+        """
+        spec = get_spec(op_name)
+        self.log(f"▶ 执行操作：{spec.name}")
+        if spec.kind == "folder":
+            spec.runner(self.local_tool(spec), folder, self)
+            if self.progress:
+                self.progress(spec.name, 1, 1)
+            return 1, 0
+
+        files = self.discover(folder)
+        success = fail = 0
+        if parallel and len(files) > 1:
+            # 大文件先分发，结果仍按文件顺序取出（日志顺序与串行一致）
+            order = lpt_order(files) if self.schedule == "lpt" else range(len(files))
+            futures = {i: self.pool.submit(_worker_run, op_name, files[i]) for i in order}
+            results = (futures[i].result() for i in range(len(files)))
+        else:
+            results = (_worker_run(op_name, path) for path in files)
+        for path, ok, logs in results:
+            for line in logs:
+                self.log(f"  {line}")
+            if ok:
+                success += 1
+            else:
+                fail += 1
+            if self.progress:
+                self.progress(spec.name, success + fail, len(files))
+        self.log(f"  ✅ {spec.name}：成功 {success} 个 | 失败 {fail} 个")
+        return success, fail
+
+    def run_queue(self, op_names, folder, parallel=True):
+        """按顺序执行多个操作（同一文件的多个操作严格按队列顺序进行）"""
+        summary = []
+        for op_name in op_names:
+            summary.append((op_name,) + self.run_operation(op_name, folder, parallel))
+            if get_spec(op_name).kind == "folder":
+                self.invalidate(folder)
+        return summary
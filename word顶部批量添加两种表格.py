@@ -28,13 +28,14 @@ Python 3.8.7 + python-docx 0.8.11 完全兼容版
 import os
 import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from docx import Document
-from docx.enum.table import WD_TABLE_ALIGNMENT, WD_CELL_VERTICAL_ALIGNMENT
-from docx.shared import Pt, Inches
-from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
-from docx.oxml.shared import OxmlElement, qn
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+from rule_config import RuleFile, rule_path
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+insert_table, at_index, BlankLines, HEADER_STYLE = lazy_from(
+    "table_insert", "insert_table", "at_index", "BlankLines", "HEADER_STYLE")
 
 class DocxBatchTableTool:
     def __init__(self, root):
@@ -44,22 +45,11 @@ class DocxBatchTableTool:
         
         # 核心配置项
         self.blank_lines_after_table = 2  # 表格后保留的空白行数
-        # 按关键词区分的表格内容
-        self.table_content = {
-            "ME_H": {
-                "row1_col1": "试验供电电源：380V AC/50Hz",
-                "row1_col2": "试验频率范围：150kHz-30MHz",
-                "row2_merged": "样品运行模式：1"
-            },
-            "RE_H": {
-                "row1_col1": "试验供电电源：380V AC/50Hz",
-                "row1_col2": "试验频率范围：30MHz-1GHz",
-                "row2_merged": "样品运行模式：1"
-            }
-        }
         
         self.folder_path = tk.StringVar()
         self._build_gui()
+        # 按关键词区分的表格内容在规则文件中，修改后无需重启
+        self.rules = RuleFile(rule_path("word顶部批量添加两种表格.json"), log=self._log)
 
     def _build_gui(self):
         """构建GUI界面"""
@@ -89,8 +79,8 @@ class DocxBatchTableTool:
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志：", font=("SimHei", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(
-            frame3, height=30, font=("Consolas", 9), wrap=tk.WORD
+        self.log_text = LogView(
+            frame3, "word顶部批量添加两种表格", height=30, font=("Consolas", 9), wrap=tk.WORD
         )
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
@@ -103,125 +93,22 @@ class DocxBatchTableTool:
 
     def _log(self, msg):
         """日志输出（自动滚动）"""
-        self.log_text.insert(tk.END, f"{msg}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(msg)
         self.root.update_idletasks()
 
     def _check_filename_keyword(self, file_path):
-        """仅检测文件名是否包含ME_H/RE_H（大小写不敏感）"""
-        file_name = os.path.basename(file_path).lower()
-        if "me_h" in file_name:
-            return "ME_H"
-        if "re_h" in file_name:
-            return "RE_H"
-        return None
+        """检测文件名是否包含规则中的关键词（默认ME_H/RE_H，大小写不敏感），返回匹配的规则"""
+        return self.rules.current().match(file_path)
 
-    def _set_cell_border(self, cell):
-        """手动为单元格添加黑色边框（不依赖预设样式）"""
+    def _create_spec_table_at_second_line(self, doc, rule):
+        """在文档第二行创建指定格式的表格（按规格一次建好并插入，见 table_insert.py）"""
         try:
-            tcPr = cell._tc.get_or_add_tcPr()
-            
-            # 边框样式：黑色、0.5磅实线（兼容所有Word版本）
-            border_style = {
-                "val": "single",
-                "sz": "4",       # 0.5磅（1pt=8sz）
-                "color": "000000",  # 黑色
-                "space": "0"
-            }
-            
-            # 为单元格的四个方向添加边框
-            for border_name in ["top", "bottom", "left", "right"]:
-                border = OxmlElement(f"w:{border_name}")
-                for key, value in border_style.items():
-                    border.set(qn(f"w:{key}"), value)
-                tcPr.append(border)
-            
-            # 单元格文字垂直居中
-            cell.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
-        except Exception as e:
-            self._log(f"  ⚠️  单元格边框设置失败：{str(e)}")
-
-    def _apply_table_borders(self, table):
-        """为整个表格的所有单元格添加边框"""
-        try:
-            for row in table.rows:
-                for cell in row.cells:
-                    self._set_cell_border(cell)
-            self._log("  ✅ 表格边框已手动添加（黑色0.5磅实线）")
-        except Exception as e:
-            self._log(f"  ⚠️  表格边框设置失败：{str(e)}")
-
-    def _create_spec_table_at_second_line(self, doc, keyword):
-        """在文档第二行创建指定格式的表格"""
-        try:
-            # 1. 确保文档至少有1个段落（为第二行预留位置）
-            if len(doc.paragraphs) == 0:
-                doc.add_paragraph("")  # 插入第一行空段落占位
+            if len(doc.element.body) <= 1:
                 self._log("  ⚠️  文档为空，先插入第一行空段落占位")
-            
-            # 2. 先创建表格（临时位置）
-            table = doc.add_table(rows=2, cols=2)
-            table.alignment = WD_TABLE_ALIGNMENT.LEFT  # 表格左对齐
-            
-            # 设置表格列宽（优化显示效果）
-            for row in table.rows:
-                row.cells[0].width = Inches(3.0)
-                row.cells[1].width = Inches(3.0)
-            
-            # 3. 合并第二行的两个单元格
-            row2_cells = table.rows[1].cells
-            row2_cells[0].merge(row2_cells[1])
-            
-            # 4. 手动添加表格边框
-            self._apply_table_borders(table)
-            
-            # 5. 填充表格内容
-            content = self.table_content[keyword]
-            # 第一行第一列
-            cell1_1 = table.cell(0, 0)
-            cell1_1.text = content["row1_col1"]
-            # 第一行第二列
-            cell1_2 = table.cell(0, 1)
-            cell1_2.text = content["row1_col2"]
-            # 第二行（合并后）
-            cell2 = table.cell(1, 0)  # 合并后仅需操作第一个单元格
-            cell2.text = content["row2_merged"]
-            
-            # 统一设置表格文字样式（宋体10号）
-            for row in table.rows:
-                for cell in row.cells:
-                    for para in cell.paragraphs:
-                        for run in para.runs:
-                            run.font.name = "宋体"
-                            run.font.size = Pt(10)
-            
-            # 6. 核心：将表格移动到文档第二行的位置
-            table_elem = table._element
-            # 移除表格从临时位置
-            table_elem.getparent().remove(table_elem)
-            
-            # 获取文档的body元素
-            body = doc._body._element
-            # 获取第二个段落的位置（第二行），插入表格
-            if len(body) >= 2:
-                # 插入到第二个元素之前（第二行）
-                body.insert(1, table_elem)
-            else:
-                # 若文档只有1个段落，插入到第一个段落之后（第二行）
-                body.insert(1, table_elem)
-            self._log("  ✅ 表格已移动到文档第二行")
-            
-            # 7. 在表格后插入指定数量的空白段落（强制保留2行空白）
-            # 先定位表格后的位置，插入空白段落
-            blank_para1 = doc.add_paragraph("")
-            blank_para2 = doc.add_paragraph("")
-            # 将空白段落移动到表格之后
-            for blank_para in [blank_para1, blank_para2]:
-                para_elem = blank_para._p
-                para_elem.getparent().remove(para_elem)
-                body.insert(body.index(table_elem) + 1, para_elem)
-            self._log("  ✅ 表格后已添加2行空白内容")
-            
+            insert_table(doc, at_index(1), rule.table, HEADER_STYLE,
+                         BlankLines(after=self.blank_lines_after_table))
+            self._log("  ✅ 表格已插入文档第二行（黑色0.5磅边框）")
+            self._log(f"  ✅ 表格后已添加{self.blank_lines_after_table}行空白内容")
             return True
         except Exception as e:
             self._log(f"  ❌ 表格创建失败：{str(e)}")
@@ -241,16 +128,16 @@ class DocxBatchTableTool:
             self._log(f"  📁 已备份原文件：{file_name}.bak")
             
             # 2. 检测文件名关键词
-            keyword = self._check_filename_keyword(file_path)
-            if not keyword:
-                self._log(f"  ⚠️  文件名不含ME_H/RE_H，跳过处理")
+            rule = self._check_filename_keyword(file_path)
+            if not rule:
+                self._log(f"  ⚠️  文件名不含{'/'.join(self.rules.current().keywords)}，跳过处理")
                 return "skip"
             
-            self._log(f"  🔍 检测到文件名关键词：{keyword}")
+            self._log(f"  🔍 检测到文件名关键词：{rule.keyword}")
             
             # 3. 打开文档并在第二行创建表格
             doc = Document(file_path)
-            create_success = self._create_spec_table_at_second_line(doc, keyword)
+            create_success = self._create_spec_table_at_second_line(doc, rule)
             
             # 4. 保存修改后的文档
             doc.save(file_path)
@@ -276,7 +163,7 @@ class DocxBatchTableTool:
             return
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_text.clear()
         self._log("🚀 开始批量处理docx文件（第二行插入表格）...")
         self._log(f"📂 目标文件夹：{folder}")
         
@@ -297,7 +184,10 @@ class DocxBatchTableTool:
         success_count = 0
         fail_count = 0
         skip_count = 0
+        # 修改前把每个文件写入回滚日志（.bak 照旧保留）
+        run = RestoreJournal().begin("word顶部批量添加两种表格", folder)
         for file_path in docx_files:
+            run.backup(file_path)
             result = self._process_single_file(file_path)
             if result == "success":
                 success_count += 1
@@ -305,6 +195,9 @@ class DocxBatchTableTool:
                 fail_count += 1
             elif result == "skip":
                 skip_count += 1
+            run.commit(file_path)
+        run.end()
+        self._log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成统计提示
         result_msg = (
@@ -322,4 +215,6 @@ if __name__ == "__main__":
     root.option_add("*Font", "SimHei 9")
     # 启动主程序
     app = DocxBatchTableTool(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
@@ -1,13 +1,25 @@
 import os
 import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from docx import Document
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.shared import Inches, Pt
-from docx.oxml.shared import OxmlElement, qn
-from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+from rule_config import TableSpec
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+insert_table, at_index, BlankLines, PLAIN_STYLE = lazy_from(
+    "table_insert", "insert_table", "at_index", "BlankLines", "PLAIN_STYLE")
+DocCatalog, format_refresh, text_tokens = lazy_from("doc_catalog", "DocCatalog", "format_refresh", "text_tokens")
+
+
+def _condition_table(frequency_range):
+    """试验条件表格：2行2列（第二行第二列留空），每列2.5英寸"""
+    return TableSpec(rows=(("试验供电电源：380V AC/50Hz", f"试验频率范围：{frequency_range}"), ("样品运行模式：1", "")),
+                     cols=2, merges=(), col_widths_in=(2.5, 2.5))
+
+
+# 关键词 → 表格内容
+TABLE_SPECS = {"ME": _condition_table("150kHz-30MHz"), "RE": _condition_table("30MHz-1GHz")}
 
 class DocxTableAdder:
     def __init__(self, root):
@@ -17,6 +29,8 @@ class DocxTableAdder:
         
         # 选择文件夹相关
         self.folder_path = tk.StringVar()
+        # 共享文档目录（首次用到时打开），关键词检测直接查目录，文件未变化时不再打开Word
+        self.catalog = None
         
         # 创建GUI组件
         self._create_widgets()
@@ -35,7 +49,7 @@ class DocxTableAdder:
         frame_info.pack(fill=tk.X)
         
         tk.Label(frame_info, text="功能说明：", bg="#f0f0f0", font=("Arial", 9, "bold")).pack(anchor=tk.W)
-        info_text = "• 包含\"ME\"的文件：插入频率范围150kHz-30MHz的表格\n• 包含\"RE\"的文件：插入频率范围30MHz-1GHz的表格\n• 不包含关键词的文件：跳过处理"
+        info_text = "• 包含单词\"ME\"的文件：插入频率范围150kHz-30MHz的表格\n• 包含单词\"RE\"的文件：插入频率范围30MHz-1GHz的表格\n• 不包含关键词的文件：跳过处理（按整词匹配，MEASUREMENT等不算）"
         tk.Label(frame_info, text=info_text, bg="#f0f0f0", font=("Arial", 9), justify=tk.LEFT).pack(anchor=tk.W)
         
         # 操作按钮区域
@@ -50,7 +64,7 @@ class DocxTableAdder:
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志:").pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame3, height=20)
+        self.log_text = LogView(frame3, "word顶部按照条件添加表格", height=20)
         self.log_text.pack(fill=tk.BOTH, expand=True)
     
     def _select_folder(self):
@@ -62,13 +76,12 @@ class DocxTableAdder:
     
     def _log(self, message):
         """添加日志信息"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(message)
         self.root.update_idletasks()
     
     def _clear_log(self):
         """清空日志"""
-        self.log_text.delete(1.0, tk.END)
+        self.log_text.clear()
     
     def _extract_doc_text(self, doc):
         """
@@ -87,18 +100,32 @@ class DocxTableAdder:
                     full_text.append(cell.text)
         return " ".join(full_text)
     
+    def _get_catalog(self):
+        if self.catalog is None:
+            self.catalog = DocCatalog(log=self._log)
+        return self.catalog
+
+    # 分流规则：按顺序先命中的生效（整词匹配，不区分大小写）
+    ROUTING_RULES = [("ME", "ME"), ("RE", "RE")]
+
     def _detect_keyword(self, file_path):
         """
-        检测文档中是否包含ME或RE关键词
+        检测文档中是否包含ME或RE关键词（整词）
         :param file_path: 文件路径
         :return: "ME" / "RE" / None
         """
+        try:
+            facts = self._get_catalog().lookup(file_path)
+            if not facts["error"]:
+                return facts["text_keyword"]
+        except Exception as e:
+            self._log(f"查询文档目录出错，改为直接读取文件: {str(e)}")
         try:
             doc = Document(file_path)
-            text = self._extract_doc_text(doc).upper()  # 转为大写，不区分大小写
-            if "ME" in text:
+            tokens = text_tokens(self._extract_doc_text(doc))  # 大写单词集合，不区分大小写
+            if "ME" in tokens:
                 return "ME"
-            elif "RE" in text:
+            elif "RE" in tokens:
                 return "RE"
             else:
                 return None
@@ -106,88 +133,20 @@ class DocxTableAdder:
             self._log(f"检测文件 {file_path} 关键词出错: {str(e)}")
             return None
     
-    def _set_cell_border(self, cell, border_color="000000", border_width=1):
-        """
-        为表格单元格设置边框（不依赖样式，兼容性100%）
-        :param cell: 单元格对象
-        :param border_color: 边框颜色（16进制）
-        :param border_width: 边框宽度（点数）
-        """
-        # 创建边框元素
-        tc_pr = cell._tc.get_or_add_tcPr()
-        tc_borders = parse_xml(r'<w:tcBorders %s>'
-                               r'<w:top w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'<w:left w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'<w:bottom w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'<w:right w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'</w:tcBorders>' % (nsdecls('w'),
-                                                     border_color, border_width*8,
-                                                     border_color, border_width*8,
-                                                     border_color, border_width*8,
-                                                     border_color, border_width*8))
-        # 添加边框到单元格
-        tc_pr.append(tc_borders)
-    
     def _add_table_to_docx(self, file_path, keyword_type):
         """
         根据关键词类型给单个docx文件添加对应表格（完整保留所有内容，包括图片）
+        表格连同后面的两行空行一次插入到文档最开头（见 table_insert.py）
         :param file_path: 文件路径
         :param keyword_type: "ME" / "RE"
         :return: 处理结果 True/False
         """
         try:
-            # 打开文档（保留所有原始内容）
-            doc = Document(file_path)
-            
-            # ========== 根据关键词选择表格内容 ==========
-            if keyword_type == "ME":
-                frequency_range = "150kHz-30MHz"
-            elif keyword_type == "RE":
-                frequency_range = "30MHz-1GHz"
-            else:
+            spec = TABLE_SPECS.get(keyword_type)
+            if spec is None:
                 return False
-            
-            # ========== 在文档开头插入表格 ==========
-            # 步骤1: 在文档最开头插入一个空段落作为占位
-            body = doc.element.body
-            new_para = parse_xml(r'<w:p %s></w:p>' % nsdecls('w'))
-            body.insert(0, new_para)
-            
-            # 步骤2: 创建2行2列的表格
-            table = doc.add_table(rows=2, cols=2)
-            table.alignment = WD_TABLE_ALIGNMENT.LEFT
-            
-            # 设置表格内容
-            table.cell(0, 0).text = "试验供电电源：380V AC/50Hz"
-            table.cell(0, 1).text = f"试验频率范围：{frequency_range}"
-            table.cell(1, 0).text = "样品运行模式：1"
-            table.cell(1, 1).text = ""  # 第二行第二列留空
-            
-            # 为表格添加边框
-            for row in table.rows:
-                for cell in row.cells:
-                    self._set_cell_border(cell)
-                    # 设置单元格宽度和字体
-                    cell.width = Inches(2.5)
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.size = Pt(10)
-            
-            # 步骤3: 将表格移动到文档最开头
-            table_elem = table._element
-            table_elem.getparent().remove(table_elem)
-            body.insert(1, table_elem)
-            
-            # 步骤4: 在表格后添加两行空行
-            empty_para1 = parse_xml(r'<w:p %s><w:r><w:t></w:t></w:r></w:p>' % nsdecls('w'))
-            empty_para2 = parse_xml(r'<w:p %s><w:r><w:t></w:t></w:r></w:p>' % nsdecls('w'))
-            body.insert(2, empty_para1)
-            body.insert(3, empty_para2)
-            
-            # 删除临时空段落
-            body.remove(new_para)
-            
-            # 保存修改后的文档
+            doc = Document(file_path)
+            insert_table(doc, at_index(0), spec, PLAIN_STYLE, BlankLines(after=2))
             doc.save(file_path)
             return True
             
@@ -211,19 +170,30 @@ class DocxTableAdder:
             return
         
         self._log(f"找到 {len(docx_files)} 个docx文件，开始处理...")
+        # 先增量刷新目录和全文索引（只扫描新增/修改的文件），再用索引一次查出全部文件的分流结果
+        routes = {}
+        try:
+            catalog = self._get_catalog()
+            self._log(format_refresh(catalog.refresh(folder)))
+            routes = catalog.route(folder, self.ROUTING_RULES)
+        except Exception as e:
+            self._log(f"刷新文档目录失败，逐个读取文件检测关键词: {str(e)}")
         
         # 统计变量
         me_count = 0       # ME文件处理数
         re_count = 0       # RE文件处理数
         skip_count = 0     # 跳过文件数
         fail_count = 0     # 失败文件数
+        # 修改前把每个文件写入回滚日志（.bak 照旧保留）
+        run = RestoreJournal().begin("word顶部按照条件添加表格", folder)
         
         for filename in docx_files:
             file_path = os.path.join(folder, filename)
             self._log(f"\n正在处理: {filename}")
             
             # 第一步：检测关键词
-            keyword = self._detect_keyword(file_path)
+            full_path = os.path.abspath(file_path)
+            keyword = routes[full_path] if full_path in routes else self._detect_keyword(file_path)
             if keyword is None:
                 self._log(f"文件 {filename} 未检测到ME/RE关键词，跳过处理")
                 skip_count += 1
@@ -232,6 +202,7 @@ class DocxTableAdder:
             # 第二步：创建备份文件
             backup_path = file_path + ".bak"
             try:
+                run.backup(file_path)
                 shutil.copy2(file_path, backup_path)
                 self._log(f"已创建备份: {backup_path}")
             except Exception as e:
@@ -254,6 +225,9 @@ class DocxTableAdder:
                 except:
                     pass
                 fail_count += 1
+            run.commit(file_path)
+        run.end()
+        self._log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成统计
         total_process = me_count + re_count
@@ -274,9 +248,9 @@ class DocxTableAdder:
 
 if __name__ == "__main__":
     # 安装依赖提示（首次运行需要）
-    try:
-        from docx import Document
-    except ImportError:
+    # 只检查是否已安装，不在启动时导入python-docx
+    import importlib.util
+    if importlib.util.find_spec("docx") is None:
         root = tk.Tk()
         root.withdraw()
         messagebox.showinfo("提示", "请先安装依赖库：\npip install python-docx")
@@ -285,4 +259,6 @@ if __name__ == "__main__":
     # 启动GUI
     root = tk.Tk()
     app = DocxTableAdder(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
@@ -11,13 +11,14 @@
 交换表格第3列和第4列的内容；
 '''
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
-import shutil
-import tempfile
-from docx import Document
-from docx.oxml import parse_xml
-from docx.oxml.ns import qn
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+parse_xml = lazy_from("docx.oxml", "parse_xml")
+qn = lazy_from("docx.oxml.ns", "qn")
 
 # 安装依赖（Python 3.8.7 执行）：
 # pip install python-docx==0.8.11
@@ -34,6 +35,7 @@ class WordTableOptTool:
         # 全局变量
         self.current_file = ""
         self.backup_path = ""
+        self.journal_run = None  # 回滚日志中的本次运行
 
         # ========== 1. 文件选择区域 ==========
         frame_file = tk.Frame(root, padx=20, pady=15)
@@ -62,7 +64,7 @@ class WordTableOptTool:
         frame_log.pack(fill=tk.BOTH, expand=True, anchor=tk.N)
 
         tk.Label(frame_log, text="操作日志：", font=("微软雅黑", 11)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame_log, width=100, height=28, font=("Consolas", 9))
+        self.log_text = LogView(frame_log, "修改单个表格", width=100, height=28, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
         # 初始化日志
@@ -74,8 +76,7 @@ class WordTableOptTool:
         """带时间戳的日志打印，实时刷新"""
         import datetime
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()
 
     def choose_file(self):
@@ -211,9 +212,8 @@ class WordTableOptTool:
         # 1. 备份原文件（防止格式丢失）
         self.log("📦 开始备份原文件")
         try:
-            temp_dir = tempfile.mkdtemp(prefix="word_table_opt_backup_")
-            self.backup_path = os.path.join(temp_dir, os.path.basename(self.current_file))
-            shutil.copy2(self.current_file, self.backup_path)
+            self.journal_run = RestoreJournal().begin("修改单个表格", os.path.dirname(self.current_file))
+            self.backup_path = self.journal_run.backup(self.current_file)
             self.log(f"✅ 原文件已备份至：{self.backup_path}")
         except Exception as e:
             self.log(f"❌ 备份失败：{str(e)}")
@@ -233,6 +233,8 @@ class WordTableOptTool:
 
             # 3. 保存处理后的文档
             doc.save(self.current_file)
+            self.journal_run.commit(self.current_file)
+            self.journal_run.end()
             self.log("\n🎉 所有处理完成！100%保留原有格式（图片/表格/文字样式）")
 
             # 弹窗提示成功
@@ -247,19 +249,18 @@ class WordTableOptTool:
     # ========== 恢复原文件 ==========
     def restore_file(self):
         """恢复备份的原文件，确保格式无损"""
-        if not self.backup_path or not os.path.exists(self.backup_path):
+        if self.journal_run is None or not self.journal_run.files:
             messagebox.showinfo("提示", "暂无备份文件可恢复！")
             return
 
         try:
-            # 覆盖恢复原文件
-            shutil.copy2(self.backup_path, self.current_file)
+            # 用回滚日志中的备份覆盖恢复原文件
+            self.journal_run.end()
+            results = self.journal_run.rollback(force=True)
+            if any(status == "missing_backup" for _, status, _ in results):
+                raise FileNotFoundError("备份已被清理")
             self.log(f"✅ 原文件已恢复：{os.path.basename(self.current_file)}")
-            
-            # 清理临时备份目录
-            temp_dir = os.path.dirname(self.backup_path)
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
+            self.journal_run = None
             self.backup_path = ""
 
             messagebox.showinfo("恢复成功", "✅ 原文件已成功恢复，格式无损失！")
@@ -279,4 +280,6 @@ if __name__ == "__main__":
     # 启动GUI主窗口
     root = tk.Tk()
     app = WordTableOptTool(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()  # 核心：主事件循环，确保GUI显示
@@ -5,13 +5,16 @@
 
 '''
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
 import datetime
-from docx import Document
-from docxcompose.composer import Composer
-from docx.enum.section import WD_SECTION_START
-from docx.enum.text import WD_BREAK  # 关键：导入分页符枚举类
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+Document = lazy_from("docx", "Document")
+MergeComposer = lazy_from("merge_engine", "MergeComposer")
+filter_duplicates = lazy_from("input_dedup", "filter_duplicates")
+validate_inputs = lazy_from("docx_preflight", "validate_inputs")
+from mem_profile import MemoryProfiler, docx_structure_stats, profiling_requested
 
 # 安装依赖（执行以下命令）：
 # pip install python-docx python-docx-composer
@@ -21,7 +24,7 @@ class WordMergerGUI:
         # 主窗口配置
         self.root = root
         self.root.title("Word文档合并工具（每页独立保留源文档内容）")
-        self.root.geometry("700x400")
+        self.root.geometry("700x480")
         self.root.resizable(False, False)
         
         # ========== 1. 文件夹选择区域 ==========
@@ -61,6 +64,25 @@ class WordMergerGUI:
         frame3 = tk.Frame(root, padx=20, pady=20)
         frame3.pack(fill=tk.X)
         
+        # 内存分析模式（默认关闭，环境变量WORD_MEM_PROFILE=1时默认勾选）
+        self.mem_profile_var = tk.BooleanVar(value=profiling_requested())
+        tk.Checkbutton(
+            frame3, text="内存分析模式（每个文档采样内存，报告写在输出文件旁）",
+            variable=self.mem_profile_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 重复输入：字节相同或只有rsid/保存时间不同的副本（如批量改名留下的 _1 拷贝）
+        self.skip_duplicates_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame3, text="跳过重复文件（内容相同的副本只保留第一份；不勾选时只在日志中报告）",
+            variable=self.skip_duplicates_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 合并前文件检查：损坏/加密/不支持的文件排除后继续，或直接中止
+        self.exclude_bad_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame3, text="排除有问题的文件后继续（不勾选时发现损坏/加密/不支持的文件即中止合并）",
+            variable=self.exclude_bad_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        
         self.btn_merge = tk.Button(
             frame3, text="开始合并文档（每页独立）", command=self.merge_documents,
             font=("微软雅黑", 14, "bold"), bg="#32CD32", fg="white",
@@ -73,7 +95,7 @@ class WordMergerGUI:
         frame4.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame4, text="操作日志：", font=("微软雅黑", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame4, height=8, font=("Consolas", 9))
+        self.log_text = LogView(frame4, "合并Word独立页码", height=8, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
         # 初始化日志
@@ -83,8 +105,7 @@ class WordMergerGUI:
     def log(self, content):
         """添加带时间戳的日志"""
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()
 
     def select_folder(self):
@@ -107,9 +128,9 @@ class WordMergerGUI:
             self.output_var.set(file)
             self.log(f"💾 已选择输出路径：{file}")
 
-    # ========== 核心合并方法（修复分页符参数错误，每页独立保留源文档内容） ==========
+    # ========== 核心合并方法（每个源文档独立成节，页码从1开始） ==========
     def merge_documents(self):
-        """合并Word，每个源文档独立占一页（添加分页+分节符）"""
+        """合并Word，每个源文档独立成节：新页开始、页码从1开始、保留各自的页眉页脚"""
         try:
             # 1. 获取输入路径
             source_folder = self.folder_var.get().strip()
@@ -134,45 +155,73 @@ class WordMergerGUI:
                 messagebox.showwarning("警告", "所选文件夹内无有效的.docx文件！")
                 return
             
+            # 合并前检查（多进程，数秒内完成）：有问题的文件在合并开始前排除或中止，不会合并到一半才失败
+            docx_files, bad_files = validate_inputs(docx_files, log=self.log)
+            if bad_files and not self.exclude_bad_var.get():
+                messagebox.showerror("文件检查未通过", f"{len(bad_files)} 个文件有问题（详见日志），已取消合并")
+                return
+            if not docx_files:
+                messagebox.showwarning("警告", "没有可合并的文件（全部未通过检查）！")
+                return
+            
+            # 重复输入（多进程计算指纹）：勾选时跳过，否则只报告
+            policy = "skip" if self.skip_duplicates_var.get() else "report"
+            docx_files, _ = filter_duplicates(docx_files, policy, log=self.log)
+            
             self.log("="*50)
             self.log(f"🚀 开始合并 - 共 {len(docx_files)} 个文件（每页独立）")
             self.log("="*50)
             
-            # 4. 核心合并逻辑（添加分节符+分页符，确保每页独立）
-            # 以第一个文档为基础
-            master_doc = Document(docx_files[0])
-            composer = Composer(master_doc)
+            profiler = None
+            if self.mem_profile_var.get():
+                # 在打开第一个文档前开始，基础文档的内存也计入
+                profiler = MemoryProfiler(log=self.log)
+                profiler.start()
+                self.log("🧠 已开启内存分析模式")
             
-            # 逐个追加其他文档（每个文档前加分节符+分页符）
-            for idx, file_path in enumerate(docx_files[1:], 2):
-                self.log(f"📄 正在合并第 {idx} 个文件：{os.path.basename(file_path)}")
-                
-                # 打开当前文档
-                doc = Document(file_path)
+            try:
+                # 4. 核心合并逻辑（每个文档独立成节，追加时一次写好节属性和页眉页脚）
+                # 以第一个文档为基础
+                master_doc = Document(docx_files[0])
+                composer = MergeComposer(master_doc, section_per_document=True)
                 
-                # 关键：修复后的分页符插入方式（使用WD_BREAK.PAGE）
-                doc.paragraphs[0].insert_paragraph_before().add_run().add_break(WD_BREAK.PAGE)
+                # 逐个追加其他文档（每个文档一个新节：新页开始，页码从1开始）
+                for idx, file_path in enumerate(docx_files[1:], 2):
+                    self.log(f"📄 正在合并第 {idx} 个文件：{os.path.basename(file_path)}")
+                    
+                    # 打开当前文档
+                    doc = Document(file_path)
+                    
+                    # 追加文档（节属性 w:pgNumType w:start="1" 和页眉页脚引用在追加时一并写入）
+                    composer.append(doc)
+                    del doc
+                    if profiler:
+                        profiler.sample(
+                            os.path.basename(file_path),
+                            docx_structure_stats(master_doc, composer, profiler.want_element_count())
+                        )
                 
-                # 设置节的起始位置为新页（双重保障）
-                for section in doc.sections:
-                    section.start_type = WD_SECTION_START.NEW_PAGE
-                
-                # 追加文档（此时会自动从新页开始）
-                composer.append(doc)
-            
-            # 5. 保存合并后的文档
-            composer.save(output_path)
+                # 5. 保存合并后的文档
+                composer.save(output_path)
+            finally:
+                if profiler:
+                    profiler.stop()  # 合并出错时也要关闭 tracemalloc
+            self.log(composer.media_summary())
+            self.log(composer.style_summary())
+            if profiler:
+                report_path = profiler.write_report(output_path)
+                self.log(f"🧠 内存分析报告：{report_path}")
             
             # 6. 合并完成
             self.log("="*50)
-            self.log(f"🎉 合并成功！每个源文档独立占一页")
+            self.log(f"🎉 合并成功！每个源文档独立成节，页码从1开始")
             self.log(f"📁 输出文件：{output_path}")
             self.log("="*50)
             
             messagebox.showinfo("合并完成", 
                 f"✅ 文档合并成功！\n"
                 f"📄 共合并 {len(docx_files)} 个Word文件\n"
-                f"📄 每个源文档内容独立保留在一页\n"
+                f"📄 每个源文档独立成节，页码从1开始\n"
                 f"💾 输出路径：\n{output_path}")
         
         except Exception as e:
@@ -190,4 +239,6 @@ if __name__ == "__main__":
     # 启动主窗口
     root = tk.Tk()
     app = WordMergerGUI(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx", "merge_engine")
     root.mainloop()
@@ -1,12 +1,15 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
-import shutil
-import tempfile
-from docx import Document
-from docx.oxml import parse_xml
-from docx.oxml.ns import qn
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+parse_xml = lazy_from("docx.oxml", "parse_xml")
+qn = lazy_from("docx.oxml.ns", "qn")
+WD_PARAGRAPH_ALIGNMENT = lazy_from("docx.enum.text", "WD_PARAGRAPH_ALIGNMENT")
+caption_for_name, caption_file, caption_files = lazy_from(
+    "image_caption", "caption_for_name", "caption_file", "caption_files")
 
 # 适配 Python 3.8.7 依赖（执行前安装）：
 # pip install python-docx==0.8.11
@@ -16,13 +19,15 @@ class WordImageTableTool:
         # 主窗口配置
         self.root = root
         self.root.title("Word图片表格调整工具（居中添加文字+保空行）")
-        self.root.geometry("800x520")
+        self.root.geometry("800x565")
         self.root.resizable(False, False)
 
-        # 备份/文件变量
-        self.tmp_dir = None
+        # 备份/文件变量（备份写入回滚日志，关闭程序后仍可在工具箱「修改记录/回滚」中恢复）
+        self.journal_run = None
         self.backup_path = ""
         self.current_file = ""
+        # 批量模式的运行记录（按执行顺序）
+        self.batch_runs = []
 
         # ========== GUI 界面布局 ==========
         # 1. 文件选择区域
@@ -37,17 +42,28 @@ class WordImageTableTool:
                               font=("微软雅黑", 9), width=10, bg="#409EFF", fg="white")
         btn_file.grid(row=0, column=2)
 
+        tk.Label(frame_file, text="批量处理文件夹：", font=("微软雅黑", 10)).grid(row=1, column=0, sticky=tk.W, pady=(8, 0))
+        self.folder_var = tk.StringVar()
+        tk.Entry(frame_file, textvariable=self.folder_var, width=55, font=("微软雅黑", 9)).grid(row=1, column=1, padx=8, pady=(8, 0))
+        tk.Button(frame_file, text="选择文件夹", command=self.choose_folder,
+                  font=("微软雅黑", 9), width=10, bg="#409EFF", fg="white").grid(row=1, column=2, pady=(8, 0))
+
         # 2. 功能按钮区域
         frame_btn = tk.Frame(root, padx=15, pady=10)
         frame_btn.pack(fill=tk.X)
 
         self.btn_process = tk.Button(frame_btn, text="执行调整：添加文字+保留空行", 
                                     command=self.process_word, font=("微软雅黑", 11, "bold"),
-                                    width=35, height=2, bg="#67C23A", fg="white")
+                                    width=26, height=2, bg="#67C23A", fg="white")
         self.btn_process.pack(side=tk.LEFT, padx=5)
 
+        self.btn_batch = tk.Button(frame_btn, text="批量：全部图片下方添加极化说明",
+                                   command=self.batch_caption, font=("微软雅黑", 10),
+                                   width=28, height=2, bg="#E6A23C", fg="white")
+        self.btn_batch.pack(side=tk.LEFT, padx=5)
+
         self.btn_restore = tk.Button(frame_btn, text="恢复原文件", command=self.restore_original,
-                                    font=("微软雅黑", 10), width=18, height=2, bg="#F56C6C", fg="white")
+                                    font=("微软雅黑", 10), width=12, height=2, bg="#F56C6C", fg="white")
         self.btn_restore.pack(side=tk.LEFT, padx=5)
 
         # 3. 日志显示区域
@@ -55,20 +71,20 @@ class WordImageTableTool:
         frame_log.pack(fill=tk.BOTH, expand=True)
 
         tk.Label(frame_log, text="操作日志：", font=("微软雅黑", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame_log, height=15, font=("Consolas", 9))
+        self.log_text = LogView(frame_log, "图片正下方添加文字", height=15, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
         # 初始化日志
         self.log("✅ Python 3.8.7 环境适配完成，工具就绪")
-        self.log("💡 操作流程：选择Word文件 → 点击执行调整 → 完成后可恢复原文件\n")
+        self.log("💡 操作流程：选择Word文件 → 点击执行调整 → 完成后可恢复原文件")
+        self.log("💡 批量模式：选择文件夹 → 每个图片正下方按文件名H/V添加「水平极化」/「垂直极化」\n")
 
     # ========== 基础辅助方法 ==========
     def log(self, content):
         """带时间戳的日志"""
         import datetime
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()
 
     def choose_file(self):
@@ -82,6 +98,13 @@ class WordImageTableTool:
             self.current_file = file_path
             self.log(f"📂 已选择文件：{os.path.basename(file_path)}")
 
+    def choose_folder(self):
+        """选择批量处理的文件夹"""
+        folder = filedialog.askdirectory(title="选择包含Word文档的文件夹")
+        if folder:
+            self.folder_var.set(folder)
+            self.log(f"📂 已选择文件夹：{folder}")
+
     def create_empty_paragraph(self):
         """创建空段落（空行），保留默认格式"""
         empty_para_xml = """
@@ -248,10 +271,8 @@ class WordImageTableTool:
 
         # 1. 备份原文件
         self.log("📦 开始备份原文件")
-        if self.tmp_dir is None:
-            self.tmp_dir = tempfile.mkdtemp(prefix="word_backup_387_")
-        self.backup_path = os.path.join(self.tmp_dir, os.path.basename(self.current_file))
-        shutil.copy2(self.current_file, self.backup_path)
+        self.journal_run = RestoreJournal().begin("图片正下方添加文字", os.path.dirname(self.current_file))
+        self.backup_path = self.journal_run.backup(self.current_file)
         self.log(f"✅ 原文件已备份至：{self.backup_path}")
 
         # 2. 处理文档
@@ -265,6 +286,8 @@ class WordImageTableTool:
             if adjust_success:
                 # 保存处理后的文档
                 doc.save(self.current_file)
+                self.journal_run.commit(self.current_file)
+                self.journal_run.end()
                 self.log(f"\n🎉 文档调整完成！")
                 messagebox.showinfo("成功", 
                     f"✅ Word文件调整完成！\n📄 已执行：\n  1. 删除图片上方所有文字/表格\n  2. 将图片下方表格移动到图片上方\n  3. 表格/图片上下各保留2个空行\n  4. 图片正下方居中添加：水平极化\n✅ 所有格式100%保留")
@@ -278,21 +301,65 @@ class WordImageTableTool:
             messagebox.showerror("错误", f"文件处理失败：{str(e)}")
             self.restore_original()
 
+    # ========== 批量模式：全部图片添加极化说明 ==========
+    def caption_all_images(self, file_path):
+        """单个文件：每个图片正下方添加极化说明（工具箱逐文件调用）"""
+        path, ok, added, message = caption_file(file_path)
+        self.log(f"{'✅' if ok else '⚠️ '} {os.path.basename(path)}：{message}")
+        return ok
+
+    def batch_caption(self):
+        """文件夹内全部docx：每个图片正下方添加极化说明（多进程并行）"""
+        folder = self.folder_var.get()
+        if not folder or not os.path.isdir(folder):
+            messagebox.showerror("错误", "请选择有效的文件夹！")
+            return
+        files = sorted(
+            os.path.join(folder, f) for f in os.listdir(folder)
+            if f.lower().endswith(".docx") and not f.startswith("~$")
+        )
+        if not files:
+            messagebox.showinfo("提示", "文件夹中未找到docx文件！")
+            return
+
+        run = RestoreJournal().begin("图片正下方添加文字（批量）", folder)
+        for path in files:
+            if caption_for_name(path):
+                run.backup(path)
+        self.log(f"\n🚀 批量处理 {len(files)} 个文件（运行记录：{run.id}）")
+        success = fail = images = 0
+        for path, ok, added, message in caption_files(files):
+            self.log(f"  {'✅' if ok else '⚠️ '} {os.path.basename(path)}：{message}")
+            run.commit(path)
+            images += added
+            if ok:
+                success += 1
+            else:
+                fail += 1
+        result = f"批量处理完成：成功 {success} 个 | 跳过/失败 {fail} 个 | 共添加 {images} 处说明"
+        run.end()
+        self.batch_runs.append(run)
+        self.log(f"🎉 {result}")
+        self.log(f"📒 回滚命令：python restore_journal.py rollback {run.id}")
+        messagebox.showinfo("完成", result)
+
     # ========== 恢复原文件 ==========
     def restore_original(self):
         """恢复备份的原文件"""
-        if not self.backup_path or not os.path.exists(self.backup_path):
+        if self.batch_runs:
+            self.restore_batch()
+            return
+        if self.journal_run is None or not self.journal_run.files:
             messagebox.showinfo("提示", "暂无需要恢复的原文件！")
             return
 
         try:
-            # 覆盖恢复
-            shutil.copy2(self.backup_path, self.current_file)
-            
-            # 清理临时目录
-            if self.tmp_dir and os.path.exists(self.tmp_dir):
-                shutil.rmtree(self.tmp_dir, ignore_errors=True)
-            self.tmp_dir = None
+            # 用回滚日志中的备份覆盖恢复
+            self.journal_run.end()
+            results = self.journal_run.rollback(force=True)
+            if any(status == "missing_backup" for _, status, _ in results):
+                raise FileNotFoundError("备份已被清理")
+            self.journal_run = None
             self.backup_path = ""
 
             self.log(f"✅ 已恢复原文件：{os.path.basename(self.current_file)}")
@@ -302,6 +369,19 @@ class WordImageTableTool:
             self.log(f"❌ 恢复失败：{str(e)}")
             messagebox.showerror("错误", f"恢复原文件失败：{str(e)}")
 
+    def restore_batch(self):
+        """恢复批量模式修改过的全部文件（后执行的先回滚，多次批量处理后回到最初内容）"""
+        restored = 0
+        while self.batch_runs:
+            run = self.batch_runs.pop()
+            for path, status, message in run.rollback(run.changed_files, force=True):
+                if status == "restored":
+                    restored += 1
+                elif status != "unchanged":
+                    self.log(f"❌ 恢复失败 {os.path.basename(path)}：{message}")
+        self.log(f"✅ 已恢复批量处理的 {restored} 个文件")
+        messagebox.showinfo("恢复完成", f"✅ 已恢复 {restored} 个文件！")
+
 # ========== 程序入口 ==========
 if __name__ == "__main__":
     # 适配Windows高分屏
@@ -314,11 +394,6 @@ if __name__ == "__main__":
     # 启动GUI
     root = tk.Tk()
     app = WordImageTableTool(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
-
-    # 清理临时文件
-    try:
-        if app.tmp_dir and os.path.exists(app.tmp_dir):
-            shutil.rmtree(app.tmp_dir, ignore_errors=True)
-    except:
-        pass
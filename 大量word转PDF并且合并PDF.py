@@ -1,23 +1,28 @@
 #用Python 3.8.7实现把一个文件夹里面的多个word转为PDF格式，并且把转化的PDF进行合并，并且生成一个GUI界面进行操作。
 #路径不能有括号
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
 import sys
+import shutil
 import datetime
-import win32com.client
-from PyPDF2 import PdfMerger
-import pythoncom
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+PdfMerger = lazy_from("PyPDF2", "PdfMerger")
+ConverterPool = lazy_from("converter_worker", "ConverterPool")  # 带看门狗的转换工作进程
+MediaOptimizer = lazy_from("media_optimizer", "MediaOptimizer")
+filter_duplicates = lazy_from("input_dedup", "filter_duplicates")
+from mem_profile import MemoryProfiler, pdf_structure_stats, profiling_requested
 
 # 适配Python 3.8.7的依赖安装命令（终端执行）：
-# pip install pywin32==227 PyPDF2==2.12.1
+# pip install pywin32==227 PyPDF2==2.12.1 psutil==5.8.0
 
 class Word2PdfMergerGUI:
     def __init__(self, root):
         # 主窗口配置
         self.root = root
         self.root.title("Word转PDF并合并工具 (Python 3.8.7)")
-        self.root.geometry("750x450")
+        self.root.geometry("750x530")
         self.root.resizable(False, False)
         
         # 存储路径变量
@@ -31,6 +36,13 @@ class Word2PdfMergerGUI:
         self.pdf_output_folder.set(default_pdf_folder)
         self.merge_output_path.set(default_merge_path)
         
+        # 看门狗设置：每个工作进程独占一个Word，卡死/内存超限时只结束该进程并重启
+        self.CONVERT_WORKERS = 2        # 并行的Word工作进程数
+        self.CONVERT_TIMEOUT = 300      # 单个文件最长转换时间（秒）
+        self.STALL_TIMEOUT = 60         # CPU持续无活动多少秒判定为卡死（隐藏对话框）
+        self.MAX_RSS_MB = 3072          # 工作进程+Word内存上限（MB）
+        self.MAX_RETRIES = 2            # 被强制结束后重试次数，超过则移入「_隔离文件」
+        
         # ========== 1. 选择Word文件夹区域 ==========
         frame1 = tk.Frame(root, padx=20, pady=10)
         frame1.pack(fill=tk.X)
@@ -70,6 +82,24 @@ class Word2PdfMergerGUI:
         # ========== 4. 执行按钮区域 ==========
         frame4 = tk.Frame(root, padx=20, pady=15)
         frame4.pack(fill=tk.X)
+        # 内存分析模式（默认关闭，环境变量WORD_MEM_PROFILE=1时默认勾选）
+        self.mem_profile_var = tk.BooleanVar(value=profiling_requested())
+        tk.Checkbutton(
+            frame4, text="内存分析模式（合并PDF时逐个采样内存，报告写在合并PDF旁）",
+            variable=self.mem_profile_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 图片压缩（需要Pillow）：转PDF前按显示尺寸降采样到150DPI，原Word文件不变
+        self.optimize_media_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            frame4, text="转换前压缩图片（按显示尺寸降采样到150DPI，仅.docx，原文件不变）",
+            variable=self.optimize_media_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
+        # 重复输入：字节相同或只有rsid/保存时间不同的副本（如批量改名留下的 _1 拷贝）
+        self.skip_duplicates_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            frame4, text="跳过重复文件（内容相同的副本只转换第一份；不勾选时只在日志中报告）",
+            variable=self.skip_duplicates_var, font=("微软雅黑", 9)
+        ).pack(anchor=tk.W)
         self.btn_execute = tk.Button(
             frame4, text="开始转换并合并", command=self.execute_all,
             font=("微软雅黑", 14, "bold"), bg="#67C23A", fg="white",
@@ -81,7 +111,7 @@ class Word2PdfMergerGUI:
         frame5 = tk.Frame(root, padx=20, pady=5)
         frame5.pack(fill=tk.BOTH, expand=True)
         tk.Label(frame5, text="操作日志：", font=("微软雅黑", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame5, height=10, font=("Consolas", 9))
+        self.log_text = LogView(frame5, "Word转PDF并合并", height=10, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
         # 初始化日志
@@ -91,8 +121,7 @@ class Word2PdfMergerGUI:
     # 日志添加方法（带时间戳）
     def log(self, content):
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()
 
     # 选择Word文件夹
@@ -123,42 +152,47 @@ class Word2PdfMergerGUI:
             self.merge_output_path.set(file)
             self.log(f"📁 已选择合并PDF保存路径：{file}")
 
+    def _new_pool(self, quarantine_dir=None):
+        return ConverterPool(
+            workers=self.CONVERT_WORKERS, timeout=self.CONVERT_TIMEOUT,
+            stall_timeout=self.STALL_TIMEOUT, max_rss_mb=self.MAX_RSS_MB,
+            max_retries=self.MAX_RETRIES, quarantine_dir=quarantine_dir
+        )
+
     # Word转PDF核心函数（适配Python 3.8.7）
     def word_to_pdf(self, word_path, pdf_path):
         """
-        将单个Word文件转为PDF
+        将单个Word文件转为PDF（在看门狗监控的工作进程中转换，卡死时只结束该Word进程）
         :param word_path: Word文件路径
         :param pdf_path: 输出PDF路径
         """
+        pool = self._new_pool()
         try:
-            # 初始化COM组件（解决多线程/重入问题）
-            pythoncom.CoInitialize()
-            
-            # 启动Word应用
-            word = win32com.client.DispatchEx("Word.Application")
-            word.Visible = False  # 后台运行
-            word.DisplayAlerts = 0  # 禁用弹窗
-            
-            # 打开文档并另存为PDF
-            doc = word.Documents.Open(word_path)
-            doc.SaveAs(pdf_path, FileFormat=17)  # 17 = PDF格式
-            doc.Close()
-            word.Quit()
-            
-            # 释放COM组件
-            pythoncom.CoUninitialize()
-            
-            self.log(f"✅ 转换成功：{os.path.basename(word_path)} → {os.path.basename(pdf_path)}")
-            return True
-        except Exception as e:
-            self.log(f"❌ 转换失败：{os.path.basename(word_path)} - {str(e)}")
-            # 确保Word进程退出
-            try:
-                word.Quit()
-            except:
-                pass
-            pythoncom.CoUninitialize()
-            return False
+            result = pool.convert(word_path, pdf_path, "pdf")
+        finally:
+            pool.close()
+        self.log(result.message())
+        return result.ok
+
+    def convert_batch(self, pairs, originals=None, quarantine_dir=None):
+        """
+        批量转换（多个Word工作进程并行），返回成功转换的PDF路径（保持输入顺序）
+        :param pairs: [(Word路径, PDF路径)]
+        :param originals: {转换用的临时副本: 原Word文件}，多次卡死时隔离的是原文件
+        :param quarantine_dir: 隔离文件夹（默认为转换文件所在目录下的「_隔离文件」）
+        """
+        originals = originals or {}
+        pool = self._new_pool(quarantine_dir)
+        converted = set()
+        try:
+            tasks = [(src, dst, "pdf", originals.get(src, src)) for src, dst in pairs]
+            for result in pool.run_batch(tasks):
+                self.log(result.message())
+                if result.ok:
+                    converted.add(result.src)
+        finally:
+            pool.close()
+        return [dst for src, dst in pairs if src in converted]
 
     # 合并PDF核心函数
     def merge_pdfs(self, pdf_files, output_path):
@@ -169,15 +203,27 @@ class Word2PdfMergerGUI:
         """
         try:
             merger = PdfMerger()
-            # 按顺序合并PDF
-            for pdf_file in pdf_files:
-                if os.path.exists(pdf_file):
-                    merger.append(pdf_file)
-                    self.log(f"🔗 已加入合并队列：{os.path.basename(pdf_file)}")
-            
-            # 保存合并后的PDF
-            merger.write(output_path)
-            merger.close()
+            profiler = None
+            if self.mem_profile_var.get():
+                profiler = MemoryProfiler(log=self.log)
+                profiler.start()
+            try:
+                # 按顺序合并PDF
+                for pdf_file in pdf_files:
+                    if os.path.exists(pdf_file):
+                        merger.append(pdf_file)
+                        self.log(f"🔗 已加入合并队列：{os.path.basename(pdf_file)}")
+                        if profiler:
+                            profiler.sample(os.path.basename(pdf_file), pdf_structure_stats(merger))
+                
+                # 保存合并后的PDF
+                merger.write(output_path)
+                merger.close()
+            finally:
+                if profiler:
+                    profiler.stop()  # 合并出错时也要关闭 tracemalloc
+            if profiler:
+                self.log(f"🧠 内存分析报告：{profiler.write_report(output_path)}")
             self.log(f"🎉 PDF合并完成：{output_path}")
             return True
         except Exception as e:
@@ -217,22 +263,60 @@ class Word2PdfMergerGUI:
                 messagebox.showwarning("警告", "所选文件夹内无Word文件(.docx/.doc)！")
                 return
             
+            # 重复输入（多进程计算指纹）：勾选时跳过，否则只报告
+            policy = "skip" if self.skip_duplicates_var.get() else "report"
+            word_files, _ = filter_duplicates(word_files, policy, log=self.log)
+            
             self.log("="*60)
             self.log(f"🚀 开始执行Word转PDF并合并（共{len(word_files)}个文件）")
             self.log("="*60)
             
+            optimizer = None
+            if self.optimize_media_var.get():
+                try:
+                    optimizer = MediaOptimizer(log=self.log)
+                    self.log("🗜️ 已开启图片压缩（目标150DPI）")
+                except ImportError:
+                    self.log("⚠️ 未安装Pillow（pip install Pillow），跳过图片压缩")
+            optimized_folder = os.path.join(pdf_folder, "_压缩图片临时文件")
+            use_temp_copies = optimizer is not None
+            
             # 4. 批量转换Word到PDF
-            pdf_files = []
-            success_count = 0
-            for word_file in word_files:
-                # 生成PDF文件名（与Word同名）
-                pdf_name = os.path.splitext(os.path.basename(word_file))[0] + ".pdf"
-                pdf_path = os.path.join(pdf_folder, pdf_name)
+            pairs = []
+            originals = {}  # 压缩图片后的临时副本 -> 原Word文件
+            try:
+                for word_file in word_files:
+                    # 生成PDF文件名（与Word同名）
+                    pdf_name = os.path.splitext(os.path.basename(word_file))[0] + ".pdf"
+                    pdf_path = os.path.join(pdf_folder, pdf_name)
+                    
+                    # 压缩图片后的副本交给Word转换，转换完删除；压缩失败（文件损坏等）时直接转换原文件
+                    source = word_file
+                    if optimizer and word_file.lower().endswith(".docx"):
+                        os.makedirs(optimized_folder, exist_ok=True)
+                        try:
+                            source = optimizer.optimize_file(
+                                word_file, os.path.join(optimized_folder, os.path.basename(word_file)))
+                        except Exception as e:
+                            self.log(f"⚠️ 图片压缩失败，直接转换原文件：{os.path.basename(word_file)}（{str(e)}）")
+                            source = word_file
+                    originals[os.path.abspath(source)] = os.path.abspath(word_file)
+                    pairs.append((os.path.abspath(source), pdf_path))
+                if optimizer:
+                    self.log(optimizer.summary())
+                    optimizer.close()
+                    optimizer = None
                 
-                # 转换
-                if self.word_to_pdf(word_file, pdf_path):
-                    pdf_files.append(pdf_path)
-                    success_count += 1
+                # 转换（多个Word工作进程并行，卡死的文件重试后隔离，不拖住整批）
+                # 隔离的是Word文件夹中的原文件（临时副本所在文件夹转换后会删除）
+                from converter_worker import QUARANTINE_FOLDER
+                pdf_files = self.convert_batch(pairs, originals, os.path.join(word_folder, QUARANTINE_FOLDER))
+            finally:
+                if optimizer:
+                    optimizer.close()
+                if use_temp_copies:
+                    shutil.rmtree(optimized_folder, ignore_errors=True)
+            success_count = len(pdf_files)
             
             # 5. 校验转换结果
             if not pdf_files:
@@ -273,4 +357,6 @@ if __name__ == "__main__":
     # 启动GUI
     root = tk.Tk()
     app = Word2PdfMergerGUI(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "PyPDF2", "converter_worker")
     root.mainloop()
@@ -0,0 +1,236 @@
+'''
+用Python 3.8.7实现一个统一的Word工具箱，并且生成一个GUI界面进行操作。
+1 左侧列出所有工具（每个工具脚本注册为一个操作，用到时才加载）
+2 选择文件夹后，可把多个操作加入队列，在同一个进程里按顺序执行
+3 逐文件操作分发到常驻工作进程池并行执行，工作进程内的工具实例一直复用
+4 也可以直接打开任意工具的原始界面（在本进程内打开，无需再次启动Python）
+'''
+import os
+import threading
+import queue
+import datetime
+import tkinter as tk
+from tkinter import filedialog, messagebox
+from tool_registry import REGISTRY, ToolServices
+from lazy_import import warm_up
+from log_view import LogView
+
+
+class WordToolbox:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Word批量处理工具箱")
+        self.root.geometry("900x620")
+
+        self.folder_var = tk.StringVar()
+        self.parallel_var = tk.BooleanVar(value=True)
+        self.backup_var = tk.BooleanVar(value=True)
+        self.op_queue = []
+        self.running = False
+        # 工作线程的日志先放入队列，由主线程定时刷到界面
+        self.log_queue = queue.Queue()
+        self.services = ToolServices(log=self.log_queue.put)
+
+        self._build_gui()
+        self.root.after(100, self._drain_log)
+        self.log("✅ 工具箱已就绪：选择文件夹 → 双击或添加操作到队列 → 执行队列")
+
+    def _build_gui(self):
+        # 1. 文件夹选择
+        frame_folder = tk.Frame(self.root, padx=10, pady=8)
+        frame_folder.pack(fill=tk.X)
+        tk.Label(frame_folder, text="目标文件夹：", font=("微软雅黑", 10)).pack(side=tk.LEFT)
+        tk.Entry(frame_folder, textvariable=self.folder_var, width=70, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_folder, text="选择文件夹", command=self.select_folder,
+                  font=("微软雅黑", 9), bg="#409EFF", fg="white").pack(side=tk.LEFT)
+
+        body = tk.Frame(self.root, padx=10)
+        body.pack(fill=tk.BOTH, expand=True)
+
+        # 2. 左侧：全部操作
+        frame_ops = tk.Frame(body)
+        frame_ops.pack(side=tk.LEFT, fill=tk.Y)
+        tk.Label(frame_ops, text="全部操作（双击加入队列）：", font=("微软雅黑", 9)).pack(anchor=tk.W)
+        self.op_list = tk.Listbox(frame_ops, width=30, height=18, font=("微软雅黑", 9))
+        for name, spec in REGISTRY.items():
+            self.op_list.insert(tk.END, f"{name}{'  [文件夹]' if spec.kind == 'folder' else ''}")
+        self.op_list.pack(fill=tk.Y, expand=True)
+        self.op_list.bind("<Double-Button-1>", lambda e: self.add_to_queue())
+        self.op_list.bind("<<ListboxSelect>>", lambda e: self._show_description())
+        self.desc_var = tk.StringVar()
+        tk.Label(frame_ops, textvariable=self.desc_var, fg="#666666", wraplength=220,
+                 justify=tk.LEFT, font=("微软雅黑", 8)).pack(anchor=tk.W)
+
+        # 3. 中间：按钮
+        frame_btn = tk.Frame(body, padx=8)
+        frame_btn.pack(side=tk.LEFT, fill=tk.Y)
+        for text, command in (("加入队列 →", self.add_to_queue), ("← 移出队列", self.remove_from_queue),
+                              ("上移", lambda: self.move_in_queue(-1)), ("下移", lambda: self.move_in_queue(1)),
+                              ("打开工具窗口", self.open_tool_window), ("修改记录/回滚", self.open_journal)):
+            tk.Button(frame_btn, text=text, command=command, width=12, font=("微软雅黑", 9)).pack(pady=4)
+
+        # 4. 右侧：队列
+        frame_queue = tk.Frame(body)
+        frame_queue.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tk.Label(frame_queue, text="执行队列（按顺序执行）：", font=("微软雅黑", 9)).pack(anchor=tk.W)
+        self.queue_list = tk.Listbox(frame_queue, height=12, font=("微软雅黑", 9))
+        self.queue_list.pack(fill=tk.BOTH, expand=True)
+        tk.Checkbutton(frame_queue, text="逐文件操作并行执行（常驻工作进程）",
+                       variable=self.parallel_var).pack(anchor=tk.W)
+        tk.Checkbutton(frame_queue, text="执行前备份所有文件",
+                       variable=self.backup_var).pack(anchor=tk.W)
+        self.btn_run = tk.Button(frame_queue, text="执行队列", command=self.run_queue,
+                                 font=("微软雅黑", 12, "bold"), bg="#67C23A", fg="white", height=2)
+        self.btn_run.pack(fill=tk.X, pady=5)
+
+        # 5. 日志
+        frame_log = tk.Frame(self.root, padx=10, pady=5)
+        frame_log.pack(fill=tk.BOTH, expand=True)
+        tk.Label(frame_log, text="操作日志：", font=("微软雅黑", 9)).pack(anchor=tk.W)
+        self.log_text = LogView(frame_log, "工具箱", height=12, font=("Consolas", 9))
+        self.log_text.pack(fill=tk.BOTH, expand=True)
+
+    # ========== 辅助方法 ==========
+    def log(self, content):
+        """带时间戳的日志（可在任意线程调用）"""
+        self.log_queue.put(content)
+
+    def _drain_log(self):
+        """主线程定时把日志队列刷到界面"""
+        lines = []
+        while True:
+            try:
+                lines.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            time_str = datetime.datetime.now().strftime("[%H:%M:%S]")
+            for line in lines:
+                self.log_text.write(f"{time_str} {line}")
+        self.root.after(100, self._drain_log)
+
+    def _selected_op(self):
+        selection = self.op_list.curselection()
+        if not selection:
+            return None
+        return list(REGISTRY)[selection[0]]
+
+    def _show_description(self):
+        name = self._selected_op()
+        if name:
+            spec = REGISTRY[name]
+            self.desc_var.set(f"{spec.description}\n脚本：{spec.file_name}")
+
+    def select_folder(self):
+        folder = filedialog.askdirectory(title="选择包含docx文件的文件夹")
+        if folder:
+            self.folder_var.set(folder)
+            count = len(self.services.discover(folder))
+            self.log(f"📂 已选择文件夹：{folder}（{count} 个.docx文件）")
+
+    # ========== 队列编辑 ==========
+    def add_to_queue(self):
+        name = self._selected_op()
+        if name:
+            self.op_queue.append(name)
+            self.queue_list.insert(tk.END, name)
+
+    def remove_from_queue(self):
+        selection = self.queue_list.curselection()
+        if selection:
+            del self.op_queue[selection[0]]
+            self.queue_list.delete(selection[0])
+
+    def move_in_queue(self, step):
+        selection = self.queue_list.curselection()
+        if not selection:
+            return
+        idx = selection[0]
+        new_idx = idx + step
+        if 0 <= new_idx < len(self.op_queue):
+            self.op_queue[idx], self.op_queue[new_idx] = self.op_queue[new_idx], self.op_queue[idx]
+            self.queue_list.delete(0, tk.END)
+            for name in self.op_queue:
+                self.queue_list.insert(tk.END, name)
+            self.queue_list.selection_set(new_idx)
+
+    # ========== 执行 ==========
+    def open_tool_window(self):
+        """在本进程内打开工具原始界面（脚本此时才加载）"""
+        name = self._selected_op()
+        if not name:
+            messagebox.showinfo("提示", "请先在左侧选择一个操作！")
+            return
+        from headless import load_tool_module, find_tool_class
+        spec = REGISTRY[name]
+        try:
+            module = load_tool_module(spec.file_name)
+            cls = getattr(module, spec.class_name) if spec.class_name else find_tool_class(module)
+            cls(tk.Toplevel(self.root))
+            self.log(f"🪟 已打开工具窗口：{spec.file_name}")
+        except Exception as e:
+            self.log(f"❌ 打开工具失败：{str(e)}")
+            messagebox.showerror("错误", f"打开工具失败：{str(e)}")
+
+    def run_queue(self):
+        folder = self.folder_var.get().strip()
+        if not folder or not os.path.isdir(folder):
+            messagebox.showerror("错误", "请选择有效的文件夹！")
+            return
+        if not self.op_queue:
+            messagebox.showinfo("提示", "执行队列为空！")
+            return
+        if self.running:
+            return
+        self.running = True
+        self.btn_run.config(state=tk.DISABLED)
+        ops = list(self.op_queue)
+        threading.Thread(target=self._run_queue_worker, args=(ops, folder), daemon=True).start()
+
+    def _run_queue_worker(self, ops, folder):
+        try:
+            self.log("=" * 50)
+            self.log(f"🚀 开始执行队列：{' → '.join(ops)}")
+            run = None
+            if self.backup_var.get():
+                run = self.services.begin_backup("工具箱：" + " → ".join(ops), folder, self.services.discover(folder))
+                self.log(f"📦 已备份 {len(run.files)} 个文件")
+            try:
+                summary = self.services.run_queue(ops, folder, self.parallel_var.get())
+            finally:
+                if run is not None:
+                    self.services.end_backup(run)
+            self.log("=" * 50)
+            for name, success, fail in summary:
+                self.log(f"📊 {name}：成功 {success} | 失败 {fail}")
+            self.log("🎉 队列执行完成")
+        except Exception as e:
+            self.log(f"❌ 队列执行失败：{str(e)}")
+        finally:
+            self.running = False
+            self.root.after(0, lambda: self.btn_run.config(state=tk.NORMAL))
+
+    def open_journal(self):
+        """所有工具的批量修改记录，可整批或按文件回滚"""
+        from restore_journal import open_journal_window
+        open_journal_window(self.root)
+
+    def on_close(self):
+        self.services.shutdown()
+        self.root.destroy()
+
+
+if __name__ == "__main__":
+    # 适配Windows高分屏
+    try:
+        from ctypes import windll
+        windll.shcore.SetProcessDpiAwareness(1)
+    except Exception:
+        pass
+
+    root = tk.Tk()
+    app = WordToolbox(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx", "docxcompose.composer")
+    root.mainloop()
@@ -1,11 +1,12 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox
 import os
-import shutil
-import tempfile
-from docx import Document
-from docx.oxml import parse_xml
-from docx.oxml.ns import qn
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+parse_xml = lazy_from("docx.oxml", "parse_xml")
+qn = lazy_from("docx.oxml.ns", "qn")
 
 # 适配 Python 3.8.7 依赖（执行前安装）：
 # pip install python-docx==0.8.11
@@ -18,8 +19,8 @@ class WordImageTableTool:
         self.root.geometry("800x520")
         self.root.resizable(False, False)
 
-        # 备份/文件变量
-        self.tmp_dir = None
+        # 备份/文件变量（备份写入回滚日志，关闭程序后仍可在工具箱「修改记录/回滚」中恢复）
+        self.journal_run = None
         self.backup_path = ""
         self.current_file = ""
 
@@ -54,7 +55,7 @@ class WordImageTableTool:
         frame_log.pack(fill=tk.BOTH, expand=True)
 
         tk.Label(frame_log, text="操作日志：", font=("微软雅黑", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame_log, height=15, font=("Consolas", 9))
+        self.log_text = LogView(frame_log, "移动表格和图片位置", height=15, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
         # 初始化日志
@@ -66,8 +67,7 @@ class WordImageTableTool:
         """带时间戳的日志"""
         import datetime
         time_str = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        self.log_text.insert(tk.END, f"{time_str} {content}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(f"{time_str} {content}")
         self.root.update_idletasks()
 
     def choose_file(self):
@@ -196,10 +196,8 @@ class WordImageTableTool:
 
         # 1. 备份原文件
         self.log("📦 开始备份原文件")
-        if self.tmp_dir is None:
-            self.tmp_dir = tempfile.mkdtemp(prefix="word_backup_387_")
-        self.backup_path = os.path.join(self.tmp_dir, os.path.basename(self.current_file))
-        shutil.copy2(self.current_file, self.backup_path)
+        self.journal_run = RestoreJournal().begin("移动表格和图片位置", os.path.dirname(self.current_file))
+        self.backup_path = self.journal_run.backup(self.current_file)
         self.log(f"✅ 原文件已备份至：{self.backup_path}")
 
         # 2. 处理文档
@@ -213,6 +211,8 @@ class WordImageTableTool:
             if adjust_success:
                 # 保存处理后的文档
                 doc.save(self.current_file)
+                self.journal_run.commit(self.current_file)
+                self.journal_run.end()
                 self.log(f"\n🎉 文档调整完成！")
                 messagebox.showinfo("成功", 
                     f"✅ Word文件调整完成！\n📄 已执行：\n  1. 删除图片上方所有文字/表格\n  2. 将图片下方表格移动到图片上方\n✅ 保留：\n  1. 所有图片（含格式）\n  2. 表格原始格式")
@@ -229,18 +229,17 @@ class WordImageTableTool:
     # ========== 恢复原文件 ==========
     def restore_original(self):
         """恢复备份的原文件"""
-        if not self.backup_path or not os.path.exists(self.backup_path):
+        if self.journal_run is None or not self.journal_run.files:
             messagebox.showinfo("提示", "暂无需要恢复的原文件！")
             return
 
         try:
-            # 覆盖恢复
-            shutil.copy2(self.backup_path, self.current_file)
-            
-            # 清理临时目录
-            if self.tmp_dir and os.path.exists(self.tmp_dir):
-                shutil.rmtree(self.tmp_dir, ignore_errors=True)
-            self.tmp_dir = None
+            # 用回滚日志中的备份覆盖恢复
+            self.journal_run.end()
+            results = self.journal_run.rollback(force=True)
+            if any(status == "missing_backup" for _, status, _ in results):
+                raise FileNotFoundError("备份已被清理")
+            self.journal_run = None
             self.backup_path = ""
 
             self.log(f"✅ 已恢复原文件：{os.path.basename(self.current_file)}")
@@ -262,11 +261,6 @@ if __name__ == "__main__":
     # 启动GUI
     root = tk.Tk()
     app = WordImageTableTool(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
-
-    # 清理临时文件
-    try:
-        if app.tmp_dir and os.path.exists(app.tmp_dir):
-            shutil.rmtree(app.tmp_dir, ignore_errors=True)
-    except:
-        pass
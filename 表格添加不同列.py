@@ -6,6 +6,7 @@
 1. 按文件名关键词（ME_H/ME_V/RE_H/RE_V）差异化处理表格
 2. 第三列右侧加3列并填充对应内容，原第四列移第七列
 3. 添加合并列的第八行备注，显示完整表格边框
+4. 可选：按表格测量数据自动生成备注（全部文件的表格整批用NumPy评估超限/最大裕量，见 margin_eval.py）
 
 
 
@@ -86,12 +87,17 @@
 import os
 import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from docx import Document
-from docx.enum.table import WD_TABLE_ALIGNMENT, WD_CELL_VERTICAL_ALIGNMENT
-from docx.shared import Pt
-from docx.oxml.shared import OxmlElement, qn
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+from rule_config import RuleFile, rule_path
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+WD_TABLE_ALIGNMENT, WD_CELL_VERTICAL_ALIGNMENT = lazy_from("docx.enum.table", "WD_TABLE_ALIGNMENT", "WD_CELL_VERTICAL_ALIGNMENT")
+Pt = lazy_from("docx.shared", "Pt")
+OxmlElement, qn = lazy_from("docx.oxml.shared", "OxmlElement", "qn")
+WD_PARAGRAPH_ALIGNMENT = lazy_from("docx.enum.text", "WD_PARAGRAPH_ALIGNMENT")
+evaluate_files, remark_text = lazy_from("margin_eval", "evaluate_files", "remark_text")
 
 class DocxTableModifier:
     def __init__(self, root):
@@ -99,32 +105,14 @@ class DocxTableModifier:
         self.root.title("Docx表格批量修改工具（关键词差异化处理）")
         self.root.geometry("750x550")
         
-        # 配置不同关键词对应的参数
-        self.config = {
-            "ME_H": {
-                "data_values": ["130", "H", "——"],
-                "remark": "备注：——"
-            },
-            "ME_V": {
-                "data_values": ["130", "V", "——"],
-                "remark": "备注：——"
-            },
-            "RE_H": {
-                "data_values": ["200", "H", "——"],
-                "remark": "备注：背景噪声超限值频段除外，其余频段峰值均低于限值"
-            },
-            "RE_V": {
-                "data_values": ["200", "H", "——"],
-                "remark": "备注：背景噪声超限值频段除外，其余频段峰值均低于限值"
-            }
-        }
-        self.default_config = {
-            "data_values": ["", "", ""],
-            "remark": "备注：无匹配关键词"
-        }
-        
         self.folder_path = tk.StringVar()
+        # 按测量数据生成备注（关闭时使用上面配置的固定备注）
+        self.auto_remark_var = tk.BooleanVar(value=True)
+        # 评估结果缓存 {绝对路径: ((大小, 修改时间), {表格序号: 评估结果})}，文件变化后重新评估
+        self.evaluations = {}
         self._create_gui()
+        # 不同关键词对应的新增列内容和备注在规则文件中，修改后无需重启
+        self.rules = RuleFile(rule_path("表格添加不同列.json"), log=self._log)
 
     def _create_gui(self):
         """创建GUI界面"""
@@ -148,14 +136,18 @@ class DocxTableModifier:
             command=self._batch_process,
             bg="#2196F3", fg="white", font=("SimHei", 11, "bold"), padx=20
         ).pack(side=tk.LEFT)
+        tk.Checkbutton(
+            frame2, text="按测量数据生成备注（超限/背景噪声/最小裕量）",
+            variable=self.auto_remark_var, font=("SimHei", 10)
+        ).pack(side=tk.LEFT, padx=10)
         
         # 3. 日志显示区域
         frame3 = tk.Frame(self.root, padx=10, pady=10)
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志：", font=("SimHei", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(
-            frame3, height=22, font=("Consolas", 9), wrap=tk.WORD
+        self.log_text = LogView(
+            frame3, "表格添加不同列", height=22, font=("Consolas", 9), wrap=tk.WORD
         )
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
@@ -168,8 +160,7 @@ class DocxTableModifier:
 
     def _log(self, msg):
         """添加日志信息并自动滚动"""
-        self.log_text.insert(tk.END, f"{msg}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(msg)
         self.root.update_idletasks()
 
     def _set_cell_border(self, cell):
@@ -184,11 +175,8 @@ class DocxTableModifier:
             cell._tc.get_or_add_tcPr().append(border)
 
     def _get_file_config(self, file_name):
-        """根据文件名匹配配置"""
-        for keyword in self.config.keys():
-            if keyword in file_name:
-                return self.config[keyword]
-        return self.default_config
+        """根据文件名匹配规则（未匹配时为规则文件中的 default）"""
+        return self.rules.current().match(file_name)
 
     def _rebuild_table(self, table, data_values):
         """重建表格数据：原1-3列+新增3列+原4列"""
@@ -242,8 +230,44 @@ class DocxTableModifier:
         # 为合并后的单元格设置边框
         self._set_cell_border(cell)
 
-    def _modify_docx_table(self, file_path, file_config):
-        """修改单个docx文件的表格"""
+    @staticmethod
+    def _file_stamp(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def _evaluate(self, file_paths):
+        """批量读取表格数据并评估（修改文件之前调用）"""
+        stamps = {os.path.abspath(p): self._file_stamp(p) for p in file_paths}
+        evaluations = evaluate_files(file_paths)
+        for path, tables in evaluations.items():
+            self.evaluations[path] = (stamps[path], tables)
+        results = [r for tables in evaluations.values() for r in tables.values() if r]
+        failed = sum(1 for r in results if not r["pass"])
+        ambient = sum(1 for r in results if r["pass"] and r["ambient_exceed"])
+        self._log(f"📈 已评估 {len(results)} 个表格：不合格 {failed} 个，仅背景噪声频段超限 {ambient} 个")
+
+    def _table_remark(self, file_path, table_idx, default, auto_remark=None):
+        """表格的备注：自动生成（有测量数据时）或配置的固定备注；评估失败时使用固定备注"""
+        if auto_remark is None:
+            auto_remark = self.auto_remark_var.get()
+        if not auto_remark:
+            return default
+        path = os.path.abspath(file_path)
+        cached = self.evaluations.get(path)
+        try:
+            if cached is None or cached[0] != self._file_stamp(path):
+                self._evaluate([path])
+                cached = self.evaluations[path]
+        except Exception as e:
+            self._log(f"  ⚠️  测量数据评估失败，使用固定备注：{str(e)}")
+            return default
+        return remark_text(cached[1].get(table_idx)) or default
+
+    def _modify_docx_table(self, file_path, file_config, auto_remark=None):
+        """
+        修改单个docx文件的表格
+        :param auto_remark: 是否按测量数据生成备注，None 时取界面勾选状态
+        """
         # 1. 备份原文件
         backup_path = f"{file_path}.bak"
         shutil.copy2(file_path, backup_path)
@@ -263,7 +287,7 @@ class DocxTableModifier:
                 continue
             
             # 3. 重建表格数据
-            new_table_data = self._rebuild_table(table, file_config["data_values"])
+            new_table_data = self._rebuild_table(table, list(file_config.data_values))
             if not new_table_data:
                 self._log(f"  ⚠️  第{table_count}个表格无数据，跳过")
                 continue
@@ -291,7 +315,8 @@ class DocxTableModifier:
                         self._set_cell_border(cell)
             
             # 6. 添加第八行备注（合并列）
-            self._add_remark_row(new_table, file_config["remark"])
+            self._add_remark_row(new_table, self._table_remark(file_path, table_count - 1, file_config.remark,
+                                                                auto_remark))
             
             # 7. 将新表格插入原位置
             table_parent.insert(table_idx, new_table._element)
@@ -309,7 +334,7 @@ class DocxTableModifier:
             return
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_text.clear()
         self._log("🚀 开始批量处理docx文件...")
         
         # 获取所有docx文件
@@ -324,24 +349,40 @@ class DocxTableModifier:
             return
         
         self._log(f"📊 共找到 {len(docx_files)} 个docx文件，开始处理...")
+        # 修改前一次性评估全部文件的全部表格
+        self.evaluations = {}
+        # 本次是否生成备注：评估失败时只影响本次，不改界面勾选
+        auto_remark = self.auto_remark_var.get()
+        if auto_remark:
+            try:
+                self._evaluate([os.path.join(folder, f) for f in docx_files])
+            except Exception as e:
+                self._log(f"⚠️  测量数据评估失败，使用固定备注：{str(e)}")
+                auto_remark = False
         
         # 批量处理
         success = 0
         fail = 0
+        # 修改前把每个文件写入回滚日志（.bak 照旧保留）
+        run = RestoreJournal().begin("表格添加不同列", folder)
         for file_name in docx_files:
             file_path = os.path.join(folder, file_name)
             self._log(f"\n🔍 处理文件：{file_name}")
             
             # 获取当前文件的配置
             file_config = self._get_file_config(file_name)
-            self._log(f"  📌 匹配关键词：{[k for k in self.config if k in file_name] or '无'}")
+            self._log(f"  📌 匹配关键词：{file_config.keyword or '无'}")
             
+            run.backup(file_path)
             try:
-                self._modify_docx_table(file_path, file_config)
+                self._modify_docx_table(file_path, file_config, auto_remark)
                 success += 1
             except Exception as e:
                 self._log(f"❌ 处理失败：{str(e)}")
                 fail += 1
+            run.commit(file_path)
+        run.end()
+        self._log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成提示
         result = f"✅ 处理完成！成功：{success}个 | 失败：{fail}个"
@@ -353,4 +394,6 @@ if __name__ == "__main__":
     root = tk.Tk()
     root.option_add("*Font", "SimHei 9")
     app = DocxTableModifier(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
@@ -21,11 +21,14 @@
 import os
 import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from docx import Document
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.shared import Pt
-from docx.oxml.shared import OxmlElement, qn
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+WD_TABLE_ALIGNMENT = lazy_from("docx.enum.table", "WD_TABLE_ALIGNMENT")
+Pt = lazy_from("docx.shared", "Pt")
+OxmlElement, qn = lazy_from("docx.oxml.shared", "OxmlElement", "qn")
 
 class DocxTableModifier:
     def __init__(self, root):
@@ -65,7 +68,7 @@ class DocxTableModifier:
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志：").pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame3, height=20, font=("Consolas", 9))
+        self.log_text = LogView(frame3, "表格添加列", height=20, font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
     def _select_folder(self):
@@ -77,8 +80,7 @@ class DocxTableModifier:
 
     def _log(self, msg):
         """添加日志信息"""
-        self.log_text.insert(tk.END, f"{msg}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(msg)
         self.root.update_idletasks()
 
     def _set_cell_border(self, cell):
@@ -194,7 +196,7 @@ class DocxTableModifier:
             return
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_text.clear()
         self._log("开始批量处理...")
         
         # 遍历所有docx文件
@@ -209,16 +211,22 @@ class DocxTableModifier:
         success_count = 0
         fail_count = 0
         
+        # 修改前把每个文件写入回滚日志（.bak 照旧保留）
+        run = RestoreJournal().begin("表格添加列", folder)
         for file_name in docx_files:
             file_path = os.path.join(folder, file_name)
             self._log(f"\n处理文件：{file_name}")
             
+            run.backup(file_path)
             try:
                 self._modify_docx_table(file_path)
                 success_count += 1
             except Exception as e:
                 self._log(f"  处理失败：{str(e)}")
                 fail_count += 1
+            run.commit(file_path)
+        run.end()
+        self._log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成提示
         result_msg = f"处理完成！成功：{success_count}个，失败：{fail_count}个"
@@ -230,4 +238,6 @@ if __name__ == "__main__":
     root = tk.Tk()
     root.option_add("*Font", "SimHei 9")
     app = DocxTableModifier(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
@@ -13,14 +13,17 @@ Python 3.8.7 + python-docx 0.8.11
 import os
 import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from docx import Document
-from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.shared import Pt
-from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
-from docx.oxml.shared import OxmlElement, qn
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+WD_CELL_VERTICAL_ALIGNMENT = lazy_from("docx.enum.table", "WD_CELL_VERTICAL_ALIGNMENT")
+WD_PARAGRAPH_ALIGNMENT = lazy_from("docx.enum.text", "WD_PARAGRAPH_ALIGNMENT")
+Pt = lazy_from("docx.shared", "Pt")
+parse_xml = lazy_from("docx.oxml", "parse_xml")
+nsdecls = lazy_from("docx.oxml.ns", "nsdecls")
+OxmlElement, qn = lazy_from("docx.oxml.shared", "OxmlElement", "qn")
 
 class DocxBatchTool:
     def __init__(self, root):
@@ -64,8 +67,8 @@ class DocxBatchTool:
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志：", font=("SimHei", 10)).pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(
-            frame3, height=30, font=("Consolas", 9), wrap=tk.WORD
+        self.log_text = LogView(
+            frame3, "调换图片和表格位置", height=30, font=("Consolas", 9), wrap=tk.WORD
         )
         self.log_text.pack(fill=tk.BOTH, expand=True)
 
@@ -78,8 +81,7 @@ class DocxBatchTool:
 
     def _log(self, msg):
         """日志输出（自动滚动）"""
-        self.log_text.insert(tk.END, f"{msg}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(msg)
         self.root.update_idletasks()
 
     def _set_cell_border(self, cell):
@@ -258,7 +260,7 @@ class DocxBatchTool:
             return
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_text.clear()
         self._log("🚀 开始批量处理docx文件...")
         self._log(f"📂 目标文件夹：{folder}")
         
@@ -278,11 +280,17 @@ class DocxBatchTool:
         # 批量处理
         success_count = 0
         fail_count = 0
+        # 修改前把每个文件写入回滚日志（.bak 照旧保留）
+        run = RestoreJournal().begin("调换图片和表格位置", folder)
         for file_path in docx_files:
+            run.backup(file_path)
             if self._process_single_file(file_path):
                 success_count += 1
             else:
                 fail_count += 1
+            run.commit(file_path)
+        run.end()
+        self._log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成统计
         result_msg = f"\n✅ 批量处理完成！成功：{success_count}个 | 失败：{fail_count}个"
@@ -295,4 +303,6 @@ if __name__ == "__main__":
     root.option_add("*Font", "SimHei 9")
     # 启动主程序
     app = DocxBatchTool(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()
@@ -1,13 +1,18 @@
 import os
 import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-from docx import Document
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.shared import Inches, Pt
-from docx.oxml.shared import OxmlElement, qn
-from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
+from tkinter import filedialog, messagebox
+from lazy_import import lazy_from, warm_up
+from log_view import LogView
+from restore_journal import RestoreJournal
+from rule_config import TableSpec
+Document = lazy_from("lazy_package", "open_document")  # 图片等二进制部件按需读取，保存时直接从原文件拷贝
+insert_table, at_index, BlankLines, PLAIN_STYLE = lazy_from(
+    "table_insert", "insert_table", "at_index", "BlankLines", "PLAIN_STYLE")
+
+# 试验条件表格：2行2列（第二行第二列留空），每列2.5英寸
+TABLE_SPEC = TableSpec(rows=(("试验供电电源：380V AC/50Hz", "试验频率范围：150kHz-30MHz"), ("样品运行模式：1", "")),
+                       cols=2, merges=(), col_widths_in=(2.5, 2.5))
 
 class DocxTableAdder:
     def __init__(self, root):
@@ -42,7 +47,7 @@ class DocxTableAdder:
         frame3.pack(fill=tk.BOTH, expand=True)
         
         tk.Label(frame3, text="处理日志:").pack(anchor=tk.W)
-        self.log_text = scrolledtext.ScrolledText(frame3, height=20)
+        self.log_text = LogView(frame3, "顶部添加表格", height=20)
         self.log_text.pack(fill=tk.BOTH, expand=True)
     
     def _select_folder(self):
@@ -54,96 +59,22 @@ class DocxTableAdder:
     
     def _log(self, message):
         """添加日志信息"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
+        self.log_text.write(message)
         self.root.update_idletasks()
     
     def _clear_log(self):
         """清空日志"""
-        self.log_text.delete(1.0, tk.END)
-    
-    def _set_cell_border(self, cell, border_color="000000", border_width=1):
-        """
-        为表格单元格设置边框（不依赖样式，兼容性100%）
-        :param cell: 单元格对象
-        :param border_color: 边框颜色（16进制）
-        :param border_width: 边框宽度（点数）
-        """
-        # 创建边框元素
-        tc_pr = cell._tc.get_or_add_tcPr()
-        tc_borders = parse_xml(r'<w:tcBorders %s>'
-                               r'<w:top w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'<w:left w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'<w:bottom w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'<w:right w:val="single" w:color="%s" w:sz="%d"/>'
-                               r'</w:tcBorders>' % (nsdecls('w'),
-                                                     border_color, border_width*8,
-                                                     border_color, border_width*8,
-                                                     border_color, border_width*8,
-                                                     border_color, border_width*8))
-        # 添加边框到单元格
-        tc_pr.append(tc_borders)
+        self.log_text.clear()
     
     def _add_table_to_docx(self, file_path):
         """
         给单个docx文件添加表格（完整保留所有内容，包括图片）
+        表格连同后面的两行空行一次插入到文档最开头（见 table_insert.py）
         :param file_path: 文件路径
         """
         try:
-            # 打开文档（保留所有原始内容）
             doc = Document(file_path)
-            
-            # ========== 核心修复：直接在文档开头插入表格，不破坏原有内容 ==========
-            # 步骤1: 在文档最开头插入一个空段落作为占位（确保表格在最前面）
-            # 获取文档的body元素
-            body = doc.element.body
-            # 创建新的空段落元素
-            new_para = parse_xml(r'<w:p %s></w:p>' % nsdecls('w'))
-            # 将空段落插入到body的最前面
-            body.insert(0, new_para)
-            
-            # 步骤2: 在空段落后插入表格（使用XML方式确保位置正确）
-            # 创建2行2列的表格
-            table = doc.add_table(rows=2, cols=2)
-            # 左对齐表格
-            table.alignment = WD_TABLE_ALIGNMENT.LEFT
-            
-            # 设置表格内容
-            table.cell(0, 0).text = "试验供电电源：380V AC/50Hz"
-            table.cell(0, 1).text = "试验频率范围：150kHz-30MHz"
-            table.cell(1, 0).text = "样品运行模式：1"
-            table.cell(1, 1).text = ""  # 第二行第二列留空
-            
-            # 为表格添加边框
-            for row in table.rows:
-                for cell in row.cells:
-                    self._set_cell_border(cell)
-                    # 设置单元格宽度和字体
-                    cell.width = Inches(2.5)
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.size = Pt(10)
-            
-            # 步骤3: 将表格移动到文档最开头（关键：保留所有原有内容）
-            # 获取表格的XML元素
-            table_elem = table._element
-            # 从当前位置移除表格
-            table_elem.getparent().remove(table_elem)
-            # 插入到body的第一个位置（空段落之后）
-            body.insert(1, table_elem)
-            
-            # 步骤4: 在表格后添加两行空行（不影响原有内容）
-            # 创建两个空段落
-            empty_para1 = parse_xml(r'<w:p %s><w:r><w:t></w:t></w:r></w:p>' % nsdecls('w'))
-            empty_para2 = parse_xml(r'<w:p %s><w:r><w:t></w:t></w:r></w:p>' % nsdecls('w'))
-            # 插入到表格后面
-            body.insert(2, empty_para1)
-            body.insert(3, empty_para2)
-            
-            # 删除第一步创建的临时空段落（清理冗余）
-            body.remove(new_para)
-            
-            # 保存修改后的文档（保留所有原始内容：图片、格式、表格、文本等）
+            insert_table(doc, at_index(0), TABLE_SPEC, PLAIN_STYLE, BlankLines(after=2))
             doc.save(file_path)
             return True
             
@@ -170,6 +101,8 @@ class DocxTableAdder:
         
         success_count = 0
         fail_count = 0
+        # 修改前把每个文件写入回滚日志（.bak 照旧保留）
+        run = RestoreJournal().begin("顶部添加表格", folder)
         
         for filename in docx_files:
             file_path = os.path.join(folder, filename)
@@ -177,6 +110,7 @@ class DocxTableAdder:
             # 创建备份文件（防止处理出错）
             backup_path = file_path + ".bak"
             try:
+                run.backup(file_path)
                 shutil.copy2(file_path, backup_path)
                 self._log(f"已创建备份: {backup_path}")
             except Exception as e:
@@ -196,6 +130,9 @@ class DocxTableAdder:
                 except:
                     pass
                 fail_count += 1
+            run.commit(file_path)
+        run.end()
+        self._log(f"📒 修改已记录，可整批回滚：python restore_journal.py rollback {run.id}")
         
         # 处理完成提示
         self._log(f"\n处理完成！成功: {success_count} 个, 失败: {fail_count} 个")
@@ -203,9 +140,9 @@ class DocxTableAdder:
 
 if __name__ == "__main__":
     # 安装依赖提示（首次运行需要）
-    try:
-        from docx import Document
-    except ImportError:
+    # 只检查是否已安装，不在启动时导入python-docx（也不覆盖上面按需加载的 Document）
+    import importlib.util
+    if importlib.util.find_spec("docx") is None:
         root = tk.Tk()
         root.withdraw()
         messagebox.showinfo("提示", "请先安装依赖库：\npip install python-docx")
@@ -214,4 +151,6 @@ if __name__ == "__main__":
     # 启动GUI
     root = tk.Tk()
     app = DocxTableAdder(root)
+    # 窗口显示后在后台线程预加载重型库（启动时不导入）
+    warm_up(root, "docx")
     root.mainloop()